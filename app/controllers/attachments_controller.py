@@ -0,0 +1,26 @@
+# app/controllers/attachments_controller.py
+
+from fastapi import APIRouter, HTTPException
+
+from app.services.attachment_index import attachment_index
+from app.services.attachment_cache import get_attachment_cache
+
+router = APIRouter(prefix="/attachments")
+
+# Endpoint para obtener las estadísticas de deduplicación de adjuntos
+@router.get("/stats")
+async def get_stats():
+    if attachment_index is None:
+        raise HTTPException(status_code=404, detail="La deduplicación de adjuntos está deshabilitada")
+    return {
+        "status": "success",
+        "data": attachment_index.stats(),
+    }
+
+# Endpoint para obtener las estadísticas del cache de descargas de adjuntos
+@router.get("/cache/stats")
+async def get_cache_stats():
+    return {
+        "status": "success",
+        "data": get_attachment_cache().stats(),
+    }
\ No newline at end of file
@@ -0,0 +1,24 @@
+# app/controllers/cache_controller.py
+
+from fastapi import APIRouter
+
+from app.services.cache_service import ticket_cache
+from app.services.team_directory import team_directory
+
+router = APIRouter(prefix="/cache")
+
+# Endpoint para obtener las estadísticas del cache de tickets
+@router.get("/stats")
+async def get_stats():
+    return {
+        "status": "success",
+        "data": ticket_cache.stats(),
+    }
+
+# Endpoint para obtener las estadísticas del directorio de miembros de los equipos
+@router.get("/teams/stats")
+async def get_teams_stats():
+    return {
+        "status": "success",
+        "data": team_directory.stats(),
+    }
\ No newline at end of file
@@ -0,0 +1,35 @@
+# app/controllers/hooks_controller.py
+
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.security import HTTPBasic, HTTPBasicCredentials
+
+from app.services.hooks_service import HooksService
+from app.services.common import AZURE_HOOKS_SECRET
+from app.schemas.hooks_schema import AzureHookEventSchema
+
+router = APIRouter(prefix="/hooks")
+security = HTTPBasic(auto_error=False)
+
+# Validar la contraseña configurada en la suscripción de Azure DevOps
+def verify_hook_credentials(credentials: Optional[HTTPBasicCredentials] = Depends(security)):
+    if not AZURE_HOOKS_SECRET:
+        # Sin contraseña configurada no se puede verificar el origen de los eventos
+        raise HTTPException(status_code=503, detail="La recepción de service hooks no está configurada")
+    if credentials is None or not secrets.compare_digest(credentials.password.encode(), AZURE_HOOKS_SECRET.encode()):
+        raise HTTPException(status_code=401, detail="Credenciales inválidas", headers={"WWW-Authenticate": "Basic"})
+
+# Endpoint que recibe los eventos de service hooks de Azure DevOps
+@router.post("/azure", dependencies=[Depends(verify_hook_credentials)])
+async def receive_azure_event(event: AzureHookEventSchema):
+    try:
+        # Los eventos ignorados también responden 200 para que Azure no los reintente
+        result = HooksService.handle_event(event.model_dump())
+        return {
+            "status": "success",
+            "data": result
+        }
+    except (KeyError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Evento inválido: {e}")
\ No newline at end of file
@@ -0,0 +1,21 @@
+# app/controllers/metrics_controller.py
+
+from fastapi import APIRouter, Response
+
+from app.services.metrics import registry
+from app.services.rate_limiter import rate_limiter
+
+router = APIRouter()
+
+# Endpoint con las métricas de la aplicación en el formato de texto de Prometheus
+@router.get("/metrics")
+async def get_metrics():
+    return Response(content=registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# Endpoint con el estado del limitador de solicitudes a Azure DevOps
+@router.get("/metrics/rate-limiter")
+async def get_rate_limiter_stats():
+    return {
+        "status": "success",
+        "data": rate_limiter.stats(),
+    }
\ No newline at end of file
@@ -1,36 +1,113 @@
 # app/controllers/reversals_controller.py
 
-import os
-from fastapi import APIRouter, HTTPException, File, UploadFile
-import shutil
-from typing import List
+from fastapi import APIRouter, HTTPException, Request, Depends, Query
+from typing import Optional
+from datetime import date
 
-from app.services.reversals_service import ReversalsService
-from app.schemas.reversal_schema import CreateReversalSchema, MoveReversalSchema
+from app.services.reversals_service import ReversalsService, parse_fields
+from app.services.reversal_stats_service import ReversalStatsService
+from app.services.ticket_service import SEARCH_DEFAULT_TOP
+from app.services.multipart_stream import MultipartFileReader, MULTIPART_FILES_OPENAPI
+from app.schemas.reversal_schema import CreateReversalSchema, MoveReversalSchema, BulkMoveReversalsSchema
+from app.schemas.ticket_schema import GetTicketsBatchSchema, TicketSearchFilters
 from app.schemas.comments_schema import AddCommentSchema
 
 router = APIRouter(prefix="/reversals")
 
-# Ruta del directorio temporal
-TEMP_DIR = os.path.join(os.path.dirname(__file__), 'tmp')
-
-# Asegurarse de que el directorio temporal existe
-os.makedirs(TEMP_DIR, exist_ok=True)
-
 # Endpoint para crear un ticket
 @router.post("")
-def create(reversal_data: CreateReversalSchema):
+async def create(reversal_data: CreateReversalSchema):
     try:
-        new_reversal = ReversalsService.create(reversal_data)
+        new_reversal = await ReversalsService.create(reversal_data)
         return {"status": "success", "data": new_reversal}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+# Endpoint para buscar reversiones con filtros y paginación por cursor
+@router.get("")
+async def search(
+    filters: TicketSearchFilters = Depends(),
+    top: int = Query(SEARCH_DEFAULT_TOP, alias="$top"),
+    cursor: Optional[int] = None
+):
+    try:
+        reversals = await ReversalsService.search(filters, top, cursor)
+        return {
+            "status": "success",
+            "data": reversals,
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Endpoint para obtener varias reversiones en una sola solicitud
+@router.post("/batch")
+async def get_tickets_batch(batch_data: GetTicketsBatchSchema):
+    try:
+        reversals = await ReversalsService.get_many(batch_data.ids, batch_data.include_comments, batch_data.include_attachments)
+        return {
+            "status": "success",
+            "data": reversals,
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Endpoint para mover varias reversiones de estado en una sola solicitud
+@router.post("/bulk/move")
+async def bulk_move(bulk_data: BulkMoveReversalsSchema):
+    try:
+        result = await ReversalsService.bulk_move([item.model_dump() for item in bulk_data.items])
+        return {
+            "status": "success",
+            "data": result,
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Endpoints de estadísticas, calculadas sobre la copia local sincronizada. Son
+# síncronos para que el cálculo se ejecute en el pool de hilos y no bloquee el event loop
+@router.get("/stats/time-in-state")
+def get_time_in_state():
+    try:
+        return {"status": "success", "data": ReversalStatsService.time_in_state(), "lag_seconds": ReversalStatsService.lag()}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/stats/return-rates")
+def get_return_rates():
+    try:
+        return {"status": "success", "data": ReversalStatsService.return_rates(), "lag_seconds": ReversalStatsService.lag()}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/stats/throughput")
+def get_throughput(date_from: Optional[date] = None, date_to: Optional[date] = None):
+    try:
+        return {"status": "success", "data": ReversalStatsService.throughput(date_from, date_to), "lag_seconds": ReversalStatsService.lag()}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/stats/backlog")
+def get_backlog():
+    try:
+        return {"status": "success", "data": ReversalStatsService.backlog(), "lag_seconds": ReversalStatsService.lag()}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 # Endpoint para obtener un ticket
 @router.get("/{reversal_id}")
-def get_ticket(reversal_id: int):
+async def get_ticket(
+    reversal_id: int,
+    include_comments: bool = True,
+    include_attachments: bool = True,
+    fields: Optional[str] = Query(None, description="Claves separadas por coma, ej. state,assignedTo,iterations"),
+):
     try:
-        ticket = ReversalsService.get(reversal_id)
+        # Con `fields` solo se leen y retornan esas claves; `include_*` no aplican
+        projection = parse_fields(fields)
+        if projection is not None:
+            ticket = await ReversalsService.get_projection(reversal_id, projection)
+        else:
+            ticket = await ReversalsService.get(reversal_id, include_comments, include_attachments)
         return {
             "status": "success",
             "data": ticket,
@@ -40,7 +117,7 @@ def get_ticket(reversal_id: int):
 
 # Endpoint para mover un ticket de estado
 @router.put("/{reversal_id}")
-def move_ticket(reversal_id: int, move_ticket_data: MoveReversalSchema):
+async def move_ticket(reversal_id: int, move_ticket_data: MoveReversalSchema):
     try:
         # Obtener el nuevo estado y el user email opcional
         new_state = move_ticket_data.new_state
@@ -51,7 +128,7 @@ def move_ticket(reversal_id: int, move_ticket_data: MoveReversalSchema):
         if (new_state == "Asignado") and not user_email:
             raise HTTPException(status_code=400, detail=f"El correo del usuario (user_email) es obligatorio cuando el estado es '{new_state}'")
         
-        updated_ticket = ReversalsService.move(reversal_id, new_state, user_email, data)
+        updated_ticket = await ReversalsService.move(reversal_id, new_state, user_email, data)
         return {
             "status": "success", 
             "data": updated_ticket
@@ -61,9 +138,9 @@ def move_ticket(reversal_id: int, move_ticket_data: MoveReversalSchema):
 
 # Endpoint para comentar un ticket
 @router.post("/{reversal_id}/comments")
-def add_comment_to_ticket(reversal_id: int, comment_data: AddCommentSchema):
+async def add_comment_to_ticket(reversal_id: int, comment_data: AddCommentSchema, refresh: bool = False):
     try:
-        result = ReversalsService.add_comment(reversal_id, comment_data.text, comment_data.user_email)
+        result = await ReversalsService.add_comment(reversal_id, comment_data.text, comment_data.user_email, refresh)
         return {
             "status": "success", 
             "data": result
@@ -72,30 +149,12 @@ def add_comment_to_ticket(reversal_id: int, comment_data: AddCommentSchema):
         raise HTTPException(status_code=400, detail=str(e))
 
 # Endpoint para adjuntar múltiples archivos
-@router.post("/{reversal_id}/attachments")
-async def attach_files_to_ticket(reversal_id: int, files: List[UploadFile] = File(...), max_files: int = 10):
+@router.post("/{reversal_id}/attachments", openapi_extra=MULTIPART_FILES_OPENAPI)
+async def attach_files_to_ticket(reversal_id: int, request: Request, max_files: int = 10, refresh: bool = False):
     try:
-        # Validar el número de archivos
-        if len(files) > max_files:
-            raise HTTPException(status_code=400, detail=f"El número de archivos no puede exceder {max_files}")
-
-        # Guardar los archivos temporalmente en el servidor
-        file_paths = []
-        
-        # Iterar sobre los archivos recibidos y guardarlos temporalmente
-        for file in files:
-            # Crear la ruta completa del archivo en el directorio temporal
-            file_location = os.path.join(TEMP_DIR, file.filename)
-
-            # Guardar el archivo en la ruta temporal
-            with open(file_location, "wb") as f:
-                shutil.copyfileobj(file.file, f)
-
-            # Agregar la ruta del archivo a la lista
-            file_paths.append(file_location)
-        
-        # Adjuntar los archivos al ticket
-        result = ReversalsService.attach_files(reversal_id, file_paths, max_files=max_files)
+        # Los archivos se envían a Azure a medida que se reciben, sin guardarlos en el servidor
+        files = MultipartFileReader(request, "files", max_files)
+        result = await ReversalsService.attach_files(reversal_id, files, refresh=refresh)
         
         # Retornar el resultado
         return {
@@ -104,19 +163,13 @@ async def attach_files_to_ticket(reversal_id: int, files: List[UploadFile] = Fil
         }
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
-    finally:
-        # Cerrar los archivos temporales
-        for file in files:
-            file_location = os.path.join(TEMP_DIR, file.filename)
-            file.file.close()
-            os.remove(file_location)
 
 # Endpoint que permite eliminar un archivo adjunto de un ticket
 @router.delete("/{reversal_id}/attachments")
-def remove_attachment_from_ticket(reversal_id: int, attachmentUrl: str):
+async def remove_attachment_from_ticket(reversal_id: int, attachmentUrl: str, refresh: bool = False):
     try:
         # Llamar al servicio para eliminar el archivo adjunto
-        result = ReversalsService.remove_attachment(reversal_id, attachmentUrl)
+        result = await ReversalsService.remove_attachment(reversal_id, attachmentUrl, refresh)
         return {
             "status": "success", 
             "data": result
@@ -0,0 +1,82 @@
+# app/controllers/stream_controller.py
+
+import json
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, Query, WebSocket
+from fastapi.responses import StreamingResponse
+
+from app.services.event_bus import ticket_events, Subscription
+from app.services.common import TICKET_EVENTS_HEARTBEAT
+from app.schemas.ticket_schema import TicketStreamFilters
+
+router = APIRouter(prefix="/stream")
+
+def format_sse(event: dict) -> str:
+    # Los eventos de control sin id no cambian el Last-Event-ID del cliente
+    message = f"id: {event['id']}\n" if "id" in event else ""
+    return message + f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+def subscribe(filters: TicketStreamFilters, last_event_id: Optional[str]) -> Subscription:
+    # Un id inválido (ej. de otro servidor) se trata como un evento ya no disponible
+    last_event_id = int(last_event_id) if last_event_id and last_event_id.isdigit() else (-1 if last_event_id else None)
+    return ticket_events.subscribe(Subscription(filters.team, filters.assignee, filters.state), last_event_id)
+
+# Endpoint para recibir los cambios de los tickets con server-sent events
+@router.get("/tickets")
+async def stream_tickets(
+    filters: TicketStreamFilters = Depends(),
+    last_event_id: Optional[str] = Query(None),
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID")
+):
+    # EventSource envía el header Last-Event-ID al reconectarse
+    subscription = subscribe(filters, last_event_id_header or last_event_id)
+
+    async def body():
+        try:
+            async for event in subscription.events(TICKET_EVENTS_HEARTBEAT):
+                yield ": keepalive\n\n" if event is None else format_sse(event)
+        finally:
+            ticket_events.unsubscribe(subscription)
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# Endpoint para recibir los cambios de los tickets por WebSocket
+@router.websocket("/tickets/ws")
+async def stream_tickets_ws(websocket: WebSocket, filters: TicketStreamFilters = Depends(), last_event_id: Optional[str] = None):
+    await websocket.accept()
+    subscription = subscribe(filters, last_event_id)
+
+    async def forward():
+        async for event in subscription.events(TICKET_EVENTS_HEARTBEAT):
+            await websocket.send_json(event if event is not None else {"type": "heartbeat"})
+
+    async def wait_disconnect():
+        # El cliente no envía mensajes, solo se espera a que cierre la conexión
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    sender = asyncio.create_task(forward())
+    receiver = asyncio.create_task(wait_disconnect())
+    try:
+        done, pending = await asyncio.wait([sender, receiver], return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        if sender in done and sender.exception() is None:
+            # La suscripción se cerró por lentitud, el cliente debe reconectarse con last_event_id
+            await websocket.close(code=1013)
+    finally:
+        ticket_events.unsubscribe(subscription)
+
+# Endpoint para obtener las estadísticas del stream de eventos
+@router.get("/stats")
+async def get_stats():
+    return {
+        "status": "success",
+        "data": ticket_events.stats(),
+    }
\ No newline at end of file
@@ -0,0 +1,17 @@
+# app/controllers/sync_controller.py
+
+from fastapi import APIRouter, HTTPException
+
+from app.services.sync_service import sync_worker
+
+router = APIRouter(prefix="/sync")
+
+# Endpoint para obtener el estado de la sincronización de work items
+@router.get("/stats")
+async def get_stats():
+    if sync_worker is None:
+        raise HTTPException(status_code=404, detail="La sincronización de work items está deshabilitada")
+    return {
+        "status": "success",
+        "data": sync_worker.stats(),
+    }
\ No newline at end of file
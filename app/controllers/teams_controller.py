@@ -2,15 +2,17 @@
 
 from fastapi import APIRouter, HTTPException
 
+from app.schemas.teams_schema import BulkAssignSchema, AutoAssignSchema
 from app.services.teams_service import TeamsService
+from app.services.assignment_service import AssignmentService
 
 router = APIRouter(prefix="/teams")
 
 # Endpoint para obtener los miembros de un team
 @router.get("/{team_name}/members")
-def get_members(team_name: str):
+async def get_members(team_name: str):
     try:
-        members = TeamsService.get_team_members(team_name)
+        members = await TeamsService.get_team_members(team_name)
         return {
             "status": "success",
             "data": members,
@@ -20,9 +22,9 @@ def get_members(team_name: str):
 
 # Endpoint para obtener los tickets asignados de un miembro de un team
 @router.get("/{team_name}/members/{member_email}/assigned")
-def get_tickets_by_email(team_name: str, member_email: str):
+async def get_tickets_by_email(team_name: str, member_email: str):
     try:
-        members = TeamsService.get_tickets_by_member(team_name, member_email, 'En evaluacion')
+        members = await TeamsService.get_tickets_by_member(team_name, member_email, 'En evaluacion')
         return {
             "status": "success",
             "data": members,
@@ -32,9 +34,9 @@ def get_tickets_by_email(team_name: str, member_email: str):
 
 # Endpoint para obtener los tickets asignados de todos los miembros de un team
 @router.get("/{team_name}/members/assigned")
-def get_tickets_by_email(team_name: str):
+async def get_tickets_by_email(team_name: str):
     try:
-        members_data = TeamsService.get_team_members(team_name)
+        members_data = await TeamsService.get_team_members(team_name)
         count = members_data.get("count", 0)
         
         # No members found
@@ -46,10 +48,8 @@ def get_tickets_by_email(team_name: str):
         
         members = members_data.get("members", [])
         
-        data = []
-        for member in members:
-            tickets_data = TeamsService.get_tickets_by_member(team_name, member.get("email"), 'En evaluacion')
-            data.append(tickets_data)
+        # Consultar los tickets de todos los miembros a la vez
+        data = await TeamsService.get_tickets_by_members(team_name, [member.get("email") for member in members], 'En evaluacion')
             
         return {
             "status": "success",
@@ -58,11 +58,59 @@ def get_tickets_by_email(team_name: str):
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+# Endpoint para obtener la carga (tickets abiertos) de cada miembro de un team
+@router.get("/{team_name}/members/load")
+async def get_member_loads(team_name: str):
+    try:
+        data = await AssignmentService.get_member_loads(team_name)
+        return {
+            "status": "success",
+            "data": data,
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 # Endpoint para asignar un ticket a un miembro de un team
 @router.put("/{team_name}/members/{member_email}/assign/{ticket_id}")
-def assign_ticket(team_name: str, member_email: str, ticket_id: int):
+async def assign_ticket(team_name: str, member_email: str, ticket_id: int):
+    try:
+        data = await TeamsService.assign_ticket_to_member(team_name, member_email, ticket_id)
+        return {
+            "status": "success",
+            "data": data,
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Endpoint para asignar varios tickets a miembros de un team en una sola solicitud
+@router.post("/{team_name}/bulk-assign")
+async def bulk_assign(team_name: str, bulk_data: BulkAssignSchema):
+    try:
+        data = await TeamsService.bulk_assign(team_name, [assignment.model_dump() for assignment in bulk_data.assignments])
+        return {
+            "status": "success",
+            "data": data,
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Endpoint para asignar un ticket al miembro de un team con menos carga
+@router.post("/{team_name}/auto-assign/{ticket_id}")
+async def auto_assign(team_name: str, ticket_id: int):
+    try:
+        data = await AssignmentService.auto_assign(team_name, ticket_id)
+        return {
+            "status": "success",
+            "data": data,
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Endpoint para repartir varios tickets entre los miembros de un team según su carga
+@router.post("/{team_name}/auto-assign")
+async def auto_assign_many(team_name: str, auto_assign_data: AutoAssignSchema):
     try:
-        data = TeamsService.assign_ticket_to_member(team_name, member_email, ticket_id)
+        data = await AssignmentService.auto_assign_many(team_name, auto_assign_data.ticket_ids)
         return {
             "status": "success",
             "data": data,
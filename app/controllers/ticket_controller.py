@@ -1,25 +1,25 @@
 # app/controllers/ticket_controller.py
 
 import os
-from fastapi import APIRouter, HTTPException, File, UploadFile
-import shutil
-from typing import List
+import mimetypes
+from urllib.parse import quote
 
-from app.services.ticket_service import TicketService
-from app.schemas.ticket_schema import MoveTicketSchema, CreateTicketSchema
+from fastapi import APIRouter, HTTPException, Request, Depends, Query
+from fastapi.responses import Response, StreamingResponse
+from typing import Optional
+
+from app.services.ticket_service import TicketService, SEARCH_DEFAULT_TOP
+from app.services.attachments_service import AttachmentsService
+from app.services.attachment_cache import get_attachment_cache, etag_matches, parse_byte_range, RangeNotSatisfiable
+from app.services.multipart_stream import MultipartFileReader, MULTIPART_FILES_OPENAPI
+from app.schemas.ticket_schema import MoveTicketSchema, CreateTicketSchema, GetTicketsBatchSchema, TicketSearchFilters
 from app.schemas.comments_schema import AddCommentSchema
 
 router = APIRouter()
 
-# Ruta del directorio temporal
-TEMP_DIR = os.path.join(os.path.dirname(__file__), 'tmp')
-
-# Asegurarse de que el directorio temporal existe
-os.makedirs(TEMP_DIR, exist_ok=True)
-
 # Endpoint para mover un ticket de estado
 @router.put("/tickets/{ticket_id}")
-def move_ticket(ticket_id: int, move_ticket_data: MoveTicketSchema):
+async def move_ticket(ticket_id: int, move_ticket_data: MoveTicketSchema):
     try:
         # Obtener el nuevo estado y el user email opcional
         new_state = move_ticket_data.new_state
@@ -29,7 +29,7 @@ def move_ticket(ticket_id: int, move_ticket_data: MoveTicketSchema):
         if (new_state == "Asignado") and not user_email:
             raise HTTPException(status_code=400, detail=f"El correo del usuario (user_email) es obligatorio cuando el estado es '{new_state}'")
         
-        updated_ticket = TicketService.move_ticket(ticket_id, new_state, user_email)
+        updated_ticket = await TicketService.move_ticket(ticket_id, new_state, user_email)
         return {
             "status": "success", 
             "ticket": updated_ticket
@@ -39,9 +39,9 @@ def move_ticket(ticket_id: int, move_ticket_data: MoveTicketSchema):
 
 # Endpoint para obtener un ticket
 @router.get("/tickets/{ticket_id}")
-def get_ticket(ticket_id: int):
+async def get_ticket(ticket_id: int, include_comments: bool = True):
     try:
-        ticket = TicketService.get_ticket_data(ticket_id)
+        ticket = await TicketService.get_ticket_data(ticket_id, include_comments)
         return {
             "status": "success",
             "data": ticket,
@@ -49,20 +49,48 @@ def get_ticket(ticket_id: int):
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+# Endpoint para buscar tickets con filtros y paginación por cursor
+@router.get("/tickets")
+async def search_tickets(
+    filters: TicketSearchFilters = Depends(),
+    top: int = Query(SEARCH_DEFAULT_TOP, alias="$top"),
+    cursor: Optional[int] = None
+):
+    try:
+        tickets = await TicketService.search_tickets(filters, top, cursor)
+        return {
+            "status": "success",
+            "data": tickets,
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Endpoint para obtener varios tickets en una sola solicitud
+@router.post("/tickets/batch")
+async def get_tickets_batch(batch_data: GetTicketsBatchSchema):
+    try:
+        tickets = await TicketService.get_tickets_data(batch_data.ids, batch_data.include_comments, batch_data.include_attachments)
+        return {
+            "status": "success",
+            "data": tickets,
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 # Endpoint para crear un ticket
 @router.post("/tickets")
-def create_ticket(ticket_data: CreateTicketSchema):
+async def create_ticket(ticket_data: CreateTicketSchema):
     try:
-        new_ticket = TicketService.create_ticket(ticket_data.title, ticket_data.description)
+        new_ticket = await TicketService.create_ticket(ticket_data.title, ticket_data.description)
         return {"status": "success", "data": new_ticket}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 # Endpoint para comentar un ticket
 @router.post("/tickets/{ticket_id}/comments")
-def add_comment_to_ticket(ticket_id: int, comment_data: AddCommentSchema):
+async def add_comment_to_ticket(ticket_id: int, comment_data: AddCommentSchema, refresh: bool = False):
     try:
-        result = TicketService.add_comment_to_ticket(ticket_id, comment_data.text)
+        result = await TicketService.add_comment_to_ticket(ticket_id, comment_data.text, refresh)
         return {
             "status": "success", 
             "data": result
@@ -71,30 +99,12 @@ def add_comment_to_ticket(ticket_id: int, comment_data: AddCommentSchema):
         raise HTTPException(status_code=400, detail=str(e))
 
 # Endpoint para adjuntar múltiples archivos
-@router.post("/tickets/{ticket_id}/attach")
-async def attach_files_to_ticket(ticket_id: int, files: List[UploadFile] = File(...), max_files: int = 10):
+@router.post("/tickets/{ticket_id}/attach", openapi_extra=MULTIPART_FILES_OPENAPI)
+async def attach_files_to_ticket(ticket_id: int, request: Request, max_files: int = 10, refresh: bool = False):
     try:
-        # Validar el número de archivos
-        if len(files) > max_files:
-            raise HTTPException(status_code=400, detail=f"El número de archivos no puede exceder {max_files}")
-
-        # Guardar los archivos temporalmente en el servidor
-        file_paths = []
-        
-        # Iterar sobre los archivos recibidos y guardarlos temporalmente
-        for file in files:
-            # Crear la ruta completa del archivo en el directorio temporal
-            file_location = os.path.join(TEMP_DIR, file.filename)
-
-            # Guardar el archivo en la ruta temporal
-            with open(file_location, "wb") as f:
-                shutil.copyfileobj(file.file, f)
-
-            # Agregar la ruta del archivo a la lista
-            file_paths.append(file_location)
-        
-        # Adjuntar los archivos al ticket
-        result = TicketService.attach_files_to_ticket(ticket_id, file_paths, max_files=max_files)
+        # Los archivos se envían a Azure a medida que se reciben, sin guardarlos en el servidor
+        files = MultipartFileReader(request, "files", max_files)
+        result = await TicketService.attach_files_to_ticket(ticket_id, files, refresh=refresh)
         
         # Retornar el resultado
         return {
@@ -103,22 +113,72 @@ async def attach_files_to_ticket(ticket_id: int, files: List[UploadFile] = File(
         }
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
-    finally:
-        # Cerrar los archivos temporales
-        for file in files:
-            file_location = os.path.join(TEMP_DIR, file.filename)
-            file.file.close()
-            os.remove(file_location)
 
 # Endpoint que permite eliminar un archivo adjunto de un ticket
 @router.delete("/tickets/{ticket_id}/attachments")
-def remove_attachment_from_ticket(ticket_id: int, attachmentUrl: str):
+async def remove_attachment_from_ticket(ticket_id: int, attachmentUrl: str, refresh: bool = False):
     try:
         # Llamar al servicio para eliminar el archivo adjunto
-        result = TicketService.remove_attachment_from_ticket(ticket_id, attachmentUrl)
+        result = await TicketService.remove_attachment_from_ticket(ticket_id, attachmentUrl, refresh)
         return {
             "status": "success", 
             "data": result
         }
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+
+
+# Endpoint para descargar el contenido de un archivo adjunto de un ticket
+@router.get("/tickets/{ticket_id}/attachments/{attachment_id}/content")
+async def get_attachment_content(ticket_id: int, attachment_id: str, request: Request):
+    try:
+        attachment = await TicketService.get_attachment(ticket_id, attachment_id)
+        if attachment is None:
+            raise HTTPException(status_code=404, detail=f"El adjunto {attachment_id} no pertenece al ticket {ticket_id}")
+
+        # El contenido de un adjunto nunca cambia, su id sirve como ETag
+        headers = {
+            "ETag": f'"{attachment_id.lower()}"',
+            "Cache-Control": "private, max-age=31536000, immutable",
+            "Accept-Ranges": "bytes",
+            "Content-Disposition": f"inline; filename*=UTF-8''{quote(attachment['name'] or attachment_id)}",
+        }
+        if etag_matches(request.headers.get("If-None-Match"), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        media_type = mimetypes.guess_type(attachment["name"] or "")[0] or "application/octet-stream"
+
+        attachment_cache = get_attachment_cache()
+        path = attachment_cache.get(attachment_id)
+        range_header = request.headers.get("Range")
+        if path is None and range_header is None:
+            # Enviar el archivo a medida que llega de Azure mientras se guarda en el cache
+            chunks = attachment_cache.tee(attachment_id, AttachmentsService.download_attachment(attachment_id))
+            first = await anext(chunks, b"")
+
+            async def body():
+                yield first
+                async for chunk in chunks:
+                    yield chunk
+
+            return StreamingResponse(body(), media_type=media_type, headers=headers)
+
+        if path is None:
+            # Los rangos se sirven desde el disco, por lo que se descarga el archivo completo
+            path = await attachment_cache.fill(attachment_id, AttachmentsService.download_attachment(attachment_id))
+
+        size = os.path.getsize(path)
+        try:
+            byte_range = parse_byte_range(range_header, size)
+        except RangeNotSatisfiable:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+        if byte_range is None:
+            headers["Content-Length"] = str(size)
+            return StreamingResponse(attachment_cache.read(path), media_type=media_type, headers=headers)
+
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(attachment_cache.read(path, start, end), status_code=206, media_type=media_type, headers=headers)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
@@ -1,13 +1,39 @@
 # app/main.py
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.controllers import ticket_controller, reversals_controller, teams_controller
+from app.controllers import ticket_controller, reversals_controller, teams_controller, cache_controller, attachments_controller, hooks_controller, stream_controller, sync_controller, metrics_controller
+from app.middlewares.metrics_middleware import MetricsMiddleware
+from app.services import http_client, attachment_cache
+from app.services.sync_service import sync_worker
 
-app = FastAPI()
+# Abrir y cerrar el pool de conexiones hacia Azure DevOps junto con la aplicación; el cache de
+# adjuntos se crea en cada worker al iniciar y no al importar el módulo
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    http_client.startup()
+    attachment_cache.startup()
+    if sync_worker is not None:
+        sync_worker.start()
+    yield
+    if sync_worker is not None:
+        await sync_worker.stop()
+    await http_client.shutdown()
+
+app = FastAPI(lifespan=lifespan)
+
+# Medir la latencia de cada ruta y las solicitudes a Azure DevOps que genera
+app.add_middleware(MetricsMiddleware)
 
 # Registrar las rutas
 app.include_router(ticket_controller.router)
 app.include_router(reversals_controller.router)
 app.include_router(teams_controller.router)
+app.include_router(cache_controller.router)
+app.include_router(attachments_controller.router)
+app.include_router(hooks_controller.router)
+app.include_router(stream_controller.router)
+app.include_router(sync_controller.router)
+app.include_router(metrics_controller.router)
 
 # Inicia el servidor con: uvicorn app.main:app --reload
\ No newline at end of file
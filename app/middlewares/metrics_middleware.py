@@ -0,0 +1,41 @@
+# app/middlewares/metrics_middleware.py
+
+import time
+
+from app.services import metrics
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mide la latencia de cada solicitud HTTP por ruta y cuenta
+    las solicitudes a Azure DevOps que generó. Se usa la plantilla de la ruta
+    (ej. /reversals/{reversal_id}) para no crear una serie por cada id.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = "500"
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        calls = [0]
+        token = metrics.upstream_calls.set(calls)
+        metrics.http_requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            metrics.http_requests_in_flight.dec()
+            metrics.upstream_calls.reset(token)
+            route = scope.get("route")
+            route_path = route.path if route is not None else "unmatched"
+            metrics.http_request_duration.observe(time.perf_counter() - started, scope["method"], route_path, status)
+            metrics.http_request_upstream_calls.observe(calls[0], scope["method"], route_path)
\ No newline at end of file
@@ -12,6 +12,36 @@ class TicketState(str, Enum):
     aprobado = "Aprobado"
     rechazado = "Rechazado"
 
+# Tipos de eventos publicados cuando cambia un ticket
+class TicketEventType(str, Enum):
+    created = "created"
+    state_changed = "state_changed"
+    assigned = "assigned"
+    comment_added = "comment_added"
+    attachments_changed = "attachments_changed"
+    # Eventos de control del stream, no se guardan en el historial
+    reset = "reset"
+    overflow = "overflow"
+
+# Campos de fecha de un ticket, con el nombre usado en la respuesta
+class TicketDateField(str, Enum):
+    last_time_in_draft = "lastTimeInDraft"
+    last_time_requested = "lastTimeRequested"
+    last_time_assigned = "lastTimeAssigned"
+    last_time_in_evaluation = "lastTimeInEvaluation"
+    last_time_returned = "lastTimeReturned"
+
+# Transiciones de estado permitidas, precalculadas una sola vez
+VALID_TRANSITIONS: dict[TicketState, frozenset[TicketState]] = {
+    TicketState.borrador: frozenset({TicketState.solicitado}),
+    TicketState.solicitado: frozenset({TicketState.asignado}),
+    TicketState.asignado: frozenset({TicketState.en_evaluacion}),
+    TicketState.en_evaluacion: frozenset({TicketState.borrador, TicketState.aprobado, TicketState.rechazado}),
+}
+
+def can_transition(current_state: str, new_state: str) -> bool:
+    return new_state in VALID_TRANSITIONS.get(current_state, frozenset())
+
 # Modelo de ticket
 class Ticket(BaseModel):
     id: int
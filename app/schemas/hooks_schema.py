@@ -0,0 +1,11 @@
+# app/schemas/hooks_schema.py
+
+from pydantic import BaseModel
+from typing import Any, Dict, Optional
+
+# Esquema de un evento de service hooks de Azure DevOps
+class AzureHookEventSchema(BaseModel):
+    id: Optional[str] = None
+    eventType: str
+    resourceVersion: Optional[str] = None
+    resource: Dict[str, Any]
@@ -1,7 +1,7 @@
 # app/schemas/reversal_schema.py
 
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 from app.models.common_model import Client, Advisor
 from app.models.reversal_model import ReversalData
@@ -11,6 +11,13 @@ from app.schemas.ticket_schema import MoveTicketSchema
 class MoveReversalSchema(MoveTicketSchema):
     data: Optional[ReversalData] = None
 
+# Esquema para mover varias reversiones de estado en una sola solicitud
+class BulkMoveReversalItemSchema(MoveReversalSchema):
+    id: int
+
+class BulkMoveReversalsSchema(BaseModel):
+    items: List[BulkMoveReversalItemSchema]
+
 
 # Esquema para crear una nueva reversion
 class CreateReversalSchema(BaseModel):
@@ -0,0 +1,16 @@
+# app/schemas/teams_schema.py
+
+from pydantic import BaseModel
+from typing import List
+
+# Esquema para asignar varios tickets a miembros de un team en una sola solicitud
+class BulkAssignItemSchema(BaseModel):
+    ticket_id: int
+    user_email: str
+
+class BulkAssignSchema(BaseModel):
+    assignments: List[BulkAssignItemSchema]
+
+# Esquema para repartir varios tickets entre los miembros de un team según su carga
+class AutoAssignSchema(BaseModel):
+    ticket_ids: List[int]
@@ -1,8 +1,9 @@
 # app/schemas/ticket_schema.py
 
+from datetime import date
 from pydantic import BaseModel
-from typing import Optional
-from app.models.ticket_model import TicketState
+from typing import List, Optional
+from app.models.ticket_model import TicketState, TicketDateField
 
 # Esquema para mover el ticket de estado
 class MoveTicketSchema(BaseModel):
@@ -13,3 +14,27 @@ class MoveTicketSchema(BaseModel):
 class CreateTicketSchema(BaseModel):
     title: str
     description: str
+
+# Esquema para obtener varios tickets en una sola solicitud
+class GetTicketsBatchSchema(BaseModel):
+    ids: List[int]
+    include_comments: bool = False
+    include_attachments: bool = False
+
+# Filtros para buscar tickets
+class TicketSearchFilters(BaseModel):
+    type: Optional[str] = None
+    state: Optional[TicketState] = None
+    assigned_to: Optional[str] = None
+    area: Optional[str] = None
+    nit: Optional[str] = None
+    obligation_number: Optional[str] = None
+    date_field: Optional[TicketDateField] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+
+# Filtros de la suscripción a los eventos de tickets
+class TicketStreamFilters(BaseModel):
+    team: Optional[str] = None
+    assignee: Optional[str] = None
+    state: Optional[TicketState] = None
@@ -0,0 +1,215 @@
+import time
+import heapq
+import asyncio
+from itertools import count
+from typing import Any, Optional
+
+from app.models.ticket_model import TicketState
+from app.services.event_bus import ticket_events
+from app.services.teams_service import TeamsService
+from app.services.ticket_service import TicketService
+from app.services.work_item_store import work_item_store
+from app.services.wiql_builder import WiqlQuery
+from app.services.common import PROJECT_NAME, AUTO_ASSIGN_INDEX_TTL
+
+# Estados en los que un ticket asignado cuenta como carga de su evaluador. No basta
+# con 'En evaluacion': la asignación automática deja los tickets en 'Asignado', y
+# si no contaran el mismo miembro seguiría recibiendo tickets hasta empezar a evaluarlos.
+OPEN_STATES = [TicketState.solicitado.value, TicketState.asignado.value, TicketState.en_evaluacion.value]
+
+class MemberLoadIndex:
+    """
+    Carga de trabajo de los miembros de un equipo (tickets abiertos asignados a
+    cada uno). Un heap con entradas invalidadas de forma perezosa permite elegir
+    al miembro con menos carga en O(log n); los empates se resuelven por el
+    miembro que lleva más tiempo sin recibir un ticket (round-robin).
+    """
+    def __init__(self, team_name: str, members: list[str], tickets: dict[int, str]):
+        self.area = f"{PROJECT_NAME}\\{team_name}"
+        self.loaded_at = time.monotonic()
+        self._order = count()
+        self._members = {email.lower(): email for email in members}
+        self._load = {email: 0 for email in self._members}
+        self._last_assigned = {email: next(self._order) for email in self._members}
+        self._tickets: dict[int, str] = {}
+        for ticket_id, email in tickets.items():
+            if email and email.lower() in self._members:
+                self._tickets[ticket_id] = email.lower()
+                self._load[email.lower()] += 1
+        self._rebuild()
+
+    def _rebuild(self):
+        self._heap = [(self._load[email], self._last_assigned[email], email) for email in self._members]
+        heapq.heapify(self._heap)
+
+    def _push(self, email: str):
+        heapq.heappush(self._heap, (self._load[email], self._last_assigned[email], email))
+        # Descartar las entradas desactualizadas cuando superan a las vigentes
+        if len(self._heap) > 4 * len(self._members) + 16:
+            self._rebuild()
+
+    def is_expired(self, ttl: float = AUTO_ASSIGN_INDEX_TTL) -> bool:
+        return time.monotonic() - self.loaded_at > ttl
+
+    def pick(self) -> str:
+        """
+        Retorna el correo del miembro con menos carga.
+        """
+        while self._heap:
+            load, last_assigned, email = self._heap[0]
+            if load == self._load[email] and last_assigned == self._last_assigned[email]:
+                return self._members[email]
+            heapq.heappop(self._heap)
+        raise ValueError("El equipo no tiene miembros para asignar tickets")
+
+    def set_ticket(self, ticket_id: int, email: Optional[str]):
+        """
+        Registra el responsable de un ticket abierto, o None si el ticket ya no es carga del equipo.
+        """
+        email = email.lower() if email and email.lower() in self._members else None
+        previous = self._tickets.pop(ticket_id, None)
+        if previous is not None:
+            self._load[previous] -= 1
+            self._push(previous)
+        if email is not None:
+            self._tickets[ticket_id] = email
+            self._load[email] += 1
+            self._push(email)
+
+    def get_ticket(self, ticket_id: int) -> Optional[str]:
+        email = self._tickets.get(ticket_id)
+        return self._members[email] if email is not None else None
+
+    def reserve(self, ticket_id: int) -> str:
+        """
+        Elige al miembro con menos carga y le suma el ticket antes de asignarlo en
+        Azure, para que las asignaciones concurrentes no elijan al mismo miembro.
+        """
+        email = self.pick()
+        self._last_assigned[email.lower()] = next(self._order)
+        self.set_ticket(ticket_id, email)
+        return email
+
+    def apply_event(self, event: dict[str, Any]):
+        """
+        Actualiza el responsable de un ticket con un evento del bus de tickets.
+        """
+        ticket_id, state = event.get("ticketId"), event.get("state")
+        if ticket_id is None or state is None:
+            return
+        if state in OPEN_STATES and event.get("area") == self.area:
+            self.set_ticket(ticket_id, event.get("assignedTo"))
+        elif ticket_id in self._tickets:
+            self.set_ticket(ticket_id, None)
+
+    def loads(self) -> list[dict[str, Any]]:
+        return sorted(
+            (
+                {"member": self._members[email], "load": self._load[email]}
+                for email in self._members
+            ),
+            key=lambda member: (member["load"], self._last_assigned[member["member"].lower()]),
+        )
+
+# Índices de carga por equipo, actualizados con los eventos de tickets
+load_indexes: dict[str, MemberLoadIndex] = {}
+_seed_locks: dict[str, asyncio.Lock] = {}
+
+def apply_event_to_indexes(event: dict[str, Any]):
+    for index in load_indexes.values():
+        index.apply_event(event)
+
+ticket_events.add_listener(apply_event_to_indexes)
+
+class AssignmentService:
+    @staticmethod
+    async def get_load_index(team_name: str) -> MemberLoadIndex:
+        """
+        Retorna el índice de carga del equipo, consultándolo a Azure si no existe o expiró.
+        """
+        index = load_indexes.get(team_name)
+        if index is not None and not index.is_expired():
+            return index
+
+        lock = _seed_locks.setdefault(team_name, asyncio.Lock())
+        async with lock:
+            # Otra solicitud pudo cargar el índice mientras se esperaba el lock
+            index = load_indexes.get(team_name)
+            if index is not None and not index.is_expired():
+                return index
+
+            members_data = await TeamsService.get_team_members(team_name)
+            members = [member["email"] for member in members_data["members"]]
+            tickets = await AssignmentService._get_open_tickets(team_name, members) if members else {}
+            index = MemberLoadIndex(team_name, members, tickets)
+            load_indexes[team_name] = index
+            return index
+
+    @staticmethod
+    async def _get_open_tickets(team_name: str, user_emails: list[str]) -> dict[int, str]:
+        area = f"{PROJECT_NAME}\\{team_name}"
+        if work_item_store is not None and work_item_store.is_fresh():
+            return {
+                ticket_id: email
+                for state in OPEN_STATES
+                for ticket_id, email in work_item_store.query_assigned(state, area, user_emails)
+            }
+
+        # Una sola consulta WIQL para todos los miembros y estados abiertos
+        query = (
+            WiqlQuery()
+            .where_in("System.AssignedTo", user_emails)
+            .where_in("System.State", OPEN_STATES)
+            .where("System.AreaPath", "=", area)
+        )
+        ids = await TicketService.query_work_item_ids(query, team_name=team_name)
+        work_items = await TicketService.get_work_items_batch(ids, ["System.Id", "System.AssignedTo"]) if ids else []
+        return {
+            item["id"]: (item.get("fields", {}).get("System.AssignedTo") or {}).get("uniqueName", "")
+            for item in work_items
+        }
+
+    @staticmethod
+    async def get_member_loads(team_name: str):
+        index = await AssignmentService.get_load_index(team_name)
+        return index.loads()
+
+    @staticmethod
+    async def auto_assign(team_name: str, ticket_id: int):
+        """
+        Asigna un ticket al miembro del equipo con menos tickets abiertos.
+        """
+        result = await AssignmentService.auto_assign_many(team_name, [ticket_id])
+        # Misma transición que la asignación en lote: los tickets solicitados pasan a 'Asignado'
+        item = result["results"][0]
+        if item["status"] != "success":
+            raise ValueError(item["error"])
+        return {
+            "ticket_id": ticket_id,
+            "assigned_to": item["assigned_to"],
+            "state": item["state"],
+        }
+
+    @staticmethod
+    async def auto_assign_many(team_name: str, ticket_ids: list[int]):
+        """
+        Reparte varios tickets entre los miembros del equipo según su carga y los
+        asigna con el API $batch.
+        """
+        if len(set(ticket_ids)) != len(ticket_ids):
+            raise ValueError("No se puede asignar el mismo ticket más de una vez en la misma solicitud")
+
+        index = await AssignmentService.get_load_index(team_name)
+        previous = {ticket_id: index.get_ticket(ticket_id) for ticket_id in ticket_ids}
+        assignments = [{"ticket_id": ticket_id, "user_email": index.reserve(ticket_id)} for ticket_id in ticket_ids]
+        try:
+            result = await TeamsService.bulk_assign(team_name, assignments)
+        except BaseException:
+            for ticket_id in ticket_ids:
+                index.set_ticket(ticket_id, previous[ticket_id])
+            raise
+
+        for item in result["results"]:
+            if item["status"] != "success":
+                index.set_ticket(item["ticket_id"], previous[item["ticket_id"]])
+        return result
@@ -0,0 +1,200 @@
+import os
+import re
+import time
+import uuid
+import threading
+from typing import AsyncIterator, Optional
+
+import anyio
+
+from app.services.common import ATTACHMENT_CACHE_DIR, ATTACHMENT_CACHE_MAX_BYTES, ATTACHMENT_CACHE_STALE_PART_AGE
+
+# Los adjuntos se identifican por su GUID, que también es el nombre del archivo en disco
+ATTACHMENT_ID_PATTERN = re.compile(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$")
+
+class RangeNotSatisfiable(ValueError):
+    """
+    El rango solicitado está fuera del tamaño del adjunto.
+    """
+
+def parse_byte_range(header: Optional[str], size: int) -> Optional[tuple[int, int]]:
+    """
+    Interpreta un header Range de un solo rango y retorna (inicio, fin) inclusive.
+    Retorna None si no hay rango o si no se soporta (ej. varios rangos), en cuyo
+    caso se responde el archivo completo.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start, _, end = header[len("bytes="):].strip().partition("-")
+    if not (start.isdigit() or start == "") or not (end.isdigit() or end == "") or start == end == "":
+        return None
+
+    if start == "":
+        # Sufijo: los últimos N bytes
+        length = int(end)
+        if length == 0:
+            raise RangeNotSatisfiable(header)
+        return max(size - length, 0), size - 1
+
+    start = int(start)
+    end = int(end) if end else size - 1
+    if start >= size or end < start:
+        raise RangeNotSatisfiable(header)
+    return start, min(end, size - 1)
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """
+    Indica si un header If-None-Match incluye el ETag. El header es una lista
+    separada por comas y se usa la comparación débil: se ignora el prefijo W/.
+    """
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+class AttachmentCache:
+    """
+    Cache en disco del contenido de los adjuntos, acotado por tamaño total con
+    desalojo LRU. Los adjuntos de Azure no cambian una vez subidos, por lo que
+    las entradas no expiran.
+    """
+    def __init__(
+        self,
+        directory: str = ATTACHMENT_CACHE_DIR,
+        max_bytes: int = ATTACHMENT_CACHE_MAX_BYTES,
+        stale_part_age: float = ATTACHMENT_CACHE_STALE_PART_AGE,
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        # Eliminar descargas abandonadas y calcular el tamaño actual. Otros procesos
+        # que comparten el directorio pueden tener descargas en curso, que siguen
+        # escribiendo en su archivo temporal y por lo tanto no se consideran abandonadas
+        self.total_bytes = 0
+        stale_before = time.time() - stale_part_age
+        for entry in os.scandir(directory):
+            try:
+                if not entry.name.endswith(".part"):
+                    if entry.is_file():
+                        self.total_bytes += entry.stat().st_size
+                elif entry.stat().st_mtime < stale_before:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                # Otro proceso terminó, desalojó o eliminó el archivo mientras se recorría
+                pass
+
+    def _path(self, attachment_id: str) -> str:
+        if not ATTACHMENT_ID_PATTERN.match(attachment_id):
+            raise ValueError(f"Identificador de adjunto inválido: {attachment_id}")
+        return os.path.join(self.directory, attachment_id.lower())
+
+    def get(self, attachment_id: str) -> Optional[str]:
+        """
+        Retorna la ruta del adjunto en disco, o None si no está en cache.
+        """
+        path = self._path(attachment_id)
+        try:
+            # Actualizar la fecha de acceso para el desalojo LRU
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    async def tee(self, attachment_id: str, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        """
+        Retorna los bloques recibidos mientras los guarda en disco. El archivo
+        solo se agrega al cache si la descarga termina completa.
+        """
+        path = self._path(attachment_id)
+        part_path = f"{path}.{uuid.uuid4().hex}.part"
+        size = 0
+        try:
+            async with await anyio.open_file(part_path, "wb") as file:
+                async for chunk in chunks:
+                    await file.write(chunk)
+                    size += len(chunk)
+                    yield chunk
+        except BaseException:
+            os.remove(part_path)
+            raise
+
+        with self._lock:
+            # Otra descarga concurrente del mismo adjunto pudo terminar primero
+            previous = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(part_path, path)
+            self.total_bytes += size - previous
+        await anyio.to_thread.run_sync(self._evict)
+
+    async def fill(self, attachment_id: str, chunks: AsyncIterator[bytes]) -> str:
+        """
+        Descarga el adjunto completo al cache y retorna su ruta.
+        """
+        async for _ in self.tee(attachment_id, chunks):
+            pass
+        return self._path(attachment_id)
+
+    def _evict(self):
+        with self._lock:
+            if self.total_bytes <= self.max_bytes:
+                return
+            entries = sorted(
+                (entry for entry in os.scandir(self.directory) if entry.is_file() and not entry.name.endswith(".part")),
+                key=lambda entry: entry.stat().st_mtime,
+            )
+            for entry in entries:
+                if self.total_bytes <= self.max_bytes:
+                    break
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                self.total_bytes -= size
+                self.evictions += 1
+
+    @staticmethod
+    async def read(path: str, start: int = 0, end: Optional[int] = None, chunk_size: int = 64 * 1024) -> AsyncIterator[bytes]:
+        """
+        Lee un archivo del cache en bloques, desde `start` hasta `end` (inclusive).
+        """
+        async with await anyio.open_file(path, "rb") as file:
+            await file.seek(start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                chunk = await file.read(chunk_size if remaining is None else min(chunk_size, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    def stats(self):
+        return {
+            "size_bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+_cache: Optional[AttachmentCache] = None
+
+def startup():
+    """
+    Crea el cache compartido de descargas de adjuntos. Se llama al iniciar la aplicación.
+    """
+    global _cache
+    if _cache is None:
+        _cache = AttachmentCache()
+
+def get_attachment_cache() -> AttachmentCache:
+    # Crear el cache de forma perezosa si no se llamó a `startup` (ej. pruebas sin lifespan)
+    if _cache is None:
+        startup()
+    return _cache
@@ -0,0 +1,86 @@
+import time
+import sqlite3
+import threading
+from typing import Any, Optional
+
+from app.services.common import ATTACHMENT_DEDUP, ATTACHMENT_INDEX_PATH, ATTACHMENT_INDEX_MAX_ENTRIES
+
+class AttachmentIndex:
+    """
+    Índice local en SQLite que relaciona el hash SHA-256 del contenido de un
+    archivo con la URL del adjunto ya subido a Azure DevOps, para no volver a
+    subir archivos repetidos. Solo aplica a archivos de hasta ATTACHMENT_CHUNK_SIZE
+    bytes: el hash se debe conocer antes de elegir cómo subir el archivo, y los
+    más grandes se suben por bloques a medida que llegan, sin guardarlos.
+    """
+    def __init__(self, path: str = ATTACHMENT_INDEX_PATH, max_entries: int = ATTACHMENT_INDEX_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS attachments ("
+            "hash TEXT PRIMARY KEY, url TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, used_at REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS attachments_used_at ON attachments (used_at)")
+        # Los contadores se guardan aparte para conservarlos aunque se desalojen entradas
+        self._conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+    def _increment(self, name: str, value: int = 1):
+        self._conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, value),
+        )
+
+    def get(self, content_hash: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT url FROM attachments WHERE hash = ?", (content_hash,)).fetchone()
+            return row[0] if row else None
+
+    def put(self, content_hash: str, url: str, size: int):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO attachments (hash, url, size, created_at, used_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(hash) DO UPDATE SET used_at = excluded.used_at",
+                (content_hash, url, size, now, now),
+            )
+            self._increment("uploads")
+            self._increment("bytes_uploaded", size)
+
+            # Desalojar los archivos usados hace más tiempo si se supera el límite
+            overflow = self._conn.execute("SELECT COUNT(*) FROM attachments").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM attachments WHERE hash IN (SELECT hash FROM attachments ORDER BY used_at LIMIT ?)",
+                    (overflow,),
+                )
+                self._increment("evictions", overflow)
+
+    def record_hit(self, content_hash: str, size: int):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE attachments SET used_at = ?, hits = hits + 1 WHERE hash = ?",
+                (time.time(), content_hash),
+            )
+            self._increment("hits")
+            self._increment("bytes_saved", size)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            counters = dict(self._conn.execute("SELECT name, value FROM counters").fetchall())
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM attachments").fetchone()
+        return {
+            "entries": entries,
+            "indexed_bytes": size,
+            "uploads": counters.get("uploads", 0),
+            "bytes_uploaded": counters.get("bytes_uploaded", 0),
+            "hits": counters.get("hits", 0),
+            "bytes_saved": counters.get("bytes_saved", 0),
+            "evictions": counters.get("evictions", 0),
+        }
+
+# Índice compartido por los servicios, deshabilitado con ATTACHMENT_DEDUP=false
+attachment_index = AttachmentIndex() if ATTACHMENT_DEDUP else None
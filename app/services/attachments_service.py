@@ -1,68 +1,254 @@
 import os
-import requests
+import asyncio
+import hashlib
+from typing import Any, AsyncIterable, AsyncIterator, Optional
+from urllib.parse import quote, urlsplit, urlunsplit, parse_qsl, urlencode
 
-from app.services.common import AZURE_ORG_URL, PROJECT_NAME, create_headers
+from app.services import http_client
+from app.services.multipart_stream import FileStream
+from app.services.attachment_index import attachment_index
+from app.services.common import (
+    AZURE_ORG_URL,
+    PROJECT_NAME,
+    ATTACHMENT_CHUNK_SIZE,
+    ATTACHMENT_UPLOAD_CONCURRENCY,
+    ATTACHMENT_UPLOAD_GLOBAL_CONCURRENCY,
+    create_headers,
+)
+
+async def rechunk(chunks: AsyncIterator[bytes], size: int) -> AsyncIterator[bytes]:
+    """
+    Reagrupa un flujo de bytes en bloques de tamaño fijo (el último puede ser menor).
+    """
+    buffer = bytearray()
+    async for chunk in chunks:
+        buffer.extend(chunk)
+        while len(buffer) >= size:
+            yield bytes(buffer[:size])
+            del buffer[:size]
+    if buffer:
+        yield bytes(buffer)
+
+def rename_attachment_url(url: str, file_name: str) -> str:
+    """
+    Cambia el nombre de archivo de la URL de un adjunto existente. Azure identifica
+    el adjunto por su GUID y usa `fileName` solo como nombre de descarga.
+    """
+    parts = urlsplit(url)
+    query = [(key, value) for key, value in parse_qsl(parts.query) if key != "fileName"]
+    query.append(("fileName", file_name))
+    return urlunsplit(parts._replace(query=urlencode(query, quote_via=quote)))
+
+class AttachmentUploadError(ValueError):
+    """
+    Error al adjuntar archivos. Incluye los archivos que alcanzaron a subirse
+    a Azure pero no quedaron adjuntos al ticket.
+    """
+    def __init__(self, message: str, uploaded: list[tuple[str, str]]):
+        self.uploaded = uploaded
+        if uploaded:
+            names = ", ".join(f"{name} ({url})" for name, url in uploaded)
+            message = f"{message}. Archivos subidos sin adjuntar al ticket: {names}"
+        super().__init__(message)
+
+# Límite de cargas simultáneas hacia Azure para todo el proceso
+_global_upload_semaphore = asyncio.Semaphore(ATTACHMENT_UPLOAD_GLOBAL_CONCURRENCY)
 
 class AttachmentsService:
     @staticmethod
-    def upload_attachment(file_path: str):
-        
-        # Extraer el nombre del archivo de manera compatible con Linux y Windows
-        file_name = os.path.basename(file_path)
-
-        # Construir la URL usando el nombre del archivo extraído
-        url = f"{AZURE_ORG_URL}/{PROJECT_NAME}/_apis/wit/attachments?fileName={file_name}&api-version=7.1"
-        
-        with open(file_path, 'rb') as file:
-            response = requests.post(url, headers=create_headers(content_type="application/octet-stream"), data=file)
-
-            if response.status_code in [200, 201]:
-                return response.json()["url"]
+    async def upload_attachment(file_name: str, chunks: AsyncIterator[bytes], size: Optional[int] = None) -> dict[str, Any]:
+        """
+        Sube un archivo a Azure DevOps a medida que se lee, calculando su hash SHA-256.
+        Si el archivo cabe en un bloque se envía en una sola solicitud, y si su
+        contenido ya fue subido antes se reutiliza el adjunto existente. Los archivos
+        más grandes que ATTACHMENT_CHUNK_SIZE usan la carga por bloques de Azure,
+        se conozca o no su tamaño de antemano.
+        """
+        if size is not None and size > ATTACHMENT_CHUNK_SIZE:
+            return await AttachmentsService.upload_attachment_chunked(file_name, chunks, size)
+
+        # Leer el inicio del archivo: si cabe en un bloque se envía completo y se puede reintentar
+        chunks = aiter(chunks)
+        first = bytearray()
+        async for chunk in chunks:
+            first.extend(chunk)
+            if len(first) > ATTACHMENT_CHUNK_SIZE:
+                break
+        else:
+            chunks = None
+
+        if chunks is not None:
+            # Sin Content-Length en la parte multipart el tamaño se conoce al terminar de leer
+            async def remaining():
+                head = bytes(first)
+                first.clear()
+                yield head
+                async for chunk in chunks:
+                    yield chunk
+
+            return await AttachmentsService.upload_attachment_chunked(file_name, remaining())
+
+        content_hash = hashlib.sha256(first).hexdigest()
+
+        # Reutilizar el adjunto si el mismo contenido ya fue subido
+        existing_url = attachment_index.get(content_hash) if attachment_index else None
+        if existing_url:
+            return {
+                "url": rename_attachment_url(existing_url, file_name),
+                "hash": content_hash,
+                "size": len(first),
+                "deduplicated": True,
+            }
+
+        # Construir la URL usando el nombre del archivo
+        url = f"{AZURE_ORG_URL}/{PROJECT_NAME}/_apis/wit/attachments?fileName={quote(file_name)}&api-version=7.1"
+        response = await http_client.post(url, headers=create_headers(content_type="application/octet-stream"), content=bytes(first))
+
+        if response.status_code in [200, 201]:
+            return {
+                "url": response.json()["url"],
+                "hash": content_hash,
+                "size": len(first),
+                "deduplicated": False,
+            }
+        else:
+            raise ValueError(f"Error al subir el archivo: {response.status_code} - {response.content.decode()}")
+
+    @staticmethod
+    async def upload_attachment_chunked(file_name: str, chunks: AsyncIterator[bytes], size: Optional[int] = None) -> dict[str, Any]:
+        """
+        Sube un archivo con el protocolo por bloques de Azure DevOps (uploadType=Chunked).
+        Cada bloque se envía por separado, por lo que se puede reintentar. Si no se
+        conoce el tamaño, los bloques intermedios se envían con total `*` y el último
+        con el tamaño final, por lo que se lee un bloque por adelantado.
+        """
+        # Iniciar la carga para obtener el id del adjunto
+        url = f"{AZURE_ORG_URL}/{PROJECT_NAME}/_apis/wit/attachments?fileName={quote(file_name)}&uploadType=Chunked&api-version=7.1"
+        response = await http_client.post(url, headers=create_headers(content_type="application/octet-stream"), content=b"")
+        if response.status_code not in [200, 201]:
+            raise ValueError(f"Error al iniciar la carga del archivo: {response.status_code} - {response.content.decode()}")
+
+        attachment = response.json()
+        url = f"{AZURE_ORG_URL}/{PROJECT_NAME}/_apis/wit/attachments/{attachment['id']}?fileName={quote(file_name)}&uploadType=Chunked&api-version=7.1"
+
+        digest = hashlib.sha256()
+        offset = 0
+        blocks = aiter(rechunk(chunks, ATTACHMENT_CHUNK_SIZE))
+        block = await anext(blocks, None)
+        while block is not None:
+            next_block = await anext(blocks, None)
+            if size is not None:
+                total = size
             else:
+                total = offset + len(block) if next_block is None else "*"
+
+            headers = create_headers(content_type="application/octet-stream")
+            headers["Content-Range"] = f"bytes {offset}-{offset + len(block) - 1}/{total}"
+            response = await http_client.put(url, headers=headers, content=block)
+            if response.status_code not in [200, 201]:
                 raise ValueError(f"Error al subir el archivo: {response.status_code} - {response.content.decode()}")
+            digest.update(block)
+            offset += len(block)
+            block = next_block
+
+        if size is not None and offset != size:
+            raise ValueError(f"El archivo {file_name} tiene {offset} bytes, se esperaban {size}")
+        return {
+            "url": attachment["url"],
+            "hash": digest.hexdigest(),
+            "size": offset,
+            "deduplicated": False,
+        }
 
     # Método para adjuntar múltiples archivos a un ticket
     @staticmethod
-    def attach_files_to_ticket(ticket_id: int, file_paths: list[str]):
+    async def attach_files_to_ticket(ticket_id: int, files: AsyncIterable[FileStream]):
+        # Subir los archivos en paralelo a medida que se reciben, con un límite por
+        # solicitud y otro global para todo el proceso
+        semaphore = asyncio.Semaphore(ATTACHMENT_UPLOAD_CONCURRENCY)
+        uploaded: dict[int, tuple[str, str]] = {}
+        uploads: list[dict[str, Any]] = []
+        attachments: dict[int, tuple[str, str]] = {}
+
+        async def upload(index: int, file: FileStream):
+            async with semaphore, _global_upload_semaphore:
+                result = await AttachmentsService.upload_attachment(file.filename, file.chunks(), file.size)
+            uploads.append(result)
+            # Los adjuntos reutilizados ya existían, no quedan huérfanos si algo falla
+            if not result["deduplicated"]:
+                uploaded[index] = (file.filename, result["url"])
+            attachments[index] = (file.filename, result["url"])
+
+        stream = aiter(files)
+        try:
+            async with asyncio.TaskGroup() as group:
+                index = 0
+                async for file in stream:
+                    group.create_task(upload(index, file))
+                    index += 1
+        except ExceptionGroup as errors:
+            # Al fallar una carga se cancelan las demás y se reportan las ya subidas
+            raise AttachmentUploadError(str(errors.exceptions[0]), [uploaded[i] for i in sorted(uploaded)])
+        finally:
+            # Detener la lectura del cuerpo de la solicitud si quedó pendiente
+            if hasattr(stream, "aclose"):
+                await stream.aclose()
 
-        # Subir cada archivo y adjuntarlo al ticket
-        relations = []
-        for file_path in file_paths:
-            attachment_url = AttachmentsService.upload_attachment(file_path)
-            relations.append({
+        if not attachments:
+            raise ValueError("No se recibieron archivos para adjuntar")
+
+        relations = [
+            {
                 "op": "add",
                 "path": "/relations/-",
                 "value": {
                     "rel": "AttachedFile",
                     "url": attachment_url,
                     "attributes": {
-                        "comment": f"Archivo adjunto: {os.path.basename(file_path).split('/')[-1]}"
+                        "comment": f"Archivo adjunto: {os.path.basename(file_name)}"
                     }
                 }
-            })
+            }
+            for file_name, attachment_url in (attachments[i] for i in sorted(attachments))
+        ]
 
-        # Enviar la solicitud para adjuntar los archivos al ticket
-        url = f"{AZURE_ORG_URL}/{PROJECT_NAME}/_apis/wit/workitems/{ticket_id}?api-version=7.1"
-        response = requests.patch(url, headers=create_headers(), json=relations)
+        # Enviar la solicitud para adjuntar los archivos al ticket una vez subidos todos
+        url = f"{AZURE_ORG_URL}/{PROJECT_NAME}/_apis/wit/workitems/{ticket_id}?$expand=relations&api-version=7.1"
+        response = await http_client.patch(url, headers=create_headers(), json=relations)
         if response.status_code in [200, 201]:
-            data = response.json()
-            return {
-                "attachments": [
-                    {
-                        "url": r["url"], 
-                        "comment": r["attributes"]["comment"], 
-                        "name": r["attributes"]["name"]
-                    } 
-                    for r in data["relations"]
-                ],
-            }
+            # Registrar en el índice los archivos ya adjuntos para reutilizarlos. Solo se
+            # buscan los archivos de un bloque, los más grandes nunca se encontrarían
+            if attachment_index:
+                for result in uploads:
+                    if result["deduplicated"]:
+                        attachment_index.record_hit(result["hash"], result["size"])
+                    elif result["size"] <= ATTACHMENT_CHUNK_SIZE:
+                        attachment_index.put(result["hash"], result["url"], result["size"])
+            # Retornar el work item actualizado con sus relaciones
+            return response.json()
         else:
-            raise ValueError(f"Error al adjuntar archivos al ticket {ticket_id}: {response.status_code} - {response.content.decode()}")
+            raise AttachmentUploadError(
+                f"Error al adjuntar archivos al ticket {ticket_id}: {response.status_code} - {response.content.decode()}",
+                [uploaded[i] for i in sorted(uploaded)],
+            )
+
+    @staticmethod
+    async def download_attachment(attachment_id: str) -> AsyncIterator[bytes]:
+        """
+        Descarga el contenido de un adjunto de Azure DevOps en bloques.
+        """
+        url = f"{AZURE_ORG_URL}/{PROJECT_NAME}/_apis/wit/attachments/{attachment_id}?download=true&api-version=7.1"
+        async with http_client.stream("GET", url, headers=create_headers()) as response:
+            if response.status_code != 200:
+                await response.aread()
+                raise ValueError(f"Error al descargar el adjunto {attachment_id}: {response.status_code} - {response.content.decode()}")
+            async for chunk in response.aiter_bytes():
+                yield chunk
 
     @staticmethod
-    def remove_attachment_from_ticket(ticket_id: int, attachment_index: int):
+    async def remove_attachment_from_ticket(ticket_id: int, attachment_index: int, rev: Optional[int] = None):
         # URL para actualizar el Work Item en Azure DevOps
-        url = f"{AZURE_ORG_URL}/{PROJECT_NAME}/_apis/wit/workitems/{ticket_id}?api-version=7.1"
+        url = f"{AZURE_ORG_URL}/{PROJECT_NAME}/_apis/wit/workitems/{ticket_id}?$expand=relations&api-version=7.1"
 
         # Payload para eliminar la relación del archivo adjunto
         payload = [
@@ -71,11 +257,17 @@ class AttachmentsService:
                 "path": f"/relations/{attachment_index}"
             }
         ]
+        # Verificar que las relaciones no hayan cambiado desde la lectura
+        if rev is not None:
+            payload.insert(0, {"op": "test", "path": "/rev", "value": rev})
 
         # Hacer la solicitud PATCH para eliminar la relación de adjunto
-        response = requests.patch(url, headers=create_headers(), json=payload)
+        response = await http_client.patch(url, headers=create_headers(), json=payload)
 
         if response.status_code in [200, 201]:
-            return {"status": "success", "ticket_id": ticket_id, "attachment_index": attachment_index}
+            # Retornar el work item actualizado con sus relaciones
+            return response.json()
+        elif response.status_code in [409, 412]:
+            raise ValueError(f"El ticket {ticket_id} fue modificado por otro usuario, intente nuevamente")
         else:
             raise ValueError(f"Error al eliminar el archivo adjunto: {response.status_code} - {response.content.decode()}")
\ No newline at end of file
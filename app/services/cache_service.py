@@ -0,0 +1,245 @@
+import json
+import time
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Optional
+
+from app.services.common import (
+    TICKET_CACHE_BACKEND,
+    TICKET_CACHE_TTL,
+    TICKET_CACHE_MAX_ENTRIES,
+    TICKET_CACHE_PATH,
+)
+from app.services.single_flight import SingleFlight
+
+class CacheBackend(ABC):
+    """
+    Interfaz de almacenamiento del cache. Los valores se guardan serializados
+    para que cada lectura retorne una copia independiente.
+    """
+    def __init__(self):
+        self.evictions = 0
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[dict[str, Any]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def set(self, key: str, value: dict[str, Any], ttl: float):
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    def clear(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def size(self) -> int:
+        raise NotImplementedError
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    Cache en memoria del proceso con expiración y desalojo LRU.
+    """
+    def __init__(self, max_entries: int = TICKET_CACHE_MAX_ENTRIES):
+        super().__init__()
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return json.loads(value)
+
+    def set(self, key: str, value: dict[str, Any], ttl: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, json.dumps(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def size(self) -> int:
+        return len(self._entries)
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    Cache en un archivo SQLite local, compartido entre los workers de uvicorn.
+    """
+    def __init__(self, path: str = TICKET_CACHE_PATH, max_entries: int = TICKET_CACHE_MAX_ENTRIES):
+        super().__init__()
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at)")
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+            return json.loads(row[0])
+
+    def set(self, key: str, value: dict[str, Any], ttl: float):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + ttl, now),
+            )
+            # Desalojar las entradas usadas hace más tiempo si se supera el límite
+            overflow = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed_at LIMIT ?)",
+                    (overflow,),
+                )
+                self.evictions += overflow
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+
+    def size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+class TicketCache:
+    """
+    Cache de lectura de tickets por id, validado con la revisión (System.Rev).
+    """
+    def __init__(self, backend: Optional[CacheBackend], ttl: float = TICKET_CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # Lecturas a Azure en curso por (id, include_comments), compartidas entre solicitudes
+        self.reads = SingleFlight("ticket_reads")
+
+    @staticmethod
+    def _key(ticket_id: int) -> str:
+        return f"ticket:{ticket_id}"
+
+    def get(self, ticket_id: int, include_comments: bool = True) -> Optional[dict[str, Any]]:
+        if self.backend is None:
+            return None
+
+        entry = self.backend.get(self._key(ticket_id))
+        # Las entradas invalidadas se guardan sin datos para conservar su revisión
+        if entry is None or entry["data"] is None or (include_comments and not entry["include_comments"]):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        data = entry["data"]
+        if not include_comments:
+            data["comments"] = []
+        return data
+
+    def put(self, ticket_data: dict[str, Any], include_comments: bool = True):
+        if self.backend is None:
+            return
+
+        key = self._key(ticket_data["id"])
+        rev = ticket_data.get("azure", {}).get("System.Rev")
+
+        # No reemplazar una revisión más reciente con una lectura anterior
+        current = self.backend.get(key)
+        if current is not None and rev is not None and (current["rev"] or 0) > rev:
+            return
+        if current is not None and current["rev"] == rev and current["include_comments"] and not include_comments:
+            return
+
+        self.backend.set(key, {"rev": rev, "include_comments": include_comments, "data": ticket_data}, self.ttl)
+
+    def peek(self, ticket_id: int) -> Optional[dict[str, Any]]:
+        """
+        Retorna la entrada guardada (revisión y datos) sin contarla en las estadísticas.
+        """
+        if self.backend is None:
+            return None
+        return self.backend.get(self._key(ticket_id))
+
+    def replace(self, ticket_data: dict[str, Any], include_comments: bool = True, ttl: Optional[float] = None):
+        """
+        Guarda un ticket sin validar la revisión. Quien llama debe haberla verificado con `peek`.
+        """
+        if self.backend is None:
+            return
+        rev = ticket_data.get("azure", {}).get("System.Rev")
+        self.backend.set(self._key(ticket_data["id"]), {"rev": rev, "include_comments": include_comments, "data": ticket_data}, ttl or self.ttl)
+
+    def invalidate(self, ticket_id: int, rev: Optional[int] = None, ttl: Optional[float] = None):
+        """
+        Invalida un ticket tras una mutación. Si se conoce la nueva revisión se
+        conserva para descartar lecturas concurrentes más antiguas.
+        """
+        # Las lecturas en curso son anteriores a la mutación y no se comparten más
+        self.reads.forget((ticket_id, True))
+        self.reads.forget((ticket_id, False))
+        if self.backend is None:
+            return
+
+        key = self._key(ticket_id)
+        if rev is None:
+            self.backend.delete(key)
+        else:
+            self.backend.set(key, {"rev": rev, "include_comments": False, "data": None}, ttl or self.ttl)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "backend": type(self.backend).__name__ if self.backend else None,
+            "size": self.backend.size() if self.backend else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.backend.evictions if self.backend else 0,
+            "coalesced": self.reads.coalesced,
+        }
+
+def create_backend(name: str = TICKET_CACHE_BACKEND) -> Optional[CacheBackend]:
+    if name == "memory":
+        return MemoryCacheBackend()
+    elif name == "sqlite":
+        return SQLiteCacheBackend()
+    elif name == "none":
+        return None
+    else:
+        raise ValueError(f"Backend de cache no soportado: {name}")
+
+# Cache compartido por los servicios
+ticket_cache = TicketCache(create_backend())
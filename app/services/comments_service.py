@@ -1,17 +1,16 @@
-import requests
-
+from app.services import http_client
 from app.services.common import AZURE_ORG_URL, PROJECT_NAME, create_headers
 
 class CommentsService:
     @staticmethod
-    def add_comment_to_ticket(ticket_id: int, comment: str):
+    async def add_comment_to_ticket(ticket_id: int, comment: str):
         # Agregar un comentario a un ticket de Azure DevOps
         url = f"{AZURE_ORG_URL}/{PROJECT_NAME}/_apis/wit/workItems/{ticket_id}/comments?api-version=7.0-preview.3"
         payload = {
             "text": comment
         }
 
-        response = requests.post(url, headers=create_headers(content_type="application/json"), json=payload)
+        response = await http_client.post(url, headers=create_headers(content_type="application/json"), json=payload)
 
         if response.status_code in [200, 201]:
             data = response.json()
@@ -20,14 +19,15 @@ class CommentsService:
                 "ticket_id": data["workItemId"],
                 "comment_id": data["id"],
                 "comment_text": payload["text"],
+                "created_date": data.get("createdDate", ""),
             }
         else:
             raise ValueError(f"Error al agregar comentario al ticket {ticket_id}: {response.status_code} - {response.content.decode()}")
     
     @staticmethod
-    def get_comments_of_a_ticket(ticket_id):
+    async def get_comments_of_a_ticket(ticket_id):
         url = f"{AZURE_ORG_URL}/{PROJECT_NAME}/_apis/wit/workitems/{ticket_id}/comments?$api-version=7.1-preview.4"
-        response = requests.get(url, headers=create_headers())
+        response = await http_client.get(url, headers=create_headers())
 
         if response.status_code in [200, 201]:
             comments = [{
@@ -27,4 +27,76 @@ def create_headers(
     return {
         "Content-Type": content_type,
         "Authorization": get_auth_header(username, password)
-    }
\ No newline at end of file
+    }
+
+# Configuración del cliente HTTP compartido
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 100))
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', 5))
+HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', 30))
+HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', 3))
+HTTP_BACKOFF_FACTOR = float(os.getenv('HTTP_BACKOFF_FACTOR', 0.5))
+HTTP_MAX_RETRY_AFTER = float(os.getenv('HTTP_MAX_RETRY_AFTER', 60))
+
+# Límite de solicitudes por segundo a Azure DevOps con el PAT (0 para limitar solo según los headers X-RateLimit-*)
+AZURE_RATE_LIMIT = float(os.getenv('AZURE_RATE_LIMIT', 0))
+AZURE_RATE_BURST = float(os.getenv('AZURE_RATE_BURST', 200))
+
+# Configuración del cache de tickets (memory | sqlite | none)
+TICKET_CACHE_BACKEND = os.getenv('TICKET_CACHE_BACKEND', 'memory')
+TICKET_CACHE_TTL = float(os.getenv('TICKET_CACHE_TTL', 30))
+TICKET_CACHE_MAX_ENTRIES = int(os.getenv('TICKET_CACHE_MAX_ENTRIES', 1000))
+TICKET_CACHE_PATH = os.getenv('TICKET_CACHE_PATH', 'ticket_cache.sqlite3')
+
+# Número máximo de consultas de comentarios simultáneas en las consultas en lote
+BATCH_COMMENTS_CONCURRENCY = int(os.getenv('BATCH_COMMENTS_CONCURRENCY', 10))
+
+# Número máximo de consultas simultáneas al consultar los miembros de un equipo uno a uno
+TEAM_FAN_OUT_CONCURRENCY = int(os.getenv('TEAM_FAN_OUT_CONCURRENCY', 8))
+
+# Configuración de la carga de adjuntos en streaming
+ATTACHMENT_CHUNK_SIZE = int(os.getenv('ATTACHMENT_CHUNK_SIZE', 8 * 1024 * 1024))
+UPLOAD_QUEUE_SIZE = int(os.getenv('UPLOAD_QUEUE_SIZE', 4))
+ATTACHMENT_UPLOAD_CONCURRENCY = int(os.getenv('ATTACHMENT_UPLOAD_CONCURRENCY', 4))
+ATTACHMENT_UPLOAD_GLOBAL_CONCURRENCY = int(os.getenv('ATTACHMENT_UPLOAD_GLOBAL_CONCURRENCY', 32))
+
+# Configuración del índice de adjuntos por contenido (deduplicación de archivos de hasta un bloque)
+ATTACHMENT_DEDUP = os.getenv('ATTACHMENT_DEDUP', 'false').lower() == 'true'
+ATTACHMENT_INDEX_PATH = os.getenv('ATTACHMENT_INDEX_PATH', 'attachment_index.sqlite3')
+ATTACHMENT_INDEX_MAX_ENTRIES = int(os.getenv('ATTACHMENT_INDEX_MAX_ENTRIES', 10000))
+
+# Configuración del cache en disco de descargas de adjuntos
+ATTACHMENT_CACHE_DIR = os.getenv('ATTACHMENT_CACHE_DIR', 'attachment_cache')
+ATTACHMENT_CACHE_MAX_BYTES = int(os.getenv('ATTACHMENT_CACHE_MAX_BYTES', 1024 * 1024 * 1024))
+# Antigüedad (en segundos) desde la última escritura tras la cual una descarga incompleta se considera abandonada
+ATTACHMENT_CACHE_STALE_PART_AGE = float(os.getenv('ATTACHMENT_CACHE_STALE_PART_AGE', 3600))
+
+# Contraseña (autenticación básica) configurada en la suscripción de service hooks de Azure DevOps;
+# sin ella el endpoint de eventos rechaza todas las solicitudes
+AZURE_HOOKS_SECRET = os.getenv('AZURE_HOOKS_SECRET')
+# Duración en cache de los tickets actualizados por los service hooks, que los mantienen al día
+TICKET_CACHE_HOOKS_TTL = float(os.getenv('TICKET_CACHE_HOOKS_TTL', 600))
+
+# Configuración del stream de eventos de tickets (SSE / WebSocket)
+TICKET_EVENTS_BUFFER_SIZE = int(os.getenv('TICKET_EVENTS_BUFFER_SIZE', 1000))
+TICKET_EVENTS_QUEUE_SIZE = int(os.getenv('TICKET_EVENTS_QUEUE_SIZE', 100))
+TICKET_EVENTS_HEARTBEAT = float(os.getenv('TICKET_EVENTS_HEARTBEAT', 15))
+
+# Configuración de la sincronización en segundo plano de work items
+SYNC_ENABLED = os.getenv('SYNC_ENABLED', 'false').lower() == 'true'
+SYNC_STORE_PATH = os.getenv('SYNC_STORE_PATH', 'sync_store.sqlite3')
+SYNC_WORK_ITEM_TYPES = os.getenv('SYNC_WORK_ITEM_TYPES', 'Reversiones').split(',')
+SYNC_INTERVAL = float(os.getenv('SYNC_INTERVAL', 30))
+SYNC_MAX_STALENESS = float(os.getenv('SYNC_MAX_STALENESS', 120))
+# Páginas por segundo mientras hay cambios pendientes (0 para no limitar)
+SYNC_MAX_REQUESTS_PER_SECOND = float(os.getenv('SYNC_MAX_REQUESTS_PER_SECOND', 2))
+
+# Segundos que se conserva el índice de carga de los miembros antes de volver a consultarlo
+AUTO_ASSIGN_INDEX_TTL = float(os.getenv('AUTO_ASSIGN_INDEX_TTL', 300))
+
+# Configuración del cache de miembros de los equipos: después de TTL se actualiza
+# en segundo plano, y después de MAX_STALENESS se espera la consulta a Azure
+TEAM_MEMBERS_TTL = float(os.getenv('TEAM_MEMBERS_TTL', 300))
+TEAM_MEMBERS_MAX_STALENESS = float(os.getenv('TEAM_MEMBERS_MAX_STALENESS', 86400))
+
+# Equipo al que pasan los tickets asignados
+ASSIGNED_TEAM_NAME = os.getenv('ASSIGNED_TEAM_NAME', 'AX - Grupo 1')
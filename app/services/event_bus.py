@@ -0,0 +1,163 @@
+import time
+import asyncio
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, Optional
+
+from app.models.ticket_model import TicketEventType
+from app.services.common import (
+    PROJECT_NAME,
+    TICKET_EVENTS_BUFFER_SIZE,
+    TICKET_EVENTS_QUEUE_SIZE,
+)
+
+class Subscription:
+    """
+    Suscripción a los eventos de tickets con filtros opcionales. Los eventos se
+    encolan en una cola acotada; si el consumidor no alcanza a leerlos se cierra
+    la suscripción y el cliente debe reconectarse indicando el último evento recibido.
+    """
+    def __init__(
+        self,
+        team: Optional[str] = None,
+        assignee: Optional[str] = None,
+        state: Optional[str] = None,
+        queue_size: int = TICKET_EVENTS_QUEUE_SIZE
+    ):
+        self.area = f"{PROJECT_NAME}\\{team}" if team else None
+        self.assignee = assignee.lower() if assignee else None
+        self.state = state
+        self.overflowed = False
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    def matches(self, event: dict[str, Any]) -> bool:
+        if self.area is not None and event.get("area") != self.area:
+            return False
+        if self.assignee is not None and (event.get("assignedTo") or "").lower() != self.assignee:
+            return False
+        if self.state is not None and event.get("state") != self.state:
+            return False
+        return True
+
+    def offer(self, event: dict[str, Any]) -> bool:
+        """
+        Encola un evento sin bloquear. Retorna False si la cola está llena.
+        """
+        try:
+            self._queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            self.overflowed = True
+            return False
+
+    async def events(self, heartbeat: float) -> AsyncIterator[Optional[dict[str, Any]]]:
+        """
+        Retorna los eventos a medida que llegan, o None cada `heartbeat` segundos
+        sin eventos. Termina con un evento `overflow` si la suscripción se cerró.
+        """
+        while True:
+            if self._queue.empty() and self.overflowed:
+                yield {"type": TicketEventType.overflow.value}
+                return
+            try:
+                yield await asyncio.wait_for(self._queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield None
+
+class TicketEventBus:
+    """
+    Publica los cambios de tickets a los suscriptores del proceso. Los últimos
+    eventos se conservan para que un cliente que se reconecta pueda continuar
+    desde el último evento recibido.
+    """
+    def __init__(self, buffer_size: int = TICKET_EVENTS_BUFFER_SIZE):
+        # Los ids parten del reloj para que no se repitan tras un reinicio del servidor
+        self.last_id = time.time_ns() // 1000
+        self.published = 0
+        self.dropped_subscribers = 0
+        self._buffer: deque[dict[str, Any]] = deque(maxlen=buffer_size)
+        self._seen: OrderedDict[tuple, None] = OrderedDict()
+        self._buffer_size = buffer_size
+        self._subscribers: set[Subscription] = set()
+        self._listeners: list[Callable[[dict[str, Any]], None]] = []
+
+    def publish(self, event_type: TicketEventType, ticket_data: dict[str, Any], **data) -> Optional[dict[str, Any]]:
+        """
+        Publica un evento a partir de los datos de un ticket (formato de `filter_ticket_data`).
+        Un mismo cambio puede llegar de una mutación propia y de un service hook; se
+        publica una sola vez por tipo, ticket y revisión.
+        """
+        rev = ticket_data.get("azure", {}).get("System.Rev")
+        if rev is not None:
+            key = (event_type, ticket_data.get("id"), rev)
+            if key in self._seen:
+                return None
+            self._seen[key] = None
+            while len(self._seen) > self._buffer_size:
+                self._seen.popitem(last=False)
+
+        self.last_id += 1
+        self.published += 1
+        event = {
+            "id": self.last_id,
+            "type": event_type.value,
+            "ticketId": ticket_data.get("id"),
+            "rev": rev,
+            "state": ticket_data.get("state"),
+            "assignedTo": ticket_data.get("assignedTo"),
+            "area": ticket_data.get("area"),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "data": data,
+        }
+        self._buffer.append(event)
+
+        for listener in self._listeners:
+            listener(event)
+        for subscription in list(self._subscribers):
+            if subscription.matches(event) and not subscription.offer(event):
+                # Desconectar al consumidor lento en lugar de frenar a los demás
+                self._subscribers.discard(subscription)
+                self.dropped_subscribers += 1
+        return event
+
+    def subscribe(self, subscription: Subscription, last_event_id: Optional[int] = None) -> Subscription:
+        """
+        Registra una suscripción. Si se indica el último evento recibido se
+        reenvían los eventos posteriores, o un evento `reset` si ya no están
+        disponibles y el cliente debe volver a consultar los tickets.
+        """
+        if last_event_id is not None:
+            first_id = self._buffer[0]["id"] if self._buffer else self.last_id + 1
+            if first_id - 1 <= last_event_id <= self.last_id:
+                for event in self._buffer:
+                    if event["id"] > last_event_id and subscription.matches(event):
+                        subscription.offer(event)
+            else:
+                subscription.offer({"id": self.last_id, "type": TicketEventType.reset.value})
+
+        # Si el historial no cupo en la cola, el cliente continúa al reconectarse
+        if not subscription.overflowed:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers.discard(subscription)
+
+    def add_listener(self, listener: Callable[[dict[str, Any]], None]):
+        """
+        Registra una función que recibe cada evento publicado, para mantener
+        índices del proceso sin una suscripción con cola propia.
+        """
+        self._listeners.append(listener)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "last_id": self.last_id,
+            "published": self.published,
+            "buffered": len(self._buffer),
+            "subscribers": len(self._subscribers),
+            "dropped_subscribers": self.dropped_subscribers,
+        }
+
+# Bus de eventos compartido por los servicios
+ticket_events = TicketEventBus()
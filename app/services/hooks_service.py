@@ -0,0 +1,167 @@
+import re
+from typing import Any, Optional
+
+from app.models.ticket_model import TicketEventType
+from app.services.cache_service import ticket_cache
+from app.services.event_bus import ticket_events
+from app.services.ticket_service import filter_ticket_data, filter_attachment_data
+from app.services.common import TICKET_CACHE_HOOKS_TTL
+
+# Campos de identidad que los eventos (resourceVersion 1.0) envían como "Nombre <correo>"
+IDENTITY_FIELDS = ["System.AssignedTo", "System.CreatedBy", "System.ChangedBy", "System.AuthorizedAs"]
+IDENTITY_PATTERN = re.compile(r"^(?P<name>.*?)\s*<(?P<email>[^<>]+)>$")
+
+def normalize_identity_fields(fields: dict[str, Any]) -> dict[str, Any]:
+    """
+    Convierte los campos de identidad al formato del API REST ({"displayName", "uniqueName"}).
+    """
+    fields = dict(fields)
+    for field in IDENTITY_FIELDS:
+        value = fields.get(field)
+        if isinstance(value, str):
+            match = IDENTITY_PATTERN.match(value)
+            fields[field] = {
+                "displayName": match.group("name") if match else value,
+                "uniqueName": match.group("email") if match else value,
+            }
+    return fields
+
+def hook_result(event_type: str, ticket_id: Optional[int], applied: bool, reason: Optional[str] = None):
+    return {"eventType": event_type, "ticketId": ticket_id, "applied": applied, "reason": reason}
+
+class HooksService:
+    """
+    Aplica los eventos de service hooks de Azure DevOps sobre el cache de tickets,
+    para que las lecturas no tengan que consultar a Azure después de cada cambio.
+    Los eventos pueden llegar repetidos o en desorden, por lo que solo se aplican
+    los que avanzan la revisión guardada, y solo esos se publican en el stream.
+    Las entradas que mantienen los eventos duran TICKET_CACHE_HOOKS_TTL, ya que
+    cada cambio posterior las reemplaza.
+    """
+    @staticmethod
+    def handle_event(event: dict[str, Any]) -> dict[str, Any]:
+        event_type = event.get("eventType", "")
+        resource = event.get("resource") or {}
+
+        if ticket_cache.backend is None:
+            # Sin revisiones guardadas no se pueden descartar los eventos repetidos o atrasados
+            return hook_result(event_type, None, False, "El cache de tickets está deshabilitado")
+
+        if event_type == "workitem.created":
+            result = HooksService.apply_created(resource)
+        elif event_type == "workitem.updated":
+            result = HooksService.apply_updated(resource)
+        elif event_type == "workitem.commented":
+            result = HooksService.apply_commented(resource)
+        elif event_type == "workitem.deleted":
+            result = HooksService.apply_deleted(resource)
+        else:
+            return hook_result(event_type, None, False, "Evento no soportado")
+
+        if result["applied"]:
+            HooksService.publish_event(event_type, resource)
+        return result
+
+    @staticmethod
+    def publish_event(event_type: str, resource: dict[str, Any]):
+        """
+        Publica el evento a los suscriptores del stream de tickets, esté o no el ticket en cache.
+        """
+        def ticket_data(ticket_id: int, fields: dict[str, Any]):
+            return filter_ticket_data({"id": ticket_id, "fields": normalize_identity_fields(fields)})
+
+        if event_type == "workitem.created":
+            ticket_events.publish(TicketEventType.created, ticket_data(resource["id"], resource.get("fields", {})))
+        elif event_type == "workitem.commented":
+            ticket_events.publish(TicketEventType.comment_added, ticket_data(resource["id"], resource.get("fields", {})))
+        elif event_type == "workitem.updated":
+            data = ticket_data(resource["workItemId"], resource.get("revision", {}).get("fields", {}))
+            changed = resource.get("fields") or {}
+            if "System.State" in changed:
+                ticket_events.publish(TicketEventType.state_changed, data, previousState=changed["System.State"].get("oldValue"))
+            if "System.AssignedTo" in changed:
+                ticket_events.publish(TicketEventType.assigned, data)
+            relations = resource.get("relations") or {}
+            if any(relation["rel"] == "AttachedFile" for change in relations.values() for relation in change):
+                ticket_events.publish(TicketEventType.attachments_changed, data)
+
+    @staticmethod
+    def apply_created(resource: dict[str, Any]) -> dict[str, Any]:
+        # El evento incluye el work item completo, que aún no tiene comentarios
+        work_item = {**resource, "fields": normalize_identity_fields(resource.get("fields", {}))}
+        ticket_data = filter_ticket_data(work_item, [], include_comments=True)
+
+        entry = ticket_cache.peek(resource["id"])
+        if entry is not None and (entry["rev"] or 0) >= resource["rev"]:
+            return hook_result("workitem.created", resource["id"], False, "Revisión anterior a la guardada")
+
+        ticket_cache.replace(ticket_data, include_comments=True, ttl=TICKET_CACHE_HOOKS_TTL)
+        return hook_result("workitem.created", resource["id"], True)
+
+    @staticmethod
+    def apply_updated(resource: dict[str, Any]) -> dict[str, Any]:
+        ticket_id = resource["workItemId"]
+        rev = resource["rev"]
+
+        entry = ticket_cache.peek(ticket_id)
+        if entry is not None and (entry["rev"] or 0) >= rev:
+            return hook_result("workitem.updated", ticket_id, False, "Revisión anterior a la guardada")
+        if entry is None or entry["data"] is None or entry["rev"] is None or rev != entry["rev"] + 1:
+            # Sin la versión anterior no se conocen los adjuntos, y los cambios de relaciones llegan
+            # como diferencias: solo se guarda la revisión y la próxima lectura consulta a Azure
+            ticket_cache.invalidate(ticket_id, rev, ttl=TICKET_CACHE_HOOKS_TTL)
+            return hook_result("workitem.updated", ticket_id, True, "Ticket no disponible localmente, se guardó solo la revisión")
+
+        # La revisión trae todos los campos; las relaciones se actualizan con las diferencias
+        previous = entry["data"]
+        relations = resource.get("relations") or {}
+        removed = {relation["url"] for relation in relations.get("removed", []) if relation["rel"] == "AttachedFile"}
+        updated = {relation["url"]: relation for relation in relations.get("updated", []) if relation["rel"] == "AttachedFile"}
+        attachments = [
+            # Los atributos modificados (ej. el comentario del adjunto) reemplazan a los guardados
+            filter_attachment_data({**updated[attachment["url"]], "attributes": {**attachment, **updated[attachment["url"]].get("attributes", {})}})
+            if attachment["url"] in updated else attachment
+            for attachment in previous["attachments"] if attachment["url"] not in removed
+        ]
+        attachments.extend(
+            filter_attachment_data(relation) for relation in relations.get("added", []) if relation["rel"] == "AttachedFile"
+        )
+
+        fields = normalize_identity_fields(resource.get("revision", {}).get("fields", {}))
+        ticket_data = filter_ticket_data({"id": ticket_id, "fields": fields, "relations": []})
+        ticket_data["attachments"] = attachments
+
+        # Un cambio en System.History significa que se agregó un comentario
+        include_comments = entry["include_comments"] and "System.History" not in resource.get("fields", {})
+        ticket_data["comments"] = previous["comments"] if include_comments else []
+
+        ticket_cache.replace(ticket_data, include_comments, ttl=TICKET_CACHE_HOOKS_TTL)
+        return hook_result("workitem.updated", ticket_id, True)
+
+    @staticmethod
+    def apply_commented(resource: dict[str, Any]) -> dict[str, Any]:
+        # El evento no trae el comentario con el formato del API de comentarios,
+        # por lo que solo se descartan los comentarios guardados. La revisión la
+        # avanza el evento workitem.updated que Azure envía por el mismo cambio,
+        # que puede llegar antes que este con la misma revisión.
+        ticket_id = resource["id"]
+        entry = ticket_cache.peek(ticket_id)
+        if entry is not None and (entry["rev"] or 0) > resource.get("rev", 0):
+            return hook_result("workitem.commented", ticket_id, False, "Revisión anterior a la guardada")
+        if entry is None or entry["data"] is None or not entry["include_comments"]:
+            return hook_result("workitem.commented", ticket_id, True, "Ticket sin comentarios guardados")
+
+        entry["data"]["comments"] = []
+        ticket_cache.replace(entry["data"], include_comments=False, ttl=TICKET_CACHE_HOOKS_TTL)
+        return hook_result("workitem.commented", ticket_id, True)
+
+    @staticmethod
+    def apply_deleted(resource: dict[str, Any]) -> dict[str, Any]:
+        # Se conserva la revisión del borrado para descartar eventos atrasados del ticket
+        ticket_id = resource["id"]
+        entry = ticket_cache.peek(ticket_id)
+        if entry is not None and resource.get("rev") is not None and (entry["rev"] or 0) > resource["rev"]:
+            return hook_result("workitem.deleted", ticket_id, False, "Revisión anterior a la guardada")
+
+        ticket_cache.invalidate(ticket_id, resource.get("rev"), ttl=TICKET_CACHE_HOOKS_TTL)
+        return hook_result("workitem.deleted", ticket_id, True)
@@ -0,0 +1,172 @@
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Optional
+
+import httpx
+
+from app.services import metrics
+from app.services.rate_limiter import Priority, classify, rate_limiter
+from app.services.common import (
+    HTTP_POOL_SIZE,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_READ_TIMEOUT,
+    HTTP_MAX_RETRIES,
+    HTTP_BACKOFF_FACTOR,
+    HTTP_MAX_RETRY_AFTER,
+)
+
+# Códigos con los que Azure DevOps indica que se debe reintentar más tarde
+RETRY_STATUS_CODES = {429, 503}
+
+_client: Optional[httpx.AsyncClient] = None
+
+def _create_client(pool_size: int = HTTP_POOL_SIZE) -> httpx.AsyncClient:
+    # Los reintentos se manejan en `request` para poder respetar Retry-After
+    limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+    timeout = httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+    return httpx.AsyncClient(limits=limits, timeout=timeout)
+
+def startup(pool_size: int = HTTP_POOL_SIZE):
+    """
+    Crea el cliente compartido. Se llama al iniciar la aplicación.
+    """
+    global _client
+    if _client is None:
+        _client = _create_client(pool_size)
+
+async def shutdown():
+    """
+    Cierra el cliente compartido y sus conexiones. Se llama al detener la aplicación.
+    """
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+def get_client() -> httpx.AsyncClient:
+    # Crear el cliente de forma perezosa si no se llamó a `startup` (ej. scripts)
+    if _client is None:
+        startup()
+    return _client
+
+def retry_delay(response: Optional[httpx.Response], attempt: int) -> float:
+    """
+    Calcula la espera antes del siguiente intento, priorizando el header Retry-After.
+    """
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after:
+        try:
+            delay = float(retry_after)
+        except ValueError:
+            try:
+                date = parsedate_to_datetime(retry_after)
+                delay = (date - datetime.now(timezone.utc)).total_seconds()
+            except (TypeError, ValueError):
+                delay = None
+        if delay is not None:
+            return min(max(delay, 0), HTTP_MAX_RETRY_AFTER)
+    return HTTP_BACKOFF_FACTOR * (2 ** attempt)
+
+async def request(
+    method: str,
+    url: str,
+    connect_timeout: float = HTTP_CONNECT_TIMEOUT,
+    read_timeout: float = HTTP_READ_TIMEOUT,
+    max_retries: int = HTTP_MAX_RETRIES,
+    priority: Optional[Priority] = None,
+    **kwargs
+) -> httpx.Response:
+    """
+    Ejecuta una solicitud sobre el cliente compartido, reintentando ante 429/503.
+    Cada intento espera un token del limitador según su clase de prioridad, que
+    por defecto se deduce del método y la operación (ver `rate_limiter.classify`).
+    """
+    client = get_client()
+    timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+    operation = metrics.upstream_operation(method, url)
+    priority = priority if priority is not None else classify(method, operation)
+    metrics.count_upstream_call()
+    started = time.perf_counter()
+
+    attempt = 0
+    status = "error"
+    try:
+        while True:
+            await rate_limiter.acquire(priority)
+            response = await client.request(method, url, timeout=timeout, **kwargs)
+            status = str(response.status_code)
+            rate_limiter.observe(response.headers)
+            if response.status_code == 429:
+                metrics.upstream_throttled.inc(operation)
+                # Detener todas las solicitudes con el PAT, no solo los reintentos de esta
+                rate_limiter.pause(retry_delay(response, attempt))
+            if response.status_code not in RETRY_STATUS_CODES or attempt >= max_retries:
+                return response
+
+            metrics.upstream_retries.inc(operation, status)
+            await asyncio.sleep(retry_delay(response, attempt))
+            attempt += 1
+    finally:
+        metrics.upstream_request_duration.observe(time.perf_counter() - started, operation, status)
+
+@asynccontextmanager
+async def stream(
+    method: str,
+    url: str,
+    connect_timeout: float = HTTP_CONNECT_TIMEOUT,
+    read_timeout: float = HTTP_READ_TIMEOUT,
+    max_retries: int = HTTP_MAX_RETRIES,
+    priority: Optional[Priority] = None,
+    **kwargs
+) -> AsyncIterator[httpx.Response]:
+    """
+    Igual que `request`, pero sin leer el cuerpo de la respuesta para consumirlo en bloques.
+    """
+    client = get_client()
+    timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+    operation = metrics.upstream_operation(method, url)
+    priority = priority if priority is not None else classify(method, operation)
+    metrics.count_upstream_call()
+    started = time.perf_counter()
+
+    # La latencia se mide hasta recibir los headers, el cuerpo lo consume quien llama
+    attempt = 0
+    status = "error"
+    try:
+        while True:
+            await rate_limiter.acquire(priority)
+            response = await client.send(client.build_request(method, url, timeout=timeout, **kwargs), stream=True)
+            status = str(response.status_code)
+            rate_limiter.observe(response.headers)
+            if response.status_code == 429:
+                metrics.upstream_throttled.inc(operation)
+                rate_limiter.pause(retry_delay(response, attempt))
+            if response.status_code not in RETRY_STATUS_CODES or attempt >= max_retries:
+                break
+
+            metrics.upstream_retries.inc(operation, status)
+            await response.aclose()
+            await asyncio.sleep(retry_delay(response, attempt))
+            attempt += 1
+    finally:
+        metrics.upstream_request_duration.observe(time.perf_counter() - started, operation, status)
+
+    try:
+        yield response
+    finally:
+        await response.aclose()
+
+async def get(url: str, **kwargs) -> httpx.Response:
+    return await request("GET", url, **kwargs)
+
+async def post(url: str, **kwargs) -> httpx.Response:
+    return await request("POST", url, **kwargs)
+
+async def patch(url: str, **kwargs) -> httpx.Response:
+    return await request("PATCH", url, **kwargs)
+
+async def put(url: str, **kwargs) -> httpx.Response:
+    return await request("PUT", url, **kwargs)
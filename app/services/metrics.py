@@ -0,0 +1,219 @@
+import re
+import bisect
+import threading
+from abc import ABC, abstractmethod
+from contextvars import ContextVar
+from typing import Callable, Optional
+from urllib.parse import urlsplit
+
+import anyio.to_thread
+
+# Límites (en segundos) de los histogramas de latencia
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Límites del histograma de solicitudes a Azure por cada solicitud recibida
+UPSTREAM_CALLS_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50)
+
+def escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    labels = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        labels.append(extra)
+    return "{" + ",".join(labels) + "}" if labels else ""
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class Metric(ABC):
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        return "\n".join([f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}", *self.samples()])
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        super().__init__(name, help, labels)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{format_labels(self.labels, labels)} {format_value(value)}" for labels, value in values]
+
+class Gauge(Metric):
+    """
+    Gauge con valores por etiqueta, o calculado al exportar con `function`.
+    """
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), function: Optional[Callable[[], float]] = None):
+        super().__init__(name, help, labels)
+        self.function = function
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str):
+        with self._lock:
+            self._values[labels] = value
+
+    def samples(self) -> list[str]:
+        if self.function is not None:
+            return [f"{self.name} {format_value(self.function())}"]
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{format_labels(self.labels, labels)} {format_value(value)}" for labels, value in values]
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Por etiqueta: conteo por bucket (sin acumular), suma y total
+        self._values: dict[tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            values = [(labels, list(entry[0]), entry[1], entry[2]) for labels, entry in self._values.items()]
+
+        lines = []
+        for labels, counts, total, count in values:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float("inf")), counts):
+                cumulative += bucket_count
+                bound_label = 'le="' + format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{format_labels(self.labels, labels, bound_label)} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.labels, labels)} {format_value(total)}")
+            lines.append(f"{self.name}_count{format_labels(self.labels, labels)} {count}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: list[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """
+        Exporta las métricas en el formato de texto de Prometheus.
+        """
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+# Operaciones de Azure DevOps por ruta y método, en orden de prioridad
+UPSTREAM_OPERATIONS = [
+    (re.compile(r"/_apis/wit/workitems/\d+/comments"), {"GET": "comments_get", "POST": "comments_post"}),
+    (re.compile(r"/_apis/wit/workitems/\$"), {"POST": "workitem_create", "PATCH": "workitem_create"}),
+    (re.compile(r"/_apis/wit/workitems/\d+"), {"GET": "workitem_get", "PATCH": "workitem_patch"}),
+    (re.compile(r"/_apis/wit/workitemsbatch"), {"POST": "workitems_batch_get"}),
+    (re.compile(r"/_apis/wit/\$batch"), {"POST": "workitems_batch_patch"}),
+    (re.compile(r"/_apis/wit/wiql"), {"POST": "wiql"}),
+    (re.compile(r"/_apis/wit/attachments"), {"POST": "attachment_upload", "PUT": "attachment_upload", "GET": "attachment_download"}),
+    (re.compile(r"/_apis/wit/reporting/workitemrevisions"), {"GET": "reporting_revisions"}),
+    (re.compile(r"/teams/[^/]+/members"), {"GET": "team_members"}),
+]
+
+def upstream_operation(method: str, url: str) -> str:
+    """
+    Nombre de la operación de Azure DevOps de una solicitud, usado como etiqueta
+    para no crear una serie por cada id de work item.
+    """
+    path = urlsplit(str(url)).path.lower()
+    for pattern, operations in UPSTREAM_OPERATIONS:
+        if pattern.search(path):
+            return operations.get(method.upper(), "other")
+    return "other"
+
+registry = MetricsRegistry()
+
+# Uso del pool de hilos de anyio, donde FastAPI ejecuta los endpoints síncronos
+threadpool_threads_in_use = registry.register(Gauge(
+    "threadpool_threads_in_use", "Hilos del pool de anyio en uso",
+    function=lambda: anyio.to_thread.current_default_thread_limiter().borrowed_tokens,
+))
+threadpool_size = registry.register(Gauge(
+    "threadpool_size", "Tamaño del pool de hilos de anyio",
+    function=lambda: anyio.to_thread.current_default_thread_limiter().total_tokens,
+))
+http_requests_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "Solicitudes HTTP en curso",
+))
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "Latencia de las solicitudes HTTP por ruta",
+    ("method", "route", "status"),
+))
+http_request_upstream_calls = registry.register(Histogram(
+    "http_request_upstream_calls", "Solicitudes a Azure DevOps por cada solicitud HTTP recibida",
+    ("method", "route"), UPSTREAM_CALLS_BUCKETS,
+))
+upstream_request_duration = registry.register(Histogram(
+    "azure_request_duration_seconds", "Latencia de las solicitudes a Azure DevOps, incluyendo reintentos",
+    ("operation", "status"),
+))
+upstream_retries = registry.register(Counter(
+    "azure_request_retries_total", "Reintentos de solicitudes a Azure DevOps",
+    ("operation", "status"),
+))
+upstream_throttled = registry.register(Counter(
+    "azure_request_throttled_total", "Respuestas 429 (límite de solicitudes) de Azure DevOps",
+    ("operation",),
+))
+rate_limiter_queue_depth = registry.register(Gauge(
+    "azure_rate_limiter_queue_depth", "Solicitudes a Azure DevOps esperando un token del limitador, por prioridad",
+    ("priority",),
+))
+rate_limiter_wait = registry.register(Histogram(
+    "azure_rate_limiter_wait_seconds", "Espera en el limitador antes de enviar cada solicitud a Azure DevOps",
+    ("priority",),
+))
+rate_limiter_rate = registry.register(Gauge(
+    "azure_rate_limiter_rate", "Solicitudes por segundo permitidas actualmente por el limitador",
+))
+single_flight_coalesced = registry.register(Counter(
+    "single_flight_coalesced_total", "Lecturas que reutilizaron una solicitud idéntica en curso en lugar de consultar a Azure DevOps",
+    ("flight",),
+))
+
+# Contador de solicitudes a Azure de la solicitud HTTP en curso; None fuera de una solicitud
+upstream_calls: ContextVar[Optional[list[int]]] = ContextVar("upstream_calls", default=None)
+
+def count_upstream_call():
+    calls = upstream_calls.get()
+    if calls is not None:
+        calls[0] += 1
@@ -0,0 +1,160 @@
+import asyncio
+from typing import AsyncIterator, Optional
+
+from starlette.requests import Request
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ModuleNotFoundError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+from app.services.common import UPLOAD_QUEUE_SIZE
+
+# Marca el fin de un archivo o del cuerpo multipart
+_END = object()
+
+# Documentación OpenAPI del cuerpo multipart, ya que no se declara con `File(...)`
+MULTIPART_FILES_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["files"],
+                    "properties": {
+                        "files": {"type": "array", "items": {"type": "string", "format": "binary"}},
+                    },
+                },
+            },
+        },
+    },
+}
+
+class FileStream:
+    """
+    Archivo recibido en un cuerpo multipart cuyo contenido se lee en bloques
+    a medida que llega, sin guardarlo en memoria ni en disco.
+    """
+    def __init__(self, filename: str, content_type: str, size: Optional[int] = None):
+        self.filename = filename
+        self.content_type = content_type
+        self.size = size
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=UPLOAD_QUEUE_SIZE)
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        while True:
+            item = await self._queue.get()
+            if item is _END:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+class MultipartFileReader:
+    """
+    Itera los archivos de un cuerpo multipart/form-data. El cuerpo se procesa en
+    una tarea aparte que espera a que se consuma cada bloque antes de leer el
+    siguiente, por lo que la memoria usada por solicitud es acotada.
+    """
+    def __init__(self, request: Request, field_name: str = "files", max_files: int = 10):
+        self.request = request
+        self.field_name = field_name
+        self.max_files = max_files
+        self.count = 0
+        self._files: asyncio.Queue = asyncio.Queue(maxsize=1)
+        self._events: list[tuple] = []
+        self._header_field = b""
+        self._headers: dict[bytes, bytes] = {}
+        self._current: Optional[FileStream] = None
+
+    def _create_parser(self) -> MultipartParser:
+        content_type, params = parse_options_header(self.request.headers.get("Content-Type", ""))
+        boundary = params.get(b"boundary")
+        if content_type != b"multipart/form-data" or not boundary:
+            raise ValueError("La solicitud debe ser multipart/form-data")
+
+        def on_header_field(data: bytes, start: int, end: int):
+            self._header_field += data[start:end]
+
+        def on_header_value(data: bytes, start: int, end: int):
+            self._headers[self._header_field.lower()] = self._headers.get(self._header_field.lower(), b"") + data[start:end]
+
+        def on_header_end():
+            self._header_field = b""
+
+        def on_headers_finished():
+            self._events.append(("headers", self._headers))
+            self._headers = {}
+
+        def on_part_data(data: bytes, start: int, end: int):
+            # Copiar los datos, el parser reutiliza el buffer
+            self._events.append(("data", bytes(data[start:end])))
+
+        def on_part_end():
+            self._events.append(("end", None))
+
+        return MultipartParser(boundary, {
+            "on_header_field": on_header_field,
+            "on_header_value": on_header_value,
+            "on_header_end": on_header_end,
+            "on_headers_finished": on_headers_finished,
+            "on_part_data": on_part_data,
+            "on_part_end": on_part_end,
+        })
+
+    async def _flush_events(self):
+        events, self._events = self._events, []
+        for event, value in events:
+            if event == "headers":
+                _, options = parse_options_header(value.get(b"content-disposition", b""))
+                name = options.get(b"name", b"").decode()
+                filename = options.get(b"filename")
+                if name != self.field_name or filename is None:
+                    continue
+
+                self.count += 1
+                if self.count > self.max_files:
+                    raise ValueError(f"El número de archivos no puede exceder {self.max_files}")
+
+                size = value.get(b"content-length")
+                self._current = FileStream(
+                    filename.decode(),
+                    value.get(b"content-type", b"application/octet-stream").decode(),
+                    int(size) if size and size.isdigit() else None,
+                )
+                await self._files.put(self._current)
+            elif event == "data" and self._current is not None:
+                await self._current._queue.put(value)
+            elif event == "end" and self._current is not None:
+                await self._current._queue.put(_END)
+                self._current = None
+
+    async def _read_body(self):
+        try:
+            parser = self._create_parser()
+            async for chunk in self.request.stream():
+                parser.write(chunk)
+                await self._flush_events()
+            parser.finalize()
+            await self._flush_events()
+            await self._files.put(_END)
+        except Exception as e:
+            # Propagar el error al archivo en curso y al consumidor
+            if self._current is not None:
+                await self._current._queue.put(e)
+            await self._files.put(e)
+
+    async def __aiter__(self) -> AsyncIterator[FileStream]:
+        task = asyncio.create_task(self._read_body())
+        try:
+            while True:
+                item = await self._files.get()
+                if item is _END:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            if not task.done():
+                task.cancel()
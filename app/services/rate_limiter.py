@@ -0,0 +1,232 @@
+import math
+import time
+import asyncio
+from enum import IntEnum
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Mapping, Optional
+
+from app.services import metrics
+from app.services.common import (
+    AZURE_RATE_LIMIT,
+    AZURE_RATE_BURST,
+    HTTP_MAX_RETRY_AFTER,
+)
+
+class Priority(IntEnum):
+    """
+    Clases de prioridad de las solicitudes a Azure DevOps; un valor menor se atiende primero.
+    """
+    mutation = 0
+    read = 1
+    bulk = 2
+
+# Operaciones de lista o en lote (ver metrics.UPSTREAM_OPERATIONS)
+BULK_OPERATIONS = {"wiql", "workitems_batch_get", "workitems_batch_patch", "reporting_revisions"}
+
+# Prioridad fijada por quien llama para las solicitudes del contexto actual
+current_priority: ContextVar[Optional[Priority]] = ContextVar("current_priority", default=None)
+
+@contextmanager
+def prioritize(priority: Priority) -> Iterator[None]:
+    """
+    Asigna una clase de prioridad a las solicitudes a Azure hechas dentro del bloque.
+    """
+    token = current_priority.set(priority)
+    try:
+        yield
+    finally:
+        current_priority.reset(token)
+
+def classify(method: str, operation: str) -> Priority:
+    priority = current_priority.get()
+    if priority is not None:
+        return priority
+    if operation in BULK_OPERATIONS:
+        return Priority.bulk
+    return Priority.read if method.upper() == "GET" else Priority.mutation
+
+def header_float(headers: Mapping[str, str], name: str) -> Optional[float]:
+    try:
+        return float(headers[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+class RateLimiter:
+    """
+    Token bucket compartido por todas las solicitudes hechas con el PAT. Cuando
+    no hay tokens las solicitudes esperan en una cola por prioridad: primero
+    las mutaciones, luego las lecturas y al final las operaciones en lote.
+
+    La tasa se ajusta con los headers X-RateLimit-* de Azure: se reduce a la
+    mitad cuando Azure empieza a retrasar solicitudes (X-RateLimit-Delay), se
+    recupera gradualmente después, y se detiene hasta X-RateLimit-Reset o
+    Retry-After cuando se agotó el límite. Con `rate` 0 no hay una tasa fija:
+    al primer retraso se limita a la mitad de la tasa de envío observada, y el
+    límite se retira tras `RECOVERY_PERIOD` segundos sin retrasos.
+    """
+    # Fracción de la tasa recuperada por cada segundo sin retrasos
+    RECOVERY_STEP = 0.05
+    # Tasa mínima, como fracción de la configurada
+    MIN_RATE_FACTOR = 0.1
+    # Segundos sin retrasos tras los que se retira el límite adaptativo
+    RECOVERY_PERIOD = 60
+
+    def __init__(self, rate: float = AZURE_RATE_LIMIT, burst: float = AZURE_RATE_BURST):
+        self.base_rate = rate
+        self.rate = rate if rate > 0 else math.inf
+        self.burst = max(burst, 1)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.slowed_at = 0.0
+        self.recovered_at = 0.0
+        # Solicitudes enviadas en la ventana de un segundo en curso y tasa de la anterior
+        self.window_started = self.updated
+        self.window_sent = 0
+        self.sent_rate = 0.0
+        self._queues: dict[Priority, deque[tuple[asyncio.Future, float]]] = {priority: deque() for priority in Priority}
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        metrics.rate_limiter_rate.set(self.rate)
+
+    def _refill(self, now: float):
+        if math.isinf(self.rate):
+            self.tokens = self.burst
+        else:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _take(self, now: float):
+        self.tokens -= 1
+        if now - self.window_started >= 1:
+            self.sent_rate = self.window_sent / (now - self.window_started)
+            self.window_started = now
+            self.window_sent = 0
+        self.window_sent += 1
+
+    def _set_rate(self, rate: float):
+        self.rate = rate
+        metrics.rate_limiter_rate.set(rate)
+
+    def _has_waiters(self) -> bool:
+        return any(self._queues.values())
+
+    def _next_waiter(self) -> Optional[tuple[asyncio.Future, float]]:
+        for priority in Priority:
+            queue = self._queues[priority]
+            while queue:
+                waiter = queue.popleft()
+                # Las solicitudes canceladas mientras esperaban no consumen tokens
+                if not waiter[0].done():
+                    return waiter
+        return None
+
+    async def acquire(self, priority: Priority = Priority.read):
+        """
+        Espera un token para enviar una solicitud de la clase `priority`.
+        """
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Las esperas de otro event loop (ej. tras reiniciar la aplicación) ya no se pueden atender
+            self._loop = loop
+            self._dispatcher = None
+            for queue in self._queues.values():
+                queue.clear()
+
+        now = time.monotonic()
+        self._refill(now)
+        if now >= self.paused_until and self.tokens >= 1 and not self._has_waiters():
+            self._take(now)
+            metrics.rate_limiter_wait.observe(0, priority.name)
+            return
+
+        future = loop.create_future()
+        self._queues[priority].append((future, now))
+        metrics.rate_limiter_queue_depth.inc(priority.name)
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        try:
+            await future
+        finally:
+            metrics.rate_limiter_queue_depth.dec(priority.name)
+            metrics.rate_limiter_wait.observe(time.monotonic() - now, priority.name)
+
+    async def _dispatch(self):
+        # Entrega los tokens a las solicitudes en espera, por orden de prioridad y llegada
+        while self._has_waiters():
+            now = time.monotonic()
+            if now < self.paused_until:
+                await asyncio.sleep(self.paused_until - now)
+                continue
+
+            self._refill(now)
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                continue
+
+            waiter = self._next_waiter()
+            if waiter is None:
+                break
+            self._take(now)
+            waiter[0].set_result(None)
+
+    def pause(self, seconds: float):
+        """
+        Detiene el envío de solicitudes, ej. tras un 429 con Retry-After.
+        """
+        if seconds > 0:
+            self.paused_until = max(self.paused_until, time.monotonic() + min(seconds, HTTP_MAX_RETRY_AFTER))
+
+    def observe(self, headers: Mapping[str, str]):
+        """
+        Ajusta la tasa con los headers X-RateLimit-* de una respuesta de Azure.
+        """
+        now = time.monotonic()
+        remaining = header_float(headers, "X-RateLimit-Remaining")
+        reset = header_float(headers, "X-RateLimit-Reset")
+        if remaining is not None and remaining <= 0 and reset is not None:
+            # X-RateLimit-Reset es un timestamp unix
+            self.pause(reset - time.time())
+
+        delay = header_float(headers, "X-RateLimit-Delay")
+        if delay is not None and delay > 0:
+            # Reducir a lo más una vez por segundo, para que una ráfaga de respuestas no agote la tasa
+            if now - self.slowed_at >= 1:
+                self.slowed_at = now
+                current = self.rate if not math.isinf(self.rate) else max(self.sent_rate, self.window_sent, 1)
+                self._set_rate(max(self.base_rate * self.MIN_RATE_FACTOR, current / 2, 1))
+        elif self.rate < (self.base_rate or math.inf) and now - self.recovered_at >= 1:
+            self.recovered_at = now
+            if self.base_rate > 0:
+                self._set_rate(min(self.base_rate, self.rate + self.base_rate * self.RECOVERY_STEP))
+            elif now - self.slowed_at >= self.RECOVERY_PERIOD:
+                self._set_rate(math.inf)
+            else:
+                self._set_rate(self.rate * (1 + self.RECOVERY_STEP))
+
+    def oldest_wait(self) -> float:
+        """
+        Segundos que lleva esperando la solicitud más antigua de la cola.
+        """
+        now = time.monotonic()
+        return max((now - queued_at for queue in self._queues.values() for future, queued_at in queue if not future.done()), default=0.0)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "rate": round(self.rate, 2) if not math.isinf(self.rate) else None,
+            "base_rate": self.base_rate or None,
+            "sent_per_second": round(self.sent_rate, 2),
+            "paused_seconds": round(max(0.0, self.paused_until - now), 2),
+            "queued": {priority.name: sum(not future.done() for future, _ in self._queues[priority]) for priority in Priority},
+            "oldest_wait_seconds": round(self.oldest_wait(), 3),
+        }
+
+# Limitador compartido, ya que todas las solicitudes usan el mismo PAT
+rate_limiter = RateLimiter()
+metrics.registry.register(metrics.Gauge(
+    "azure_rate_limiter_oldest_wait_seconds", "Espera de la solicitud más antigua en la cola del limitador",
+    function=rate_limiter.oldest_wait,
+))
@@ -0,0 +1,215 @@
+import math
+import threading
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+from types import MappingProxyType
+from typing import Any, Mapping, Optional
+
+from app.models.ticket_model import TicketState
+from app.services.single_flight import SingleFlight
+from app.services.work_item_store import WorkItemStore, work_item_store
+
+# Campos numéricos y de fecha que se cargan como columnas
+INT_COLUMNS = {"iterations": "Custom.Devoluciones"}
+DATE_COLUMNS = {
+    "draft": "Custom.Ultimavezenborrador",
+    "requested": "Custom.Ultimavezsolicitado",
+    "assigned": "Custom.Ultimavezasignado",
+    "evaluation": "Custom.Ultimavezenevaluacion",
+    "returned": "Custom.Ultimavezquehubodevolucion",
+    "finished": "Custom.Findeevaluacion",
+}
+
+# Tiempo en cada estado: desde que el ticket entró al estado hasta que entró al siguiente
+STATE_INTERVALS = {
+    TicketState.borrador: ("draft", "requested"),
+    TicketState.solicitado: ("requested", "assigned"),
+    TicketState.asignado: ("assigned", "evaluation"),
+    TicketState.en_evaluacion: ("evaluation", "finished"),
+}
+
+CLOSED_STATES = {TicketState.aprobado.value, TicketState.rechazado.value}
+
+DAY_SECONDS = 86400
+
+def percentile(sorted_values: list[float], p: float) -> Optional[float]:
+    # Percentil por rango más cercano sobre valores ya ordenados
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(p * len(sorted_values)) - 1)]
+
+class ReversalStatsSnapshot:
+    """
+    Vista en columnas de la copia local de reversiones. La primera carga lee
+    toda la copia en una sola consulta; las siguientes solo los work items
+    sincronizados desde la carga anterior. Si la sincronización eliminó work
+    items borrados, la vista se vuelve a cargar completa.
+
+    Las estadísticas se calculan en Python con una pasada sobre las columnas,
+    no con agregados de SQL: la vista evita releer y convertir las filas de
+    SQLite en cada solicitud, pero cada cálculo sigue recorriendo los tickets.
+    """
+    def __init__(self, store: WorkItemStore):
+        self.store = store
+        self.synced_at = 0.0
+        self.deleted_at: Optional[str] = None
+        self.columns: Mapping[str, tuple] = MappingProxyType({})
+        self._positions: dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self) -> Mapping[str, tuple]:
+        """
+        Retorna la vista actual. Los cambios se aplican sobre una copia que
+        reemplaza a la vista bajo el lock, por lo que una vista ya entregada
+        no cambia mientras se calcula una estadística.
+        """
+        with self._lock:
+            deleted_at = self.store.get_state("deleted_at")
+            if deleted_at != self.deleted_at:
+                # Los work items eliminados no aparecen entre los cambios
+                self.columns, self._positions, self.synced_at = MappingProxyType({}), {}, 0.0
+                self.deleted_at = deleted_at
+            changes = self.store.columns(INT_COLUMNS, DATE_COLUMNS, self.synced_at)
+            if self.columns and not changes["id"]:
+                return self.columns
+
+            columns = {name: list(self.columns.get(name, ())) for name in changes}
+            for row, ticket_id in enumerate(changes["id"]):
+                index = self._positions.setdefault(ticket_id, len(self._positions))
+                for name, column in columns.items():
+                    if index < len(column):
+                        column[index] = changes[name][row]
+                    else:
+                        column.append(changes[name][row])
+            self.columns = MappingProxyType({name: tuple(column) for name, column in columns.items()})
+            if changes["synced_at"]:
+                self.synced_at = max(self.synced_at, max(changes["synced_at"]))
+            return self.columns
+
+# Los tableros consultan las mismas estadísticas a la vez: las solicitudes
+# concurrentes de una estadística comparten un solo cálculo
+stats_reads = SingleFlight("reversal_stats")
+
+class ReversalStatsService:
+    @staticmethod
+    def _snapshot() -> Mapping[str, tuple]:
+        if reversal_stats_snapshot is None:
+            raise ValueError("Las estadísticas requieren la sincronización de work items (SYNC_ENABLED=true)")
+        return reversal_stats_snapshot.get()
+
+    @staticmethod
+    @stats_reads.share
+    def time_in_state() -> list[dict[str, Any]]:
+        """
+        Percentiles p50/p95 del tiempo (en horas) que los tickets pasan en cada estado.
+        """
+        columns = ReversalStatsService._snapshot()
+        result = []
+        for state, (start_column, end_column) in STATE_INTERVALS.items():
+            durations = sorted(
+                end - start
+                for start, end in zip(columns[start_column], columns[end_column])
+                if start is not None and end is not None and end >= start
+            )
+            p50, p95 = percentile(durations, 0.5), percentile(durations, 0.95)
+            result.append({
+                "state": state.value,
+                "count": len(durations),
+                "p50_hours": round(p50 / 3600, 2) if p50 is not None else None,
+                "p95_hours": round(p95 / 3600, 2) if p95 is not None else None,
+            })
+        return result
+
+    @staticmethod
+    @stats_reads.share
+    def return_rates() -> list[dict[str, Any]]:
+        """
+        Porcentaje de tickets devueltos a borrador por cada evaluador asignado.
+        """
+        columns = ReversalStatsService._snapshot()
+        reviewed, returned, returns = Counter(), Counter(), Counter()
+        for evaluator, iterations in zip(columns["assigned_to"], columns["iterations"]):
+            if not evaluator:
+                continue
+            reviewed[evaluator] += 1
+            if iterations > 0:
+                returned[evaluator] += 1
+                returns[evaluator] += iterations
+
+        return [
+            {
+                "evaluator": evaluator,
+                "reviewed": reviewed[evaluator],
+                "returned": returned[evaluator],
+                "returns": returns[evaluator],
+                "return_rate": round(returned[evaluator] / reviewed[evaluator], 4),
+            }
+            for evaluator in sorted(reviewed)
+        ]
+
+    @staticmethod
+    @stats_reads.share
+    def throughput(date_from: Optional[date] = None, date_to: Optional[date] = None) -> list[dict[str, Any]]:
+        """
+        Número de evaluaciones finalizadas por día (UTC), por defecto de los últimos 30 días.
+        """
+        date_to = date_to or date.today()
+        date_from = date_from or date_to - timedelta(days=29)
+        if date_from > date_to:
+            raise ValueError("La fecha inicial no puede ser posterior a la fecha final")
+
+        columns = ReversalStatsService._snapshot()
+        # Agrupar por número de día desde epoch, sin convertir cada fecha
+        epoch = date(1970, 1, 1)
+        first_day, last_day = (date_from - epoch).days, (date_to - epoch).days
+        finished, approved, rejected = Counter(), Counter(), Counter()
+        for finished_at, state in zip(columns["finished"], columns["state"]):
+            if finished_at is None:
+                continue
+            day = int(finished_at // DAY_SECONDS)
+            if first_day <= day <= last_day:
+                finished[day] += 1
+                if state == TicketState.aprobado.value:
+                    approved[day] += 1
+                elif state == TicketState.rechazado.value:
+                    rejected[day] += 1
+
+        return [
+            {
+                "date": (epoch + timedelta(days=day)).isoformat(),
+                "finished": finished[day],
+                "approved": approved[day],
+                "rejected": rejected[day],
+            }
+            for day in range(first_day, last_day + 1)
+        ]
+
+    @staticmethod
+    @stats_reads.share
+    def backlog() -> list[dict[str, Any]]:
+        """
+        Tickets abiertos (no aprobados ni rechazados) por equipo y estado.
+        """
+        columns = ReversalStatsService._snapshot()
+        by_team: dict[str, Counter] = defaultdict(Counter)
+        for state, area in zip(columns["state"], columns["area"]):
+            if state in CLOSED_STATES:
+                continue
+            # El equipo es el último nivel de la ruta de área
+            by_team[(area or "").split("\\")[-1]][state] += 1
+
+        return [
+            {
+                "team": team,
+                "total": sum(states.values()),
+                "by_state": dict(states),
+            }
+            for team, states in sorted(by_team.items())
+        ]
+
+    @staticmethod
+    def lag() -> Optional[float]:
+        return work_item_store.lag() if work_item_store is not None else None
+
+# Vista compartida, solo existe si la copia local está habilitada
+reversal_stats_snapshot = ReversalStatsSnapshot(work_item_store) if work_item_store is not None else None
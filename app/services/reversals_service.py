@@ -1,11 +1,86 @@
-from typing import Any, Optional
+import asyncio
+from typing import Any, AsyncIterable, Optional
 from random import randint
 
 from app.schemas.reversal_schema import CreateReversalSchema
+from app.schemas.ticket_schema import TicketSearchFilters
 from app.models.reversal_model import ReversalType, ReversalData
 from app.models.ticket_model import TicketState
 
-from app.services.ticket_service import TicketService
+from app.services.multipart_stream import FileStream
+from app.services.comments_service import CommentsService
+from app.services.ticket_service import TicketService, TICKET_FIELDS, MAX_BATCH_IDS, SEARCH_DEFAULT_TOP, filter_ticket_data, filter_attachment_data
+from app.services.cache_service import ticket_cache
+from app.services.work_item_store import work_item_store
+
+# Campos que lee `feed_ticket_data`, adicionales a los del ticket
+REVERSAL_FIELDS = TICKET_FIELDS + [
+    "Custom.Devoluciones",
+    "Custom.Ultimavezenborrador",
+    "Custom.Ultimavezsolicitado",
+    "Custom.Ultimavezasignado",
+    "Custom.Ultimavezenevaluacion",
+    "Custom.Ultimavezquehubodevolucion",
+    "Custom.Findeevaluacion",
+]
+
+# Claves del DTO de reversiones que se pueden pedir con `fields`, con su campo
+# de Azure y su valor por defecto. Adjuntos y comentarios no son campos.
+REVERSAL_PROJECTION = {
+    "area": ("System.AreaPath", None),
+    "title": ("System.Title", None),
+    "state": ("System.State", None),
+    "assignedTo": ("System.AssignedTo", ""),
+    "iterations": ("Custom.Devoluciones", None),
+    "lastTimeInDraft": ("Custom.Ultimavezenborrador", ""),
+    "lastTimeRequested": ("Custom.Ultimavezsolicitado", ""),
+    "lastTimeAssigned": ("Custom.Ultimavezasignado", ""),
+    "lastTimeInEvaluation": ("Custom.Ultimavezenevaluacion", ""),
+    "lastTimeReturned": ("Custom.Ultimavezquehubodevolucion", ""),
+    "timeFinishEvaluation": ("Custom.Findeevaluacion", ""),
+    "attachments": (None, []),
+    "comments": (None, []),
+}
+
+def parse_fields(fields: Optional[str]) -> Optional[list[str]]:
+    """
+    Valida la lista de claves separadas por coma de `fields`. El id siempre se incluye.
+    Sin `fields` se retorna None (reversión completa); una lista vacía o con claves
+    vacías (ej. `fields=` o `state,,id`) se rechaza.
+    """
+    if fields is None:
+        return None
+    names = [name.strip() for name in fields.split(",")]
+    if "" in names:
+        raise ValueError(f"La lista de campos no puede estar vacía ni contener campos vacíos: '{fields}'")
+    names = [name for name in names if name != "id"]
+    unknown = [name for name in names if name not in REVERSAL_PROJECTION]
+    if unknown:
+        raise ValueError(f"Campos no soportados: {', '.join(unknown)}. Campos disponibles: id, {', '.join(REVERSAL_PROJECTION)}")
+    return list(dict.fromkeys(names))
+
+def project_reversal_data(data: dict[str, Any], fields: list[str]) -> dict[str, Any]:
+    # Proyecta una reversión ya construida (cache o copia local) a las claves pedidas
+    return {"id": data.get("id"), **{field: data.get(field, REVERSAL_PROJECTION[field][1]) for field in fields}}
+
+def project_work_item(work_item: dict[str, Any], fields: list[str], comments: Optional[list] = None) -> dict[str, Any]:
+    """
+    Construye solo las claves pedidas de una reversión a partir del work item crudo,
+    sin pasar por `filter_ticket_data` ni `feed_ticket_data`.
+    """
+    azure_data = work_item.get("fields", {})
+    data = {"id": work_item.get("id")}
+    for field in fields:
+        azure_field, default = REVERSAL_PROJECTION[field]
+        if field == "assignedTo":
+            data[field] = azure_data["System.AssignedTo"].get("uniqueName") if azure_data.get("System.AssignedTo") else default
+        elif field == "attachments":
+            data[field] = [filter_attachment_data(relation) for relation in work_item.get("relations", []) if relation["rel"] == "AttachedFile"]
+        elif field == "comments":
+            data[field] = comments if comments is not None else default
+        else:
+            data[field] = azure_data.get(azure_field, default)
+    return data
 
 def reversal_data_to_payload(data: ReversalData|None):
     if data is None: return
@@ -75,61 +150,161 @@ def feed_ticket_data(data: dict[str, Any]):
 
 class ReversalsService:
     @staticmethod
-    def get(reversal_id: int):
+    def get_local(ids: list[int]) -> dict[int, dict[str, Any]]:
+        """
+        Retorna las reversiones de la copia local sincronizada, si está al día.
+        La copia solo tiene campos, sin comentarios ni adjuntos.
+        """
+        if work_item_store is None or not work_item_store.is_fresh():
+            return {}
+
+        reversals = {}
+        for reversal_id, work_item in work_item_store.get_many(ids).items():
+            # Las mutaciones propias dejan en el cache la nueva revisión, más reciente que la copia
+            cached = ticket_cache.peek(reversal_id)
+            if cached is not None and (cached["rev"] or 0) > work_item["rev"]:
+                continue
+            reversals[reversal_id] = feed_ticket_data(filter_ticket_data(work_item))
+        return reversals
+
+    @staticmethod
+    async def get(reversal_id: int, include_comments: bool = True, include_attachments: bool = True):
         try:
-            reversal_data = TicketService.get_ticket_data(reversal_id)
+            if not include_comments and not include_attachments:
+                local = ReversalsService.get_local([reversal_id])
+                if reversal_id in local:
+                    return local[reversal_id]
+
+            reversal_data = await TicketService.get_ticket_data(reversal_id, include_comments)
             return feed_ticket_data(reversal_data)
         except Exception as e:
             raise ValueError(f"Error al obtener la reversion: {e}")
+
+    @staticmethod
+    async def get_projection(reversal_id: int, fields: list[str]) -> dict[str, Any]:
+        """
+        Obtiene solo las claves `fields` de una reversión. Se responde desde el
+        cache o la copia local si es posible; si no, se leen de Azure solo los
+        campos necesarios, y las relaciones y comentarios solo si se piden.
+        """
+        try:
+            include_comments = "comments" in fields
+            include_attachments = "attachments" in fields
+
+            cached = ticket_cache.get(reversal_id, include_comments)
+            if cached is not None:
+                return project_reversal_data(feed_ticket_data(cached), fields)
+
+            if not include_comments and not include_attachments:
+                local = ReversalsService.get_local([reversal_id])
+                if reversal_id in local:
+                    return project_reversal_data(local[reversal_id], fields)
+
+            # Las relaciones solo se obtienen leyendo el work item completo
+            azure_fields = [REVERSAL_PROJECTION[field][0] for field in fields if REVERSAL_PROJECTION[field][0]]
+            calls = [TicketService.get_work_item(reversal_id, None if include_attachments else ["System.Id", *azure_fields])]
+            if include_comments:
+                calls.append(CommentsService.get_comments_of_a_ticket(reversal_id))
+            work_item, *comments = await asyncio.gather(*calls)
+
+            return project_work_item(work_item, fields, comments[0].get("comments") if comments else None)
+        except Exception as e:
+            raise ValueError(f"Error al obtener la reversion: {e}")
+    
+    @staticmethod
+    async def get_many(ids: list[int], include_comments: bool = False, include_attachments: bool = False):
+        try:
+            ids = list(dict.fromkeys(ids))
+            if len(ids) > MAX_BATCH_IDS:
+                raise ValueError(f"El número de tickets no puede exceder {MAX_BATCH_IDS}. Tickets recibidos: {len(ids)}")
+
+            # Sin comentarios ni adjuntos se responde desde la copia local lo que esté disponible
+            local = {} if include_comments or include_attachments else ReversalsService.get_local(ids)
+            pending = [reversal_id for reversal_id in ids if reversal_id not in local]
+            result = {"tickets": [], "missing": []}
+            if pending:
+                result = await TicketService.get_tickets_data(pending, include_comments, include_attachments, REVERSAL_FIELDS)
+
+            tickets = {**local, **{ticket["id"]: feed_ticket_data(ticket) for ticket in result["tickets"]}}
+            result["tickets"] = [tickets[reversal_id] for reversal_id in ids if reversal_id in tickets]
+            return result
+        except Exception as e:
+            raise ValueError(f"Error al obtener las reversiones: {e}")
     
     @staticmethod
-    def create(data: CreateReversalSchema):
+    async def search(filters: TicketSearchFilters, top: int = SEARCH_DEFAULT_TOP, cursor: Optional[int] = None):
+        try:
+            result = await TicketService.search_tickets(filters, top, cursor, "Reversiones", REVERSAL_FIELDS)
+            result["tickets"] = [feed_ticket_data(ticket) for ticket in result["tickets"]]
+            return result
+        except Exception as e:
+            raise ValueError(f"Error al buscar las reversiones: {e}")
+    
+    @staticmethod
+    async def create(data: CreateReversalSchema):
         try:
             payload = create_payload(data)
-            ticket_data = TicketService.create_ticket("Reversiones", payload)
+            ticket_data = await TicketService.create_ticket("Reversiones", payload)
             return feed_ticket_data(ticket_data)
         except ValueError as e:
             raise ValueError(f"Error al crear la reversion: {e}")
     
     @staticmethod
-    def create_draft(data: CreateReversalSchema):
+    async def create_draft(data: CreateReversalSchema):
         try:
             payload = create_payload(data, draft=True)
-            ticket_data = TicketService.create_ticket("Reversiones", payload)
+            ticket_data = await TicketService.create_ticket("Reversiones", payload)
             return feed_ticket_data(ticket_data)
         except ValueError as e:
             raise ValueError(f"Error al crear la reversion: {e}")
     
     @staticmethod
-    def move(id: int, new_state: TicketState,  user_email: Optional[str] = None, payload: ReversalData = None):
+    async def move(id: int, new_state: TicketState,  user_email: Optional[str] = None, payload: ReversalData = None):
         try:
-            iterations = ReversalsService.get(id).get("iterations")
-            ticket_data = TicketService.move_ticket(id, new_state, user_email, iterations, reversal_data_to_payload(payload))
+            ticket_data = await TicketService.move_ticket(id, new_state, user_email, reversal_data_to_payload(payload))
             return feed_ticket_data(ticket_data)
         except ValueError as e:
             raise ValueError(f"Error al mover la reversion: {e}")
     
     @staticmethod
-    def add_comment(id: int, text: str, sender_email: str):
+    async def bulk_move(moves: list[dict[str, Any]]):
+        try:
+            results = await TicketService.bulk_move_tickets([
+                {**move, "payload": reversal_data_to_payload(move.get("data"))} for move in moves
+            ])
+            for result in results:
+                if result["status"] == "success":
+                    result["data"] = feed_ticket_data(result["data"])
+            return {
+                "count": len(results),
+                "succeeded": sum(1 for result in results if result["status"] == "success"),
+                "failed": sum(1 for result in results if result["status"] == "error"),
+                "results": results,
+            }
+        except ValueError as e:
+            raise ValueError(f"Error al mover las reversiones: {e}")
+    
+    @staticmethod
+    async def add_comment(id: int, text: str, sender_email: str, refresh: bool = False):
         try:
             message = f"{sender_email}: {text}{'.' if text[-1] != '.' else ''}"
-            ticket_data = TicketService.add_comment_to_ticket(id, message)
+            ticket_data = await TicketService.add_comment_to_ticket(id, message, refresh)
             return feed_ticket_data(ticket_data)
         except ValueError as e:
             raise ValueError(f"Error al agregar comentario la reversion: {e}")
     
     @staticmethod
-    def attach_files(id: int, file_paths: list[str], max_files: int = 10):
+    async def attach_files(id: int, files: AsyncIterable[FileStream], refresh: bool = False):
         try:
-            ticket_data = TicketService.attach_files_to_ticket(id, file_paths, max_files)
+            ticket_data = await TicketService.attach_files_to_ticket(id, files, refresh)
             return feed_ticket_data(ticket_data)
         except ValueError as e:
             raise ValueError(f"Error al adjuntar archivos a la reversion: {e}")
     
     @staticmethod
-    def remove_attachment(id: int, attachment_url: str):
+    async def remove_attachment(id: int, attachment_url: str, refresh: bool = False):
         try:
-            ticket_data = TicketService.remove_attachment_from_ticket(id, attachment_url)
+            ticket_data = await TicketService.remove_attachment_from_ticket(id, attachment_url, refresh)
             return feed_ticket_data(ticket_data)
         except ValueError as e:
             raise ValueError(f"Error al remover adjunto de la reversion: {e}")
\ No newline at end of file
@@ -0,0 +1,119 @@
+import copy
+import asyncio
+import weakref
+import functools
+import threading
+from typing import Any, Awaitable, Callable, Hashable
+
+from app.services import metrics
+
+class _Call:
+    # Llamada síncrona en curso, compartida por los hilos que piden la misma clave
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+        self.followers = 0
+
+class SingleFlight:
+    """
+    Agrupa lecturas idénticas concurrentes: mientras una lectura de una clave está
+    en curso, las demás esperan su resultado en lugar de repetir la consulta a
+    Azure. `do` se usa desde el event loop y `do_sync` desde hilos del pool.
+    Si otra solicitud se unió a la lectura, cada una recibe su propia copia del
+    resultado, ya que los servicios pueden modificarlo.
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self.coalesced = 0
+        self._tasks: dict[Hashable, asyncio.Task] = {}
+        self._calls: dict[Hashable, _Call] = {}
+        # Tareas a las que se unió alguna solicitud
+        self._shared: weakref.WeakSet[asyncio.Task] = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def _record_coalesced(self):
+        self.coalesced += 1
+        metrics.single_flight_coalesced.inc(self.name)
+
+    def task(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        """
+        Retorna la tarea en curso de la clave, o inicia una nueva con `factory`.
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None) if self._tasks.get(key) is task else None)
+        return task
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._tasks
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._tasks.get(key)
+        if task is not None:
+            self._record_coalesced()
+            self._shared.add(task)
+            # Si quien espera se cancela, la lectura sigue para las demás solicitudes
+            return copy.deepcopy(await asyncio.shield(task))
+
+        task = self.task(key, factory)
+        result = await asyncio.shield(task)
+        # La tarea ya salió de `_tasks`, por lo que no pueden unirse más solicitudes
+        return copy.deepcopy(result) if task in self._shared else result
+
+    def do_sync(self, key: Hashable, function: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.followers += 1
+
+        if not leader:
+            self._record_coalesced()
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = function()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call.done.set()
+        return copy.deepcopy(call.result) if call.followers else call.result
+
+    def forget(self, key: Hashable):
+        """
+        Descarta la lectura en curso de una clave tras una mutación, para que las
+        solicitudes siguientes no reciban datos anteriores al cambio.
+        """
+        self._tasks.pop(key, None)
+        with self._lock:
+            self._calls.pop(key, None)
+
+    def share(self, function: Callable) -> Callable:
+        """
+        Decorador que agrupa las llamadas concurrentes con los mismos argumentos,
+        para funciones async o síncronas (ejecutadas en el pool de hilos).
+        """
+        def key(args, kwargs) -> Hashable:
+            return (function.__qualname__, args, tuple(sorted(kwargs.items())))
+
+        if asyncio.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def wrapper(*args, **kwargs):
+                return await self.do(key(args, kwargs), lambda: function(*args, **kwargs))
+        else:
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                return self.do_sync(key(args, kwargs), lambda: function(*args, **kwargs))
+        return wrapper
@@ -0,0 +1,143 @@
+import time
+import asyncio
+import logging
+from typing import Any, Optional
+from urllib.parse import urlencode
+
+import anyio
+
+from app.services import http_client
+from app.services.reversals_service import REVERSAL_FIELDS
+from app.services.reversal_stats_service import reversal_stats_snapshot
+from app.services.work_item_store import DELETED_FIELD, WorkItemStore, work_item_store
+from app.services.common import (
+    AZURE_ORG_URL,
+    PROJECT_NAME,
+    SYNC_WORK_ITEM_TYPES,
+    SYNC_INTERVAL,
+    SYNC_MAX_REQUESTS_PER_SECOND,
+    create_headers,
+)
+
+logger = logging.getLogger(__name__)
+
+class SyncWorker:
+    """
+    Tarea en segundo plano que lee los cambios de los work items con el API de
+    revisiones de reporte (reporting/workitemrevisions) y los guarda en la copia
+    local. Cada página avanza la marca de continuación, por lo que tras un
+    reinicio solo se leen los cambios pendientes. Los work items borrados llegan
+    con System.IsDeleted y se eliminan de la copia.
+    """
+    def __init__(
+        self,
+        store: WorkItemStore,
+        types: list[str] = SYNC_WORK_ITEM_TYPES,
+        fields: list[str] = REVERSAL_FIELDS,
+        interval: float = SYNC_INTERVAL,
+        max_requests_per_second: float = SYNC_MAX_REQUESTS_PER_SECOND
+    ):
+        self.store = store
+        self.types = types
+        self.fields = fields
+        self.interval = interval
+        # 0 (o un valor negativo) no limita las páginas, igual que AZURE_RATE_LIMIT
+        self.min_request_interval = 1 / max_requests_per_second if max_requests_per_second > 0 else 0
+        self.pages = 0
+        self.items_synced = 0
+        self.items_per_second = 0.0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def sync_page(self) -> bool:
+        """
+        Lee y guarda una página de revisiones. Retorna True si ya no hay más cambios pendientes.
+        """
+        params = {
+            "types": ",".join(self.types),
+            "fields": ",".join([*self.fields, DELETED_FIELD]),
+            "includeLatestOnly": "true",
+            "includeDeleted": "true",
+            "includeIdentityRef": "true",
+            "api-version": "7.1",
+        }
+        continuation_token = self.store.get_state("continuation_token")
+        if continuation_token:
+            params["continuationToken"] = continuation_token
+
+        started = time.monotonic()
+        url = f"{AZURE_ORG_URL}/{PROJECT_NAME}/_apis/wit/reporting/workitemrevisions?{urlencode(params)}"
+        response = await http_client.get(url, headers=create_headers())
+        if response.status_code != 200:
+            raise ValueError(f"Error al sincronizar los work items: {response.status_code} - {response.content.decode()}")
+
+        data = response.json()
+        work_items = data.get("values", [])
+        caught_up = data.get("isLastBatch", True)
+        self.store.apply_page(work_items, data.get("continuationToken") or continuation_token, caught_up)
+
+        self.pages += 1
+        self.items_synced += len(work_items)
+        elapsed = time.monotonic() - started
+        if work_items and elapsed > 0:
+            self.items_per_second = len(work_items) / elapsed
+
+        if work_items:
+            await self.refresh_stats()
+        return caught_up
+
+    async def refresh_stats(self):
+        # Actualizar la vista de estadísticas fuera del event loop para no cargarla en una solicitud
+        if reversal_stats_snapshot is not None and reversal_stats_snapshot.store is self.store:
+            await anyio.to_thread.run_sync(reversal_stats_snapshot.get)
+
+    async def run(self):
+        await self.refresh_stats()
+        while True:
+            started = time.monotonic()
+            try:
+                caught_up = await self.sync_page()
+                self.last_error = None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Reintentar en el siguiente ciclo sin detener el worker
+                self.errors += 1
+                self.last_error = str(e)
+                logger.warning("Error en la sincronización de work items: %s", e)
+                caught_up = True
+
+            # Esperar al siguiente ciclo, o respetar el límite de solicitudes mientras hay páginas pendientes
+            wait = self.interval if caught_up else self.min_request_interval - (time.monotonic() - started)
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "items": self.store.count(),
+            "pages": self.pages,
+            "items_synced": self.items_synced,
+            "items_per_second": round(self.items_per_second, 2),
+            "lag_seconds": self.store.lag(),
+            "fresh": self.store.is_fresh(),
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
+
+# Worker compartido, solo existe si la copia local está habilitada
+sync_worker = SyncWorker(work_item_store) if work_item_store is not None else None
@@ -0,0 +1,127 @@
+import time
+import asyncio
+import logging
+from typing import Any, Optional
+
+from app.services import http_client
+from app.services.single_flight import SingleFlight
+from app.services.common import (
+    AZURE_ORG_URL,
+    PROJECT_NAME,
+    TEAM_MEMBERS_TTL,
+    TEAM_MEMBERS_MAX_STALENESS,
+    create_headers,
+)
+
+logger = logging.getLogger(__name__)
+
+async def fetch_team_members(team_name: str) -> list[dict[str, Any]]:
+    """
+    Consulta a Azure DevOps las identidades de los miembros de un equipo.
+    """
+    # URL para obtener los miembros del equipo
+    url = f"{AZURE_ORG_URL}/_apis/projects/{PROJECT_NAME}/teams/{team_name}/members?api-version=7.1"
+    response = await http_client.get(url, headers=create_headers())
+
+    if response.status_code == 200:
+        return [
+            {
+                "id": member["identity"].get("id"),
+                "name": member["identity"]["displayName"],
+                "email": member["identity"]["uniqueName"],
+            }
+            for member in response.json()["value"]
+        ]
+    else:
+        raise ValueError(f"Error al obtener los miembros del equipo: {response.status_code} - {response.content.decode()}")
+
+class TeamDirectory:
+    """
+    Cache de los miembros de los equipos y de sus identidades. Los miembros
+    cambian con poca frecuencia: pasados `ttl` segundos se siguen retornando los
+    datos guardados mientras se actualizan en segundo plano, y solo después de
+    `max_staleness` segundos la solicitud espera la consulta a Azure.
+    """
+    def __init__(self, ttl: float = TEAM_MEMBERS_TTL, max_staleness: float = TEAM_MEMBERS_MAX_STALENESS):
+        self.ttl = ttl
+        self.max_staleness = max_staleness
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self._teams: dict[str, dict[str, Any]] = {}
+        self._loads = SingleFlight("team_members")
+
+    async def get_members(self, team_name: str) -> list[dict[str, Any]]:
+        entry = self._teams.get(team_name)
+        age = time.monotonic() - entry["loaded_at"] if entry is not None else None
+        if age is None or age > self.max_staleness:
+            self.misses += 1
+            # Varias solicitudes del mismo equipo esperan una sola consulta
+            return await self._loads.do(team_name, lambda: self._fetch(team_name))
+
+        self.hits += 1
+        if age > self.ttl and not self._loads.in_flight(team_name):
+            self.refreshes += 1
+            self._loads.task(team_name, lambda: self._fetch(team_name)).add_done_callback(self._log_refresh_error)
+        return entry["members"]
+
+    async def _fetch(self, team_name: str) -> list[dict[str, Any]]:
+        members = await fetch_team_members(team_name)
+        self._teams[team_name] = {
+            "members": members,
+            "identities": {member["email"].lower(): member for member in members},
+            "loaded_at": time.monotonic(),
+        }
+        return members
+
+    def _log_refresh_error(self, task: asyncio.Task):
+        # Si la actualización falla se siguen usando los datos guardados
+        if not task.cancelled() and task.exception() is not None:
+            self.refresh_errors += 1
+            logger.warning("Error al actualizar los miembros del equipo: %s", task.exception())
+
+    async def find_member(self, team_name: str, user_email: str) -> Optional[dict[str, Any]]:
+        """
+        Retorna la identidad de un miembro del equipo por su correo, o None si no pertenece al equipo.
+        """
+        await self.get_members(team_name)
+        return self._teams[team_name]["identities"].get(user_email.lower())
+
+    async def validate_member(self, team_name: str, user_email: str) -> str:
+        """
+        Verifica que el correo sea de un miembro del equipo antes de asignarle un
+        ticket, y retorna el correo registrado en Azure. Si los miembros no se
+        pueden consultar la validación queda a cargo de Azure.
+        """
+        try:
+            member = await self.find_member(team_name, user_email)
+        except ValueError as e:
+            logger.warning("No se pudo validar el usuario %s: %s", user_email, e)
+            return user_email
+        if member is None:
+            raise ValueError(f"El usuario {user_email} no es miembro del equipo {team_name}")
+        return member["email"]
+
+    def invalidate(self, team_name: Optional[str] = None):
+        if team_name is None:
+            self._teams.clear()
+        else:
+            self._teams.pop(team_name, None)
+
+    def stats(self) -> dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "teams": {
+                team_name: {"members": len(entry["members"]), "age_seconds": round(now - entry["loaded_at"], 1)}
+                for team_name, entry in self._teams.items()
+            },
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "coalesced": self._loads.coalesced,
+        }
+
+# Directorio compartido de miembros de los equipos
+team_directory = TeamDirectory()
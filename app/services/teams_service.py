@@ -1,70 +1,162 @@
-import requests
+import asyncio
+from typing import Any
 
-from app.services.common import AZURE_ORG_URL, PROJECT_NAME, create_headers
+from app.services import http_client
+from app.services.cache_service import ticket_cache
+from app.models.ticket_model import TicketState, TicketEventType, can_transition
+from app.services.event_bus import ticket_events
+from app.services.team_directory import team_directory
+from app.services.rate_limiter import Priority, prioritize
+from app.services.ticket_service import (
+    TicketService,
+    MAX_BATCH_IDS,
+    TRANSITION_FIELDS,
+    build_move_payload,
+    filter_ticket_data,
+    filter_transition_data,
+)
+from app.services.work_item_store import work_item_store
+from app.services.wiql_builder import WiqlQuery
+from app.services.common import AZURE_ORG_URL, PROJECT_NAME, TEAM_FAN_OUT_CONCURRENCY, create_headers
+
+def build_assign_payload(current: dict[str, Any], team_name: str, user_email: str):
+    """
+    Payload para asignar un ticket a un miembro del equipo. Los tickets solicitados
+    pasan a 'Asignado'; los que ya tienen evaluador solo cambian de responsable.
+    """
+    assign = [
+        {"op": "add", "path": "/fields/System.AssignedTo", "value": user_email},
+        {"op": "add", "path": "/fields/System.AreaPath", "value": f"{PROJECT_NAME}\\{team_name}"},
+    ]
+    if can_transition(current.get("state"), TicketState.asignado):
+        # El área del equipo reemplaza a la que agrega la transición
+        payload = build_move_payload(current, TicketState.asignado, user_email)
+        return [op for op in payload if op["path"] not in ["/fields/System.AssignedTo", "/fields/System.AreaPath"]] + assign
+    if current.get("state") in [TicketState.asignado.value, TicketState.en_evaluacion.value]:
+        return [{"op": "test", "path": "/rev", "value": current.get("rev")}] + assign
+    raise ValueError(f"No se puede asignar un ticket en estado {current.get('state')}")
 
 class TeamsService:
     @staticmethod
-    def get_team_members(team_name: str):
+    async def get_team_members(team_name: str):
         """
-        Obtiene los miembros de un equipo de Azure DevOps.
+        Obtiene los miembros de un equipo de Azure DevOps, desde el directorio de equipos.
         """
-        # URL para obtener los miembros del equipo
-        url = f"{AZURE_ORG_URL}/_apis/projects/{PROJECT_NAME}/teams/{team_name}/members?api-version=7.1"
-        # Hacer la solicitud GET para obtener los miembros del equipo
-        response = requests.get(url, headers=create_headers())
-
-        if response.status_code == 200:
-            # Retornar los miembros del equipo
-            data = response.json()
-            team_members = data["value"]
-            # Extraer los datos importantes de cada miembro
-            members_info = [
-                {
-                    "name": member["identity"]["displayName"],
-                    "email": member["identity"]["uniqueName"],
-                }
-                for member in team_members
-            ]
-            return {
-                "count": data["count"],
-                "members": members_info
-            }
-        else:
-            raise ValueError(f"Error al obtener los miembros del equipo: {response.status_code} - {response.content.decode()}")
+        members = await team_directory.get_members(team_name)
+        return {
+            "count": len(members),
+            "members": [{"name": member["name"], "email": member["email"]} for member in members]
+        }
         
     @staticmethod
-    def get_tickets_by_member(team_name: str, user_email: str, state: str):
+    async def get_tickets_by_member(team_name: str, user_email: str, state: str):
         """
         Obtiene los tickets asignados a un usuario por su correo electrónico.
         """
+        if work_item_store is not None and work_item_store.is_fresh():
+            return TeamsService._get_tickets_local(team_name, [user_email], state)[0]
+
         # Filtrar tickets por estado y asignado a usuario
-        url = f"{AZURE_ORG_URL}/{PROJECT_NAME}/{team_name}/_apis/wit/wiql?api-version=7.1"
-        query = {
-            "query": f"SELECT [System.Id], [System.Title], [System.State], [System.AssignedTo] "
-                     f"FROM WorkItems "
-                     f"WHERE [System.AssignedTo] = '{user_email}' "
-                     f"AND [System.State] = '{state}'"
-                     f"AND [System.AreaPath] = '{PROJECT_NAME}\\{team_name}'"
+        query = (
+            WiqlQuery(["System.Id", "System.Title", "System.State", "System.AssignedTo"])
+            .where("System.AssignedTo", "=", user_email)
+            .where("System.State", "=", state)
+            .where("System.AreaPath", "=", f"{PROJECT_NAME}\\{team_name}")
+        )
+        ids = await TicketService.query_work_item_ids(query, team_name=team_name)
+
+        tickets = [{"id": ticket_id} for ticket_id in ids]
+        return {
+            "member": user_email,
+            "count": len(tickets),
+            "tickets": tickets    
         }
+    
+    @staticmethod
+    async def get_tickets_by_members(team_name: str, user_emails: list[str], state: str):
+        """
+        Obtiene los tickets asignados a varios usuarios con una sola consulta WIQL,
+        agrupando el resultado por usuario. Si la consulta agrupada falla se
+        consulta cada usuario de forma concurrente.
+        """
+        if not user_emails:
+            return []
 
-        response = requests.post(url, headers=create_headers(content_type="application/json"), json=query)
+        # Responder desde la copia local sincronizada si está al día
+        if work_item_store is not None and work_item_store.is_fresh():
+            return TeamsService._get_tickets_local(team_name, user_emails, state)
 
-        if response.status_code == 200:
-            work_items = response.json()["workItems"]
-            tickets = [{"id": item["id"]} for item in work_items]
-            return {
-                "member": user_email,
-                "count": len(tickets),
-                "tickets": tickets    
+        try:
+            return await TeamsService._get_tickets_grouped(team_name, user_emails, state)
+        except ValueError:
+            return await TeamsService._get_tickets_fan_out(team_name, user_emails, state)
+
+    @staticmethod
+    def _get_tickets_local(team_name: str, user_emails: list[str], state: str):
+        tickets_by_member = {email.lower(): [] for email in user_emails}
+        for ticket_id, email in work_item_store.query_assigned(state, f"{PROJECT_NAME}\\{team_name}", user_emails):
+            tickets_by_member[email].append({"id": ticket_id})
+
+        return [
+            {
+                "member": email,
+                "count": len(tickets_by_member[email.lower()]),
+                "tickets": tickets_by_member[email.lower()]
             }
-        else:
-            raise ValueError(f"Error al obtener los tickets: {response.status_code} - {response.content.decode()}")
-    
+            for email in user_emails
+        ]
+
     @staticmethod
-    def assign_ticket_to_member(team_name: str, user_email: str, ticket_id: int):
+    async def _get_tickets_grouped(team_name: str, user_emails: list[str], state: str):
+        query = (
+            WiqlQuery()
+            .where_in("System.AssignedTo", user_emails)
+            .where("System.State", "=", state)
+            .where("System.AreaPath", "=", f"{PROJECT_NAME}\\{team_name}")
+        )
+        # WIQL solo retorna ids, el asignado se obtiene con una consulta en lote
+        ids = await TicketService.query_work_item_ids(query, team_name=team_name)
+        work_items = await TicketService.get_work_items_batch(ids, ["System.Id", "System.AssignedTo"]) if ids else []
+
+        # Conservar el orden retornado por la consulta WIQL
+        position = {ticket_id: index for index, ticket_id in enumerate(ids)}
+        tickets_by_member = {email.lower(): [] for email in user_emails}
+        for item in sorted(work_items, key=lambda item: position[item["id"]]):
+            assigned_to = item.get("fields", {}).get("System.AssignedTo") or {}
+            email = assigned_to.get("uniqueName", "").lower()
+            if email in tickets_by_member:
+                tickets_by_member[email].append({"id": item["id"]})
+
+        return [
+            {
+                "member": email,
+                "count": len(tickets_by_member[email.lower()]),
+                "tickets": tickets_by_member[email.lower()]
+            }
+            for email in user_emails
+        ]
+
+    @staticmethod
+    async def _get_tickets_fan_out(team_name: str, user_emails: list[str], state: str):
+        semaphore = asyncio.Semaphore(TEAM_FAN_OUT_CONCURRENCY)
+
+        async def get_member_tickets(email: str):
+            async with semaphore:
+                try:
+                    return await TeamsService.get_tickets_by_member(team_name, email, state)
+                except Exception as e:
+                    # Un error de un miembro no debe afectar a los demás
+                    return {"member": email, "count": 0, "tickets": [], "error": str(e)}
+
+        return await asyncio.gather(*[get_member_tickets(email) for email in user_emails])
+
+    @staticmethod
+    async def assign_ticket_to_member(team_name: str, user_email: str, ticket_id: int):
         """
         Asigna un ticket a un miembro del equipo por su correo electrónico.
         """
+        # Validar el usuario localmente en lugar de esperar el rechazo de Azure
+        user_email = await team_directory.validate_member(team_name, user_email)
         # URL para actualizar el ticket
         url = f"{AZURE_ORG_URL}/{PROJECT_NAME}/_apis/wit/workitems/{ticket_id}?api-version=7.1"
         # Datos para actualizar el ticket
@@ -73,12 +165,74 @@ class TeamsService:
             {"op": "add","path": "/fields/System.AreaPath","value": f"{PROJECT_NAME}\\{team_name}"}
         ]
 
-        response = requests.patch(url, headers=create_headers(), json=update_data)
+        response = await http_client.patch(url, headers=create_headers(), json=update_data)
 
         if response.status_code == 200:
+            work_item = response.json()
+            ticket_cache.invalidate(ticket_id, work_item.get("rev"))
+            ticket_events.publish(TicketEventType.assigned, filter_ticket_data(work_item))
             return {
                 "ticket_id": ticket_id,
                 "assigned_to": user_email,
             }
         else:
-            raise ValueError(f"Error al asignar el ticket: {response.status_code} - {response.content.decode()}")
\ No newline at end of file
+            raise ValueError(f"Error al asignar el ticket: {response.status_code} - {response.content.decode()}")
+
+    @staticmethod
+    async def bulk_assign(team_name: str, assignments: list[dict[str, Any]]):
+        """
+        Asigna varios tickets a miembros del equipo. Los estados se validan con una
+        sola consulta en lote y los cambios se envían con el API $batch.
+        """
+        assignments_by_id = {assignment["ticket_id"]: assignment for assignment in assignments}
+        ids = list(assignments_by_id)
+        if len(ids) != len(assignments):
+            raise ValueError("No se puede asignar el mismo ticket más de una vez en la misma solicitud")
+        if len(ids) > MAX_BATCH_IDS:
+            raise ValueError(f"El número de tickets no puede exceder {MAX_BATCH_IDS}. Tickets recibidos: {len(ids)}")
+
+        # Asignar tickets es una mutación aunque use las operaciones en lote
+        with prioritize(Priority.mutation):
+            work_items = {item["id"]: item for item in await TicketService.get_work_items_batch(ids, TRANSITION_FIELDS)} if ids else {}
+
+            results = {}
+            payloads = {}
+            for ticket_id, assignment in assignments_by_id.items():
+                work_item = work_items.get(ticket_id)
+                if work_item is None:
+                    results[ticket_id] = {"ticket_id": ticket_id, "status": "error", "error": f"El ticket {ticket_id} no existe"}
+                    continue
+                try:
+                    user_email = await team_directory.validate_member(team_name, assignment["user_email"])
+                    payloads[ticket_id] = build_assign_payload(filter_transition_data(work_item), team_name, user_email)
+                except ValueError as e:
+                    results[ticket_id] = {"ticket_id": ticket_id, "status": "error", "error": str(e)}
+
+            updates = await TicketService.update_work_items_batch(payloads) if payloads else {}
+        for ticket_id, response in updates.items():
+            body = response["body"] or {}
+            if response["code"] in [200, 201]:
+                ticket_cache.invalidate(ticket_id, body.get("rev"))
+                ticket_data = filter_ticket_data(body)
+                previous_state = work_items[ticket_id]["fields"].get("System.State")
+                if ticket_data["state"] != previous_state:
+                    ticket_events.publish(TicketEventType.state_changed, ticket_data, previousState=previous_state)
+                ticket_events.publish(TicketEventType.assigned, ticket_data)
+                results[ticket_id] = {
+                    "ticket_id": ticket_id,
+                    "status": "success",
+                    "assigned_to": assignments_by_id[ticket_id]["user_email"],
+                    "state": ticket_data["state"],
+                }
+            elif response["code"] in [409, 412]:
+                results[ticket_id] = {"ticket_id": ticket_id, "status": "error", "error": f"El ticket {ticket_id} fue modificado por otro usuario, intente nuevamente"}
+            else:
+                results[ticket_id] = {"ticket_id": ticket_id, "status": "error", "error": f"Error al asignar el ticket: {response['code']} - {body.get('message', body)}"}
+
+        ordered = [results[ticket_id] for ticket_id in ids]
+        return {
+            "count": len(ordered),
+            "succeeded": sum(1 for result in ordered if result["status"] == "success"),
+            "failed": sum(1 for result in ordered if result["status"] == "error"),
+            "results": ordered,
+        }
\ No newline at end of file
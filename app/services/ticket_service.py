@@ -1,12 +1,31 @@
-import requests
+import json
+import asyncio
 from typing import Optional
-from typing import Any
+from urllib.parse import quote
+from typing import Any, AsyncIterable, Awaitable
 
-from app.models.ticket_model import TicketState
+from app.models.ticket_model import TicketState, TicketDateField, TicketEventType, can_transition
+from app.schemas.ticket_schema import TicketSearchFilters
 from app.services.comments_service import CommentsService
 from app.services.attachments_service import AttachmentsService
+from app.services.cache_service import ticket_cache
+from app.services.event_bus import ticket_events
+from app.services.team_directory import team_directory
+from app.services.multipart_stream import FileStream
+from app.services.rate_limiter import Priority, prioritize
 
-from app.services.common import AZURE_ORG_URL, PROJECT_NAME, create_headers
+from app.services import http_client
+from app.services.wiql_builder import WiqlQuery, Macro
+from app.services.common import AZURE_ORG_URL, PROJECT_NAME, ASSIGNED_TEAM_NAME, BATCH_COMMENTS_CONCURRENCY, create_headers
+
+def filter_attachment_data(relation):
+    return {
+        "resourceCreatedDate": relation["attributes"].get("resourceCreatedDate", ""),
+        "name": relation["attributes"].get("name", "Sin nombre"),
+        "comment": relation["attributes"].get("comment", ""),
+        "url": relation["url"],
+        "id": relation["url"].split("/")[-1],  # Extraer el GUID al final de la URL
+    }
 
 def filter_ticket_data(
     ticket_data, 
@@ -26,36 +45,348 @@ def filter_ticket_data(
     data["state"] = fields.get("System.State")
     data["assignedTo"] = fields.get("System.AssignedTo").get("uniqueName") if fields.get("System.AssignedTo") else ""
     data["attachments"] = [
-        {
-            "resourceCreatedDate": relation["attributes"].get("resourceCreatedDate", ""),
-            "name": relation["attributes"].get("name", "Sin nombre"),
-            "comment": relation["attributes"].get("comment", ""),
-            "url": relation["url"],
-            "id": relation["url"].split("/")[-1],  # Extraer el GUID al final de la URL
-        } for relation in relations if relation["rel"] == "AttachedFile"
+        filter_attachment_data(relation) for relation in relations if relation["rel"] == "AttachedFile"
     ]
     if include_comments and comments_data is not None:
         data["comments"] = comments_data
     data["azure"] = fields
     return data.copy()
 
+# Campos que lee `filter_ticket_data`, usados para proyectar las consultas en lote
+TICKET_FIELDS = ["System.Id", "System.Rev", "System.AreaPath", "System.Title", "System.State", "System.AssignedTo"]
+
+def project_ticket_data(ticket_data: dict[str, Any], fields: list[str]) -> dict[str, Any]:
+    # Reduce un ticket completo a lo que retorna una consulta en lote proyectada a `fields`
+    azure_data = ticket_data.get("azure", {})
+    return {
+        **ticket_data,
+        "attachments": [],
+        "azure": {field: azure_data[field] for field in fields if field in azure_data},
+    }
+
+# Límites de las consultas en lote
+WORKITEMS_BATCH_SIZE = 200
+MAX_BATCH_IDS = 500
+
+# Número máximo de actualizaciones por solicitud al API $batch
+WORKITEMS_UPDATE_BATCH_SIZE = 200
+
+# Límites de la paginación de búsquedas
+SEARCH_DEFAULT_TOP = 50
+SEARCH_MAX_TOP = 200
+
+# Campos de fecha por los que se puede filtrar una búsqueda
+DATE_FIELDS = {
+    TicketDateField.last_time_in_draft: "Custom.Ultimavezenborrador",
+    TicketDateField.last_time_requested: "Custom.Ultimavezsolicitado",
+    TicketDateField.last_time_assigned: "Custom.Ultimavezasignado",
+    TicketDateField.last_time_in_evaluation: "Custom.Ultimavezenevaluacion",
+    TicketDateField.last_time_returned: "Custom.Ultimavezquehubodevolucion",
+}
+
+# Campos necesarios para validar y aplicar una transición de estado
+TRANSITION_FIELDS = ["System.State", "Custom.Devoluciones", "System.Rev"]
+
+def filter_transition_data(work_item: dict[str, Any]) -> dict[str, Any]:
+    # Datos de un work item leído con TRANSITION_FIELDS que usa `build_move_payload`
+    fields = work_item.get("fields", {})
+    return {
+        "state": fields.get("System.State"),
+        "iterations": fields.get("Custom.Devoluciones"),
+        "rev": work_item.get("rev", fields.get("System.Rev")),
+    }
+
+def build_move_payload(
+    current: dict[str, Any],
+    new_state: TicketState,
+    user_email: Optional[str] = None,
+    payload: Optional[list] = None
+):
+    if payload is None: payload = []
+    current_state = current.get("state")
+
+    # Validar si el nuevo estado es válido
+    if not can_transition(current_state, new_state):
+        raise ValueError(f"No se puede mover el ticket de {current_state} a {new_state}")
+
+    # Verificar que el ticket no haya cambiado desde la lectura (concurrencia optimista)
+    payload = [{"op": "test", "path": "/rev", "value": current.get("rev")}] + payload
+
+    # Payload básico para actualizar el estado
+    payload = payload + [
+        {"op": "add","path": "/fields/System.State","value": new_state.value}
+    ]
+    
+    # Si el nuevo estado es 'Asignado', es obligatorio recibir el 'user email'
+    if new_state == 'Asignado':
+        if not user_email:
+            raise ValueError(f"El usuario es obligatorio cuando el estado es '{new_state}'")
+        
+        # Agregar al payload la asignación del usuario
+        payload.extend([
+            {"op": "add","path": "/fields/System.AssignedTo","value": user_email},
+            {"op": "add","path": "/fields/System.AreaPath","value": f"{PROJECT_NAME}\\{ASSIGNED_TEAM_NAME}"}
+        ])
+    elif new_state == 'Borrador' or new_state == 'Aprobado' or new_state == 'Rechazado':
+        ## TODO: Change this to be dynamic of needed
+        payload.append(
+            {"op": "add","path": "/fields/System.AreaPath","value": f"{PROJECT_NAME}\\AC - Sede 1"}
+        )
+        if new_state == 'Borrador':
+            iterations = int(current.get("iterations") or 0)
+            payload.append(
+                {"op": "add","path": "/fields/Custom.Devoluciones","value": f"{iterations + 1}"}
+            )
+    
+    return payload
+
 class TicketService:
     @staticmethod
-    def get_ticket_data(ticket_id: int) -> dict[str, Any]:
-        # Obtener el estado actual del work item de Azure DevOps
-        url = f"{AZURE_ORG_URL}/{PROJECT_NAME}/_apis/wit/workitems/{ticket_id}?$expand=relations&api-version=7.1"
-        response = requests.get(url, headers=create_headers())
-        
+    async def get_work_item(ticket_id: int, fields: Optional[list[str]] = None) -> dict[str, Any]:
+        """
+        Obtiene el work item crudo de Azure DevOps, incluyendo sus relaciones.
+        Con `fields` solo se leen esos campos y no se incluyen las relaciones,
+        ya que Azure no permite proyectar campos y expandir relaciones a la vez.
+        """
+        if fields:
+            url = f"{AZURE_ORG_URL}/{PROJECT_NAME}/_apis/wit/workitems/{ticket_id}?fields={quote(','.join(fields), safe=',')}&api-version=7.1"
+        else:
+            url = f"{AZURE_ORG_URL}/{PROJECT_NAME}/_apis/wit/workitems/{ticket_id}?$expand=relations&api-version=7.1"
+        response = await http_client.get(url, headers=create_headers())
+
         if response.status_code == 200:
-            data = response.json()
-            comments = CommentsService.get_comments_of_a_ticket(ticket_id).get("comments")
-            
-            return filter_ticket_data(data, comments, True)
+            return response.json()
         else:
             raise ValueError(f"Error al obtener el ticket {ticket_id}: {response.status_code} - {response.content.decode()}")
+
+    @staticmethod
+    async def get_ticket_data(ticket_id: int, include_comments: bool = True) -> dict[str, Any]:
+        # Responder desde el cache si el ticket no ha sido modificado
+        cached = ticket_cache.get(ticket_id, include_comments)
+        if cached is not None:
+            return cached
+
+        # Las lecturas concurrentes del mismo ticket comparten una sola consulta a Azure
+        return await ticket_cache.reads.do(
+            (ticket_id, include_comments),
+            lambda: TicketService.fetch_ticket_data(ticket_id, include_comments),
+        )
+
+    @staticmethod
+    async def fetch_ticket_data(ticket_id: int, include_comments: bool = True) -> dict[str, Any]:
+        # Consultar el work item y sus comentarios de forma concurrente
+        calls = [TicketService.get_work_item(ticket_id)]
+        if include_comments:
+            calls.append(CommentsService.get_comments_of_a_ticket(ticket_id))
+        work_item, *comments_result = await asyncio.gather(*calls, return_exceptions=True)
+
+        # Priorizar el error del work item sobre el de los comentarios
+        if isinstance(work_item, BaseException):
+            raise work_item
+
+        comments = None
+        if include_comments:
+            if isinstance(comments_result[0], BaseException):
+                raise comments_result[0]
+            comments = comments_result[0].get("comments")
+
+        ticket_data = filter_ticket_data(work_item, comments, include_comments)
+        ticket_cache.put(ticket_data, include_comments)
+        return ticket_data
     
     @staticmethod
-    def create_ticket(type:str, payload: list):
+    async def get_work_items_batch(ids: list[int], fields: Optional[list[str]] = None) -> list[dict[str, Any]]:
+        """
+        Obtiene varios work items con el API workitemsbatch, en bloques concurrentes.
+        Azure no permite proyectar campos y expandir relaciones a la vez, por lo que
+        las relaciones solo se incluyen cuando no se indica `fields`.
+        """
+        url = f"{AZURE_ORG_URL}/{PROJECT_NAME}/_apis/wit/workitemsbatch?api-version=7.1"
+
+        async def fetch_chunk(chunk: list[int]):
+            body = {"ids": chunk, "errorPolicy": "omit"}
+            if fields:
+                body["fields"] = fields
+            else:
+                body["$expand"] = "relations"
+
+            response = await http_client.post(url, headers=create_headers(content_type="application/json"), json=body)
+            if response.status_code == 200:
+                # Los ids inexistentes se retornan como null con errorPolicy=omit
+                return [item for item in response.json().get("value", []) if item]
+            else:
+                raise ValueError(f"Error al obtener los tickets: {response.status_code} - {response.content.decode()}")
+
+        chunks = [ids[i:i + WORKITEMS_BATCH_SIZE] for i in range(0, len(ids), WORKITEMS_BATCH_SIZE)]
+        results = await asyncio.gather(*[fetch_chunk(chunk) for chunk in chunks])
+        return [item for chunk in results for item in chunk]
+
+    @staticmethod
+    async def update_work_items_batch(payloads: dict[int, list]) -> dict[int, dict[str, Any]]:
+        """
+        Aplica varios JSON patch con el API $batch de Azure DevOps, en bloques
+        concurrentes. Cada work item se actualiza de forma independiente, por lo
+        que se retorna el código y el cuerpo de la respuesta de cada uno.
+        """
+        url = f"{AZURE_ORG_URL}/_apis/wit/$batch?api-version=7.1"
+
+        async def send_chunk(chunk: list[int]):
+            body = [
+                {
+                    "method": "PATCH",
+                    "uri": f"/{quote(PROJECT_NAME)}/_apis/wit/workitems/{ticket_id}?api-version=7.1",
+                    "headers": {"Content-Type": "application/json-patch+json"},
+                    "body": payloads[ticket_id],
+                }
+                for ticket_id in chunk
+            ]
+            response = await http_client.post(url, headers=create_headers(content_type="application/json"), json=body)
+            if response.status_code != 200:
+                raise ValueError(f"Error al actualizar los tickets: {response.status_code} - {response.content.decode()}")
+
+            results = {}
+            for ticket_id, item in zip(chunk, response.json().get("value", [])):
+                # El cuerpo de cada respuesta llega serializado como texto
+                item_body = item.get("body")
+                if isinstance(item_body, str):
+                    try:
+                        item_body = json.loads(item_body)
+                    except ValueError:
+                        item_body = {"message": item_body}
+                results[ticket_id] = {"code": item.get("code"), "body": item_body}
+            return results
+
+        ids = list(payloads)
+        chunks = [ids[i:i + WORKITEMS_UPDATE_BATCH_SIZE] for i in range(0, len(ids), WORKITEMS_UPDATE_BATCH_SIZE)]
+        chunk_results = await asyncio.gather(*[send_chunk(chunk) for chunk in chunks], return_exceptions=True)
+
+        results = {}
+        for chunk, chunk_result in zip(chunks, chunk_results):
+            for ticket_id in chunk:
+                # Un bloque fallido marca con error solo a sus work items
+                if isinstance(chunk_result, BaseException):
+                    results[ticket_id] = {"code": None, "body": {"message": str(chunk_result)}}
+                else:
+                    results[ticket_id] = chunk_result.get(ticket_id, {"code": None, "body": {"message": "Sin respuesta de Azure DevOps"}})
+        return results
+
+    @staticmethod
+    async def query_work_item_ids(query: WiqlQuery, top: Optional[int] = None, team_name: Optional[str] = None) -> list[int]:
+        """
+        Ejecuta una consulta WIQL y retorna los ids encontrados, en el orden de la consulta.
+        """
+        scope = f"{PROJECT_NAME}/{team_name}" if team_name else PROJECT_NAME
+        url = f"{AZURE_ORG_URL}/{scope}/_apis/wit/wiql?api-version=7.1"
+        if top is not None:
+            url += f"&$top={top}"
+
+        response = await http_client.post(url, headers=create_headers(content_type="application/json"), json={"query": query.build()})
+        if response.status_code == 200:
+            return [item["id"] for item in response.json()["workItems"]]
+        else:
+            raise ValueError(f"Error al obtener los tickets: {response.status_code} - {response.content.decode()}")
+
+    @staticmethod
+    async def search_tickets(
+        filters: TicketSearchFilters,
+        top: int = SEARCH_DEFAULT_TOP,
+        cursor: Optional[int] = None,
+        work_item_type: Optional[str] = None,
+        fields: list[str] = TICKET_FIELDS
+    ) -> dict[str, Any]:
+        """
+        Busca tickets con filtros y paginación por cursor. Los resultados se
+        ordenan del más reciente al más antiguo y el cursor es el último id retornado.
+        """
+        if not 1 <= top <= SEARCH_MAX_TOP:
+            raise ValueError(f"El parámetro $top debe estar entre 1 y {SEARCH_MAX_TOP}")
+
+        query = WiqlQuery().where("System.TeamProject", "=", Macro("@project"))
+        if work_item_type or filters.type:
+            query.where("System.WorkItemType", "=", work_item_type or filters.type)
+        if filters.state:
+            query.where("System.State", "=", filters.state.value)
+        if filters.assigned_to:
+            query.where("System.AssignedTo", "=", filters.assigned_to)
+        if filters.area:
+            query.where("System.AreaPath", "UNDER", filters.area)
+        if filters.nit:
+            query.where("Custom.NIT", "=", filters.nit)
+        if filters.obligation_number:
+            query.where("Custom.Numerodeobligacion", "=", filters.obligation_number)
+        if filters.date_from or filters.date_to:
+            if not filters.date_field:
+                raise ValueError("El parámetro date_field es obligatorio al filtrar por fechas")
+            date_field = DATE_FIELDS[filters.date_field]
+            if filters.date_from:
+                query.where(date_field, ">=", filters.date_from)
+            if filters.date_to:
+                query.where(date_field, "<=", filters.date_to)
+        if cursor is not None:
+            query.where("System.Id", "<", cursor)
+        query.order_by("System.Id", descending=True)
+
+        # Se pide un elemento adicional para saber si existe otra página
+        ids = await TicketService.query_work_item_ids(query, top=top + 1)
+        page_ids = ids[:top]
+        result = await TicketService.get_tickets_data(page_ids, fields=fields) if page_ids else {"tickets": []}
+
+        return {
+            "count": len(result["tickets"]),
+            "tickets": result["tickets"],
+            "next_cursor": page_ids[-1] if len(ids) > top else None,
+        }
+
+    @staticmethod
+    async def get_tickets_data(
+        ids: list[int],
+        include_comments: bool = False,
+        include_attachments: bool = False,
+        fields: list[str] = TICKET_FIELDS
+    ) -> dict[str, Any]:
+        """
+        Obtiene varios tickets en pocas consultas. Los comentarios se consultan
+        solo si se piden, con un número limitado de solicitudes simultáneas.
+        """
+        ids = list(dict.fromkeys(ids))
+        if len(ids) > MAX_BATCH_IDS:
+            raise ValueError(f"El número de tickets no puede exceder {MAX_BATCH_IDS}. Tickets recibidos: {len(ids)}")
+
+        # Los tickets en cache están completos; sin adjuntos se proyectan a los mismos
+        # campos que las consultas en lote para que todos tengan la misma forma
+        tickets = {}
+        for ticket_id in ids:
+            cached = ticket_cache.get(ticket_id, include_comments)
+            if cached is not None:
+                tickets[ticket_id] = cached if include_attachments else project_ticket_data(cached, fields)
+
+        pending = [ticket_id for ticket_id in ids if ticket_id not in tickets]
+        work_items = await TicketService.get_work_items_batch(pending, None if include_attachments else fields) if pending else []
+
+        comments = {}
+        if include_comments and work_items:
+            semaphore = asyncio.Semaphore(BATCH_COMMENTS_CONCURRENCY)
+
+            async def fetch_comments(ticket_id: int):
+                async with semaphore:
+                    comments[ticket_id] = (await CommentsService.get_comments_of_a_ticket(ticket_id)).get("comments")
+
+            await asyncio.gather(*[fetch_comments(item["id"]) for item in work_items])
+
+        for item in work_items:
+            ticket_data = filter_ticket_data(item, comments.get(item["id"]), include_comments)
+            # Solo los work items sin proyección se pueden guardar en el cache
+            if include_attachments:
+                ticket_cache.put(ticket_data, include_comments)
+            tickets[item["id"]] = ticket_data
+
+        return {
+            "tickets": [tickets[ticket_id] for ticket_id in ids if ticket_id in tickets],
+            "missing": [ticket_id for ticket_id in ids if ticket_id not in tickets],
+        }
+
+    @staticmethod
+    async def create_ticket(type:str, payload: list):
         # Crear un nuevo ticket en Azure DevOps
         url = f"{AZURE_ORG_URL}/{PROJECT_NAME}/_apis/wit/workitems/${type}?api-version=7.1"
         
@@ -64,101 +395,211 @@ class TicketService:
             {"op": "add", "path": "/fields/System.AreaPath", "value": f"{PROJECT_NAME}\\AC - Sede 1"}
         )
 
-        response = requests.patch(url, headers=create_headers(), json=payload)
+        response = await http_client.patch(url, headers=create_headers(), json=payload)
         ticket_data = response.json()
 
         if response.status_code in [200, 201]:
-            return filter_ticket_data(ticket_data)
+            ticket_data = filter_ticket_data(ticket_data)
+            ticket_events.publish(TicketEventType.created, ticket_data)
+            return ticket_data
         else:
             raise ValueError(f"Error al crear el ticket: {response.status_code} - {response.content.decode()}")
 
     @staticmethod
-    def move_ticket(ticket_id: int, new_state: TicketState,  user_email: Optional[str] = None, iterations: Optional[int] = None, payload: Optional[list] = None):
-        if payload is None: payload = []
-        # Validar si el nuevo estado es válido
-        valid_transitions = {
-            TicketState.borrador: [TicketState.solicitado],
-            TicketState.solicitado: [TicketState.asignado],
-            TicketState.asignado: [TicketState.en_evaluacion],
-            TicketState.en_evaluacion: [TicketState.borrador, TicketState.aprobado, TicketState.rechazado]
-        }
-
-        # Obtener el estado actual del ticket
-        current_state = TicketService.get_ticket_data(ticket_id)['state']
+    async def get_transition_data(ticket_id: int) -> dict[str, Any]:
+        """
+        Obtiene solo los campos necesarios para validar una transición de estado.
+        """
+        url = f"{AZURE_ORG_URL}/{PROJECT_NAME}/_apis/wit/workitems/{ticket_id}?fields={','.join(TRANSITION_FIELDS)}&api-version=7.1"
+        response = await http_client.get(url, headers=create_headers())
 
-        if new_state not in valid_transitions.get(current_state, []):
-            raise ValueError(f"No se puede mover el ticket de {current_state} a {new_state}")
+        if response.status_code == 200:
+            return filter_transition_data(response.json())
+        else:
+            raise ValueError(f"Error al obtener el ticket {ticket_id}: {response.status_code} - {response.content.decode()}")
 
-        # Payload básico para actualizar el estado
-        payload = payload + [
-            {"op": "add","path": "/fields/System.State","value": new_state.value}
-        ]
-        
-        # Si el nuevo estado es 'Asignado', es obligatorio recibir el 'user email'
-        if new_state == 'Asignado':
-            if not user_email:
-                raise ValueError(f"El usuario es obligatorio cuando el estado es '{new_state}'")
-            
-            # Agregar al payload la asignación del usuario
-            payload.extend([
-                {"op": "add","path": "/fields/System.AssignedTo","value": user_email},
-                ## TODO: Change this to be dynamic of needed
-                {"op": "add","path": "/fields/System.AreaPath","value": f"{PROJECT_NAME}\\AX - Grupo 1"}
-            ])
-        elif new_state == 'Borrador' or new_state == 'Aprobado' or new_state == 'Rechazado':
-            ## TODO: Change this to be dynamic of needed
-            payload.append(
-                {"op": "add","path": "/fields/System.AreaPath","value": f"{PROJECT_NAME}\\AC - Sede 1"}
-            )
-            if new_state == 'Borrador':
-                payload.append(
-                    {"op": "add","path": "/fields/Custom.Devoluciones","value": f"{iterations + 1}"}
-                )
-                
+    @staticmethod
+    async def move_ticket(ticket_id: int, new_state: TicketState,  user_email: Optional[str] = None, payload: Optional[list] = None):
+        # Las lecturas previas al cambio se atienden antes que las consultas de otras solicitudes
+        with prioritize(Priority.mutation):
+            # Validar el usuario localmente en lugar de esperar el rechazo de Azure
+            if user_email and new_state == TicketState.asignado:
+                user_email = await team_directory.validate_member(ASSIGNED_TEAM_NAME, user_email)
+            # Obtener el estado actual del ticket en una sola consulta y sin comentarios
+            current = await TicketService.get_transition_data(ticket_id)
+        payload = build_move_payload(current, new_state, user_email, payload)
 
         # Actualizar el estado en Azure DevOps
         url = f"{AZURE_ORG_URL}/{PROJECT_NAME}/_apis/wit/workitems/{ticket_id}?api-version=7.1"
-        response = requests.patch(url, headers=create_headers(), json=payload)
+        response = await http_client.patch(url, headers=create_headers(), json=payload)
 
         if response.status_code in [200, 201]:
-            return filter_ticket_data(response.json())
+            data = response.json()
+            ticket_cache.invalidate(ticket_id, data.get("rev"))
+            ticket_data = filter_ticket_data(data)
+            ticket_events.publish(TicketEventType.state_changed, ticket_data, previousState=current.get("state"))
+            if user_email and new_state == TicketState.asignado:
+                ticket_events.publish(TicketEventType.assigned, ticket_data)
+            return ticket_data
+        elif response.status_code in [409, 412]:
+            raise ValueError(f"El ticket {ticket_id} fue modificado por otro usuario, intente nuevamente")
         else:
             raise ValueError(f"Error al mover el ticket: {response.status_code} - {response.content.decode()}")
 
     @staticmethod
-    def add_comment_to_ticket(ticket_id: int, comment: str):
-        CommentsService.add_comment_to_ticket(ticket_id, comment)
-        return TicketService.get_ticket_data(ticket_id)
+    async def bulk_move_tickets(moves: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """
+        Mueve varios tickets de estado. Las transiciones se validan con una sola
+        consulta en lote y los cambios se envían con el API $batch. Cada elemento
+        de `moves` tiene id, new_state y opcionalmente user_email y payload.
+        """
+        moves_by_id = {move["id"]: move for move in moves}
+        ids = list(moves_by_id)
+        if len(ids) != len(moves):
+            raise ValueError("No se puede mover el mismo ticket más de una vez en la misma solicitud")
+        if len(ids) > MAX_BATCH_IDS:
+            raise ValueError(f"El número de tickets no puede exceder {MAX_BATCH_IDS}. Tickets recibidos: {len(ids)}")
+
+        # Mover tickets es una mutación aunque use las operaciones en lote
+        with prioritize(Priority.mutation):
+            work_items = {item["id"]: item for item in await TicketService.get_work_items_batch(ids, TRANSITION_FIELDS)} if ids else {}
+
+            results = {}
+            payloads = {}
+            for move in moves:
+                work_item = work_items.get(move["id"])
+                if work_item is None:
+                    results[move["id"]] = {"id": move["id"], "status": "error", "error": f"El ticket {move['id']} no existe"}
+                    continue
+                try:
+                    if move.get("user_email") and move["new_state"] == TicketState.asignado:
+                        move["user_email"] = await team_directory.validate_member(ASSIGNED_TEAM_NAME, move["user_email"])
+                    payloads[move["id"]] = build_move_payload(filter_transition_data(work_item), move["new_state"], move.get("user_email"), move.get("payload"))
+                except ValueError as e:
+                    results[move["id"]] = {"id": move["id"], "status": "error", "error": str(e)}
+
+            updates = await TicketService.update_work_items_batch(payloads) if payloads else {}
+        for ticket_id, response in updates.items():
+            body = response["body"] or {}
+            if response["code"] in [200, 201]:
+                ticket_cache.invalidate(ticket_id, body.get("rev"))
+                ticket_data = filter_ticket_data(body)
+                move = moves_by_id[ticket_id]
+                ticket_events.publish(TicketEventType.state_changed, ticket_data, previousState=work_items[ticket_id]["fields"].get("System.State"))
+                if move.get("user_email") and move["new_state"] == TicketState.asignado:
+                    ticket_events.publish(TicketEventType.assigned, ticket_data)
+                results[ticket_id] = {"id": ticket_id, "status": "success", "data": ticket_data}
+            elif response["code"] in [409, 412]:
+                results[ticket_id] = {"id": ticket_id, "status": "error", "error": f"El ticket {ticket_id} fue modificado por otro usuario, intente nuevamente"}
+            else:
+                results[ticket_id] = {"id": ticket_id, "status": "error", "error": f"Error al mover el ticket: {response['code']} - {body.get('message', body)}"}
+
+        return [results[ticket_id] for ticket_id in ids]
 
-    # Método para adjuntar múltiples archivos a un ticket
     @staticmethod
-    def attach_files_to_ticket(ticket_id: int, file_paths: list[str], max_files: int = 10):
-        # Validar que no se exceda el número máximo de archivos permitidos
-        if len(file_paths) > max_files:
-            raise ValueError(f"El número de archivos no puede exceder {max_files}. Archivos recibidos: {len(file_paths)}")
+    async def add_comment_to_ticket(ticket_id: int, comment: str, refresh: bool = False):
+        if refresh:
+            new_comment = await CommentsService.add_comment_to_ticket(ticket_id, comment)
+            ticket_cache.invalidate(ticket_id)
+            ticket_data = await TicketService.get_ticket_data(ticket_id)
+            ticket_events.publish(TicketEventType.comment_added, ticket_data, commentId=new_comment["comment_id"])
+            return ticket_data
+
+        cached = ticket_cache.peek(ticket_id)
+        if cached is not None and cached["data"] is not None:
+            # El ticket en cache tiene todos los campos: solo se envía el comentario,
+            # y los comentarios anteriores se consultan en paralelo si no están guardados
+            new_comment, previous = await TicketService._with_comments(
+                ticket_id, CommentsService.add_comment_to_ticket(ticket_id, comment)
+            )
+            ticket_data = cached["data"]
+        else:
+            # Sin el ticket en cache no se consultan los comentarios anteriores: la
+            # respuesta incluye solo el agregado (la lista completa con `refresh`)
+            new_comment, work_item = await asyncio.gather(
+                CommentsService.add_comment_to_ticket(ticket_id, comment),
+                TicketService.get_work_item(ticket_id),
+            )
+            ticket_data = filter_ticket_data(work_item)
+            previous = []
+        ticket_cache.invalidate(ticket_id)
+
+        # La lista de comentarios incluye el agregado, que la consulta en paralelo pudo haber leído ya
+        comments = [c for c in previous if c["id"] != new_comment["comment_id"]]
+        comments.append({
+            "id": new_comment["comment_id"],
+            "text": new_comment["comment_text"],
+            "createdDate": new_comment["created_date"],
+        })
+        ticket_data["comments"] = comments
+        # Los campos son anteriores al comentario, su revisión no corresponde al cambio
+        ticket_events.publish(TicketEventType.comment_added, {**ticket_data, "azure": {}}, commentId=new_comment["comment_id"])
+        return ticket_data
 
+    @staticmethod
+    async def _with_comments(ticket_id: int, mutation: Awaitable[Any]) -> tuple[Any, list[dict[str, Any]]]:
+        """
+        Ejecuta una mutación del ticket y retorna su resultado junto con los
+        comentarios del ticket: los del cache si están guardados, o consultados en
+        paralelo con la mutación. Se debe llamar antes de invalidar el cache.
+        """
+        cached = ticket_cache.peek(ticket_id)
+        if cached is not None and cached["data"] is not None and cached["include_comments"]:
+            return await mutation, cached["data"]["comments"]
+        result, comments = await asyncio.gather(mutation, CommentsService.get_comments_of_a_ticket(ticket_id))
+        return result, comments["comments"]
+
+    # Método para adjuntar múltiples archivos a un ticket
+    @staticmethod
+    async def attach_files_to_ticket(ticket_id: int, files: AsyncIterable[FileStream], refresh: bool = False):
         # Subir cada archivo y adjuntarlo al ticket
-        AttachmentsService.attach_files_to_ticket(ticket_id, file_paths)
-        return TicketService.get_ticket_data(ticket_id)
+        work_item, comments = await TicketService._with_comments(
+            ticket_id, AttachmentsService.attach_files_to_ticket(ticket_id, files)
+        )
+        ticket_cache.invalidate(ticket_id, work_item.get("rev"))
+        ticket_events.publish(TicketEventType.attachments_changed, filter_ticket_data(work_item))
+        if refresh:
+            return await TicketService.get_ticket_data(ticket_id)
+        return filter_ticket_data(work_item, comments, True)
 
     @staticmethod
-    def find_attachment_relation_index(ticket_id: int, attachment_url: str) -> int:
+    async def get_attachment(ticket_id: int, attachment_id: str) -> Optional[dict[str, Any]]:
         """
-        Buscar la posición de la relación (adjunto) en el Work Item para eliminarla.
+        Retorna los datos de un adjunto del ticket, o None si no pertenece al ticket.
         """
-        # Obtener los datos actuales del ticket para buscar el adjunto
-        ticket_data = TicketService.get_ticket_data(ticket_id)
+        ticket_data = await TicketService.get_ticket_data(ticket_id, include_comments=False)
+        for attachment in ticket_data["attachments"]:
+            if attachment["id"].split("?")[0].lower() == attachment_id.lower():
+                return attachment
+        return None
 
+    @staticmethod
+    def find_attachment_relation_index(work_item: dict[str, Any], attachment_url: str) -> int:
+        """
+        Buscar la posición de la relación (adjunto) en el Work Item para eliminarla.
+        """
         # Iterar sobre las relaciones del ticket y encontrar el índice del archivo adjunto
-        relations = ticket_data.get("relations", [])
+        relations = work_item.get("relations") or []
         for index, relation in enumerate(relations):
             if relation.get("url") == attachment_url and relation.get("rel") == "AttachedFile":
                 return index
         
-        raise ValueError(f"El archivo adjunto con la URL {attachment_url} no fue encontrado en el ticket {ticket_id}")
+        raise ValueError(f"El archivo adjunto con la URL {attachment_url} no fue encontrado en el ticket {work_item.get('id')}")
 
     @staticmethod
-    def remove_attachment_from_ticket(ticket_id: int, attachment_url: str):
-        attachment_idx = TicketService.find_attachment_relation_index(ticket_id, attachment_url)
-        AttachmentsService.remove_attachment_from_ticket(ticket_id, attachment_idx)
-        return TicketService.get_ticket_data(ticket_id)
\ No newline at end of file
+    async def remove_attachment_from_ticket(ticket_id: int, attachment_url: str, refresh: bool = False):
+        async def remove():
+            with prioritize(Priority.mutation):
+                # Obtener las relaciones actuales del ticket para buscar el adjunto
+                work_item = await TicketService.get_work_item(ticket_id)
+                attachment_idx = TicketService.find_attachment_relation_index(work_item, attachment_url)
+
+                # La revisión garantiza que el índice siga siendo válido al aplicar el PATCH
+                return await AttachmentsService.remove_attachment_from_ticket(ticket_id, attachment_idx, work_item.get("rev"))
+
+        work_item, comments = await TicketService._with_comments(ticket_id, remove())
+        ticket_cache.invalidate(ticket_id, work_item.get("rev"))
+        ticket_events.publish(TicketEventType.attachments_changed, filter_ticket_data(work_item), removed=attachment_url)
+        if refresh:
+            return await TicketService.get_ticket_data(ticket_id)
+        return filter_ticket_data(work_item, comments, True)
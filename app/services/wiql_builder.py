@@ -0,0 +1,74 @@
+import re
+from datetime import date, datetime
+from typing import Any, Optional
+
+# Solo se permiten nombres de campo de referencia (ej. System.State, Custom.NIT)
+FIELD_PATTERN = re.compile(r"^[A-Za-z][A-Za-z0-9_]*(\.[A-Za-z][A-Za-z0-9_]*)+$")
+OPERATORS = {"=", "<>", ">", ">=", "<", "<=", "UNDER", "NOT UNDER", "CONTAINS", "NOT CONTAINS"}
+
+class Macro(str):
+    """
+    Macro de WIQL (ej. @project, @today) que se inserta sin comillas.
+    """
+
+def wiql_string(value: str) -> str:
+    # Escapar las comillas simples para evitar inyección en la consulta WIQL
+    return "'" + str(value).replace("'", "''") + "'"
+
+def wiql_value(value: Any) -> str:
+    """
+    Convierte un valor de Python a un literal WIQL seguro.
+    """
+    if isinstance(value, Macro):
+        if not re.match(r"^@[A-Za-z]+$", value):
+            raise ValueError(f"Macro WIQL inválida: {value}")
+        return str(value)
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, datetime):
+        return wiql_string(value.isoformat())
+    if isinstance(value, date):
+        return wiql_string(value.isoformat())
+    return wiql_string(value)
+
+def wiql_field(field: str) -> str:
+    if not FIELD_PATTERN.match(field):
+        raise ValueError(f"Campo WIQL inválido: {field}")
+    return f"[{field}]"
+
+class WiqlQuery:
+    """
+    Constructor de consultas WIQL parametrizadas. Todos los valores se
+    convierten a literales escapados, nunca se concatenan directamente.
+    """
+    def __init__(self, fields: Optional[list[str]] = None):
+        self.fields = fields or ["System.Id"]
+        self.conditions: list[str] = []
+        self.order: list[str] = []
+
+    def where(self, field: str, operator: str, value: Any) -> "WiqlQuery":
+        operator = operator.upper()
+        if operator not in OPERATORS:
+            raise ValueError(f"Operador WIQL inválido: {operator}")
+        self.conditions.append(f"{wiql_field(field)} {operator} {wiql_value(value)}")
+        return self
+
+    def where_in(self, field: str, values: list[Any]) -> "WiqlQuery":
+        if not values:
+            raise ValueError(f"La lista de valores para {field} no puede estar vacía")
+        self.conditions.append(f"{wiql_field(field)} IN ({', '.join(wiql_value(v) for v in values)})")
+        return self
+
+    def order_by(self, field: str, descending: bool = False) -> "WiqlQuery":
+        self.order.append(f"{wiql_field(field)}{' DESC' if descending else ' ASC'}")
+        return self
+
+    def build(self) -> str:
+        query = f"SELECT {', '.join(wiql_field(f) for f in self.fields)} FROM WorkItems"
+        if self.conditions:
+            query += " WHERE " + " AND ".join(self.conditions)
+        if self.order:
+            query += " ORDER BY " + ", ".join(self.order)
+        return query
@@ -0,0 +1,139 @@
+import json
+import time
+import sqlite3
+import threading
+from typing import Any, Optional
+
+from app.services.common import SYNC_ENABLED, SYNC_STORE_PATH, SYNC_MAX_STALENESS
+
+# Campo con el que el API de revisiones marca los work items borrados (con includeDeleted)
+DELETED_FIELD = "System.IsDeleted"
+
+class WorkItemStore:
+    """
+    Copia local en SQLite de los campos de los work items, mantenida por el
+    worker de sincronización. Guarda también la marca de continuación del API
+    de revisiones para retomar la sincronización tras un reinicio.
+    """
+    def __init__(self, path: str = SYNC_STORE_PATH, max_staleness: float = SYNC_MAX_STALENESS):
+        self.max_staleness = max_staleness
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS work_items ("
+            "id INTEGER PRIMARY KEY, rev INTEGER NOT NULL, state TEXT, area TEXT, assigned_to TEXT, "
+            "fields TEXT NOT NULL, synced_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS work_items_state_area ON work_items (state, area)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS work_items_synced_at ON work_items (synced_at)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT)")
+
+    def get_state(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+            return row[0] if row else None
+
+    def _set_state(self, key: str, value: Optional[str]):
+        self._conn.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (key, value))
+
+    def apply_page(self, work_items: list[dict[str, Any]], continuation_token: Optional[str], caught_up: bool):
+        """
+        Guarda una página de revisiones y la marca de continuación en una sola
+        transacción, para no perder ni repetir cambios si el proceso se detiene.
+        Los work items borrados se eliminan y se registra el momento en
+        `deleted_at`, ya que no aparecen entre las filas sincronizadas.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                deleted = 0
+                for item in work_items:
+                    fields = item.get("fields", {})
+                    if fields.get(DELETED_FIELD):
+                        deleted += self._conn.execute(
+                            "DELETE FROM work_items WHERE id = ? AND rev <= ?", (item["id"], item["rev"])
+                        ).rowcount
+                        continue
+                    assigned_to = fields.get("System.AssignedTo") or {}
+                    self._conn.execute(
+                        "INSERT INTO work_items (id, rev, state, area, assigned_to, fields, synced_at) VALUES (?, ?, ?, ?, ?, ?, ?) "
+                        "ON CONFLICT(id) DO UPDATE SET rev = excluded.rev, state = excluded.state, area = excluded.area, "
+                        "assigned_to = excluded.assigned_to, fields = excluded.fields, synced_at = excluded.synced_at "
+                        "WHERE excluded.rev > work_items.rev",
+                        (
+                            item["id"],
+                            item["rev"],
+                            fields.get("System.State"),
+                            fields.get("System.AreaPath"),
+                            assigned_to.get("uniqueName", "").lower() if isinstance(assigned_to, dict) else str(assigned_to).lower(),
+                            json.dumps(fields),
+                            now,
+                        ),
+                    )
+                self._set_state("continuation_token", continuation_token)
+                if deleted:
+                    self._set_state("deleted_at", str(now))
+                if caught_up:
+                    self._set_state("caught_up_at", str(now))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def get_many(self, ids: list[int]) -> dict[int, dict[str, Any]]:
+        if not ids:
+            return {}
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, rev, fields FROM work_items WHERE id IN ({', '.join('?' for _ in ids)})", ids
+            ).fetchall()
+        return {row[0]: {"id": row[0], "rev": row[1], "fields": json.loads(row[2])} for row in rows}
+
+    def query_assigned(self, state: str, area: str, user_emails: list[str]) -> list[tuple[int, str]]:
+        """
+        Retorna (id, correo del asignado) de los work items en un estado y área, asignados a los usuarios.
+        """
+        emails = [email.lower() for email in user_emails]
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT id, assigned_to FROM work_items WHERE state = ? AND area = ? "
+                f"AND assigned_to IN ({', '.join('?' for _ in emails)}) ORDER BY id",
+                [state, area, *emails],
+            ).fetchall()
+
+    def columns(self, int_fields: dict[str, str], date_fields: dict[str, str], since: float = 0) -> dict[str, list]:
+        """
+        Lee en columnas (una lista por campo) los work items sincronizados después
+        de `since`. Los campos de fecha se convierten a segundos epoch en SQLite para
+        evitar procesarlos fila por fila.
+        """
+        names = ["id", "synced_at", "state", "area", "assigned_to", *int_fields, *date_fields]
+        expressions = [
+            "id", "synced_at", "state", "area", "assigned_to",
+            *(f"CAST(COALESCE(json_extract(fields, '$.\"{field}\"'), 0) AS INTEGER)" for field in int_fields.values()),
+            *(f"(julianday(json_extract(fields, '$.\"{field}\"')) - 2440587.5) * 86400.0" for field in date_fields.values()),
+        ]
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {', '.join(expressions)} FROM work_items WHERE synced_at > ?", (since,)).fetchall()
+        columns = list(zip(*rows)) if rows else [() for _ in names]
+        return {name: list(column) for name, column in zip(names, columns)}
+
+    def lag(self) -> Optional[float]:
+        """
+        Segundos desde la última vez que la sincronización alcanzó el final de las revisiones.
+        """
+        caught_up_at = self.get_state("caught_up_at")
+        return time.time() - float(caught_up_at) if caught_up_at else None
+
+    def is_fresh(self) -> bool:
+        lag = self.lag()
+        return lag is not None and lag <= self.max_staleness
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM work_items").fetchone()[0]
+
+# Copia local compartida, deshabilitada con SYNC_ENABLED=false
+work_item_store = WorkItemStore() if SYNC_ENABLED else None
@@ -0,0 +1,386 @@
+# benchmarks/fake_azure.py
+
+import re
+import json
+import time
+import random
+import socket
+import asyncio
+import multiprocessing
+from collections import Counter
+from typing import Any, Optional
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+
+from app.services.metrics import upstream_operation
+
+PROJECT = "bench"
+TEAM = "Bench Team"
+ASSIGNED_TEAM = "AX - Grupo 1"
+WORK_ITEM_TYPE = "Reversiones"
+# Identidad del PAT, autora de los comentarios agregados por la aplicación
+PAT_IDENTITY = {"displayName": "Benchmark", "uniqueName": "benchmark@bench.test"}
+
+CONDITION_PATTERN = re.compile(
+    r"\[(?P<field>[\w.]+)\]\s+(?P<operator>IN|UNDER|NOT UNDER|>=|<=|<>|=|>|<)\s+"
+    r"(?P<value>\([^)]*\)|'(?:[^']|'')*'|@\w+|-?\d+(?:\.\d+)?)"
+)
+ORDER_PATTERN = re.compile(r"ORDER BY \[System\.Id\] (?P<direction>ASC|DESC)")
+
+def parse_value(value: str) -> Any:
+    if value.startswith("("):
+        return [parse_value(item.strip()) for item in re.findall(r"'(?:[^']|'')*'|-?\d+", value[1:-1])]
+    if value.startswith("'"):
+        return value[1:-1].replace("''", "'")
+    if value.startswith("@"):
+        return None
+    return float(value) if "." in value else int(value)
+
+def identity_value(value: Any) -> Any:
+    return value.get("uniqueName") if isinstance(value, dict) else value
+
+class FakeAzureState:
+    """
+    Datos del servidor falso: work items, comentarios, adjuntos y equipos, generados
+    de forma determinística a partir de una semilla.
+    """
+    def __init__(self, seed: int = 1):
+        self.random = random.Random(seed)
+        self.work_items: dict[int, dict[str, Any]] = {}
+        self.comments: dict[int, list[dict[str, Any]]] = {}
+        self.attachments: dict[str, bytearray] = {}
+        self.teams: dict[str, list[dict[str, Any]]] = {}
+        self.calls: Counter = Counter()
+        self.next_id = 100000
+        # Work items borrados, que el API de revisiones retorna con includeDeleted
+        self.deleted: dict[int, dict[str, Any]] = {}
+        # Último cambio de cada work item, en el orden en que se leen las revisiones
+        self.changes: dict[int, int] = {}
+        self.sequence = 0
+        self.revisions_page_size = 200
+
+    def record_change(self, ticket_id: int):
+        self.sequence += 1
+        self.changes[ticket_id] = self.sequence
+
+    def add_team(self, team_name: str, size: int):
+        self.teams[team_name] = [
+            {"identity": {"id": f"{team_name}-{i}", "displayName": f"Evaluador {i}", "uniqueName": f"evaluador{i}@{team_name.replace(' ', '').lower()}.com"}}
+            for i in range(size)
+        ]
+        return [member["identity"]["uniqueName"] for member in self.teams[team_name]]
+
+    def add_work_item(self, ticket_id: int, state: str, area: str = "AC - Sede 1", assigned_to: Optional[str] = None, comments: int = 0):
+        fields = {
+            "System.Id": ticket_id,
+            "System.Rev": 1,
+            "System.WorkItemType": WORK_ITEM_TYPE,
+            "System.TeamProject": PROJECT,
+            "System.State": state,
+            "System.Title": f"Reversión {ticket_id}",
+            "System.AreaPath": f"{PROJECT}\\{area}",
+            "Custom.Devoluciones": 0,
+            "Custom.NIT": str(900000000 + ticket_id),
+        }
+        if assigned_to:
+            fields["System.AssignedTo"] = {"displayName": assigned_to, "uniqueName": assigned_to}
+        self.work_items[ticket_id] = {"id": ticket_id, "rev": 1, "fields": fields, "relations": []}
+        self.comments[ticket_id] = [
+            {"id": i + 1, "workItemId": ticket_id, "text": f"Comentario {i + 1}", "createdBy": PAT_IDENTITY, "createdDate": "2024-01-01T00:00:00Z"}
+            for i in range(comments)
+        ]
+        self.record_change(ticket_id)
+        return self.work_items[ticket_id]
+
+    def delete_work_item(self, ticket_id: int):
+        self.deleted[ticket_id] = self.work_items.pop(ticket_id)
+        self.record_change(ticket_id)
+
+    def view(self, work_item: dict[str, Any], expand: Optional[str] = None, fields: Optional[list[str]] = None):
+        data = {"id": work_item["id"], "rev": work_item["rev"], "fields": dict(work_item["fields"])}
+        if fields:
+            data["fields"] = {name: value for name, value in work_item["fields"].items() if name in fields}
+        if expand and expand.lower() in ["relations", "all"]:
+            data["relations"] = list(work_item["relations"])
+        return data
+
+    def apply_patch(self, work_item: dict[str, Any], operations: list[dict[str, Any]]) -> Optional[int]:
+        """
+        Aplica un JSON patch. Retorna el código de error si una operación test falla.
+        """
+        for operation in operations:
+            path = operation["path"]
+            if operation["op"] == "test":
+                if path == "/rev" and operation["value"] != work_item["rev"]:
+                    return 412
+            elif path.startswith("/fields/"):
+                field = path[len("/fields/"):]
+                value = operation["value"]
+                if field == "System.AssignedTo":
+                    value = {"displayName": value, "uniqueName": value}
+                work_item["fields"][field] = value
+            elif path == "/relations/-":
+                relation = dict(operation["value"])
+                relation.setdefault("attributes", {})
+                work_item["relations"].append(relation)
+            elif path.startswith("/relations/") and operation["op"] == "remove":
+                work_item["relations"].pop(int(path.split("/")[-1]))
+        work_item["rev"] += 1
+        work_item["fields"]["System.Rev"] = work_item["rev"]
+        self.record_change(work_item["id"])
+        return None
+
+    def revisions(
+        self,
+        continuation_token: Optional[str],
+        types: Optional[list[str]] = None,
+        fields: Optional[list[str]] = None,
+        include_deleted: bool = False,
+    ) -> tuple[list[dict[str, Any]], str, bool]:
+        """
+        Última revisión de los work items cambiados después de la marca de continuación,
+        como el API de revisiones de reporte con includeLatestOnly.
+        """
+        after = int(continuation_token or 0)
+        changed = sorted((sequence, ticket_id) for ticket_id, sequence in self.changes.items() if sequence > after)
+        page = changed[:self.revisions_page_size]
+        values = []
+        for _, ticket_id in page:
+            work_item = self.work_items.get(ticket_id)
+            deleted = work_item is None
+            if deleted:
+                work_item = self.deleted[ticket_id]
+                if not include_deleted:
+                    continue
+            if types and work_item["fields"].get("System.WorkItemType") not in types:
+                continue
+            data = self.view(work_item)
+            data["fields"]["System.IsDeleted"] = deleted
+            if fields:
+                data["fields"] = {name: value for name, value in data["fields"].items() if name in fields}
+            values.append(data)
+        last = page[-1][0] if page else after
+        return values, str(last), len(page) == len(changed)
+
+    def query(self, wiql: str, top: Optional[int] = None) -> list[int]:
+        conditions = [(m["field"], m["operator"], parse_value(m["value"])) for m in CONDITION_PATTERN.finditer(wiql.split(" WHERE ", 1)[-1])]
+
+        def matches(work_item):
+            for field, operator, value in conditions:
+                if value is None:
+                    continue
+                current = identity_value(work_item["fields"].get(field))
+                if operator == "=" and current != value:
+                    return False
+                if operator == "<>" and current == value:
+                    return False
+                if operator == "IN" and current not in value:
+                    return False
+                if operator == "UNDER" and not str(current or "").startswith(str(value)):
+                    return False
+                if operator in ["<", ">", "<=", ">="] and (current is None or not {
+                    "<": current < value, ">": current > value, "<=": current <= value, ">=": current >= value
+                }[operator]):
+                    return False
+            return True
+
+        order = ORDER_PATTERN.search(wiql)
+        ids = sorted(
+            (work_item["id"] for work_item in self.work_items.values() if matches(work_item)),
+            reverse=bool(order and order["direction"] == "DESC"),
+        )
+        return ids[:top] if top else ids
+
+def create_fake_azure(state: FakeAzureState, latency: float = 0.005, jitter: float = 0.0, error_rate: float = 0.0) -> FastAPI:
+    """
+    Servidor falso de Azure DevOps con la latencia y la tasa de errores (503 con
+    Retry-After) indicadas, que cuenta las solicitudes recibidas por operación.
+    """
+    fake = FastAPI()
+
+    @fake.middleware("http")
+    async def inject(request: Request, call_next):
+        if request.url.path.startswith("/_bench/"):
+            return await call_next(request)
+        state.calls[upstream_operation(request.method, str(request.url))] += 1
+        delay = latency + state.random.uniform(0, jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if error_rate and state.random.random() < error_rate:
+            return JSONResponse({"message": "Servicio no disponible"}, 503, headers={"Retry-After": "0"})
+        return await call_next(request)
+
+    @fake.get("/{project}/_apis/wit/workitems/{ticket_id}")
+    @fake.get("/{project}/_apis/wit/workItems/{ticket_id}")
+    async def get_work_item(project: str, ticket_id: int, request: Request):
+        work_item = state.work_items.get(ticket_id)
+        if work_item is None:
+            return JSONResponse({"message": f"El work item {ticket_id} no existe"}, 404)
+        fields = request.query_params.get("fields")
+        return state.view(work_item, request.query_params.get("$expand"), fields.split(",") if fields else None)
+
+    @fake.patch("/{project}/_apis/wit/workitems/{ticket_id}")
+    async def patch_work_item(project: str, ticket_id: str, request: Request):
+        operations = await request.json()
+        if ticket_id.startswith("$"):
+            state.next_id += 1
+            work_item = state.add_work_item(state.next_id, "Borrador")
+            work_item["rev"] = 0
+        else:
+            work_item = state.work_items.get(int(ticket_id))
+            if work_item is None:
+                return JSONResponse({"message": f"El work item {ticket_id} no existe"}, 404)
+        error = state.apply_patch(work_item, operations)
+        if error:
+            return JSONResponse({"message": "La revisión no coincide"}, error)
+        return state.view(work_item, "relations")
+
+    @fake.get("/{project}/_apis/wit/workitems/{ticket_id}/comments")
+    @fake.get("/{project}/_apis/wit/workItems/{ticket_id}/comments")
+    async def get_comments(project: str, ticket_id: int):
+        comments = state.comments.get(ticket_id, [])
+        return {"totalCount": len(comments), "count": len(comments), "comments": comments}
+
+    @fake.post("/{project}/_apis/wit/workitems/{ticket_id}/comments")
+    @fake.post("/{project}/_apis/wit/workItems/{ticket_id}/comments")
+    async def add_comment(project: str, ticket_id: int, request: Request):
+        body = await request.json()
+        comments = state.comments.setdefault(ticket_id, [])
+        comment = {
+            "id": len(comments) + 1,
+            "workItemId": ticket_id,
+            "text": body["text"],
+            "createdBy": PAT_IDENTITY,
+            "createdDate": "2024-01-01T00:00:00Z",
+        }
+        comments.append(comment)
+        return comment
+
+    @fake.post("/{project}/_apis/wit/attachments")
+    async def create_attachment(project: str, request: Request):
+        attachment_id = f"{state.random.getrandbits(128):032x}"
+        state.attachments[attachment_id] = bytearray(await request.body())
+        file_name = request.query_params.get("fileName", "archivo")
+        return {"id": attachment_id, "url": f"{request.base_url}{project}/_apis/wit/attachments/{attachment_id}?fileName={file_name}"}
+
+    @fake.put("/{project}/_apis/wit/attachments/{attachment_id}")
+    async def upload_chunk(project: str, attachment_id: str, request: Request):
+        state.attachments.setdefault(attachment_id, bytearray()).extend(await request.body())
+        return {"id": attachment_id, "url": f"{request.base_url}{project}/_apis/wit/attachments/{attachment_id}"}
+
+    @fake.get("/{project}/_apis/wit/attachments/{attachment_id}")
+    async def download_attachment(project: str, attachment_id: str):
+        if attachment_id not in state.attachments:
+            return JSONResponse({"message": "El adjunto no existe"}, 404)
+        return Response(bytes(state.attachments[attachment_id]), media_type="application/octet-stream")
+
+    @fake.post("/{project}/_apis/wit/wiql")
+    @fake.post("/{project}/{team}/_apis/wit/wiql")
+    async def wiql(project: str, request: Request, team: Optional[str] = None):
+        top = request.query_params.get("$top")
+        ids = state.query((await request.json())["query"], int(top) if top else None)
+        return {"queryType": "flat", "workItems": [{"id": ticket_id} for ticket_id in ids]}
+
+    @fake.post("/{project}/_apis/wit/workitemsbatch")
+    async def get_work_items_batch(project: str, request: Request):
+        body = await request.json()
+        items = [
+            state.view(state.work_items[ticket_id], body.get("$expand"), body.get("fields")) if ticket_id in state.work_items else None
+            for ticket_id in body["ids"]
+        ]
+        return {"count": len(items), "value": items}
+
+    @fake.post("/_apis/wit/$batch")
+    async def update_work_items_batch(request: Request):
+        results = []
+        for item in await request.json():
+            ticket_id = int(re.search(r"/workitems/(\d+)", item["uri"]).group(1))
+            work_item = state.work_items.get(ticket_id)
+            if work_item is None:
+                results.append({"code": 404, "body": json.dumps({"message": f"El work item {ticket_id} no existe"})})
+                continue
+            error = state.apply_patch(work_item, item["body"])
+            if error:
+                results.append({"code": error, "body": json.dumps({"message": "La revisión no coincide"})})
+            else:
+                results.append({"code": 200, "body": json.dumps(state.view(work_item))})
+        return {"count": len(results), "value": results}
+
+    @fake.get("/{project}/_apis/wit/reporting/workitemrevisions")
+    async def get_revisions(project: str, request: Request):
+        params = request.query_params
+        types, fields = params.get("types"), params.get("fields")
+        values, continuation_token, is_last_batch = state.revisions(
+            params.get("continuationToken"),
+            types.split(",") if types else None,
+            fields.split(",") if fields else None,
+            params.get("includeDeleted", "false").lower() == "true",
+        )
+        return {"values": values, "continuationToken": continuation_token, "isLastBatch": is_last_batch}
+
+    @fake.get("/_apis/projects/{project}/teams/{team}/members")
+    async def get_team_members(project: str, team: str):
+        members = state.teams.get(team)
+        if members is None:
+            return JSONResponse({"message": f"El equipo {team} no existe"}, 404)
+        return {"count": len(members), "value": members}
+
+    @fake.get("/_bench/calls")
+    async def get_calls():
+        # Solicitudes recibidas por operación, para calcular las solicitudes a Azure por solicitud
+        return dict(state.calls)
+
+    return fake
+
+def serve(port: int, seed: int, scenarios: dict[str, int], latency: float, jitter: float, error_rate: float):
+    """
+    Genera los datos de los escenarios (nombre -> número de solicitudes) y
+    ejecuta el servidor falso. Se ejecuta en un proceso aparte para no competir
+    por el GIL con la aplicación medida.
+    """
+    from benchmarks.scenarios import SCENARIOS
+
+    state = FakeAzureState(seed)
+    for name, requests in scenarios.items():
+        SCENARIOS[name].seed(state, requests)
+    fake = create_fake_azure(state, latency, jitter, error_rate)
+    uvicorn.run(fake, host="127.0.0.1", port=port, log_level="warning", access_log=False)
+
+class FakeAzureServer:
+    """
+    Ejecuta el servidor falso con uvicorn en otro proceso, en un puerto libre de localhost.
+    """
+    def __init__(self, seed: int, scenarios: dict[str, int], latency: float = 0.005, jitter: float = 0.0, error_rate: float = 0.0):
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+        self._process = multiprocessing.get_context("spawn").Process(
+            target=serve, args=(port, seed, scenarios, latency, jitter, error_rate), daemon=True
+        )
+
+    def start(self, timeout: float = 30):
+        self._process.start()
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if not self._process.is_alive():
+                break
+            try:
+                if httpx.get(f"{self.url}/_bench/calls").status_code == 200:
+                    return
+            except httpx.TransportError:
+                time.sleep(0.05)
+        self.stop()
+        raise RuntimeError("No se pudo iniciar el servidor falso de Azure DevOps")
+
+    async def calls(self, client: httpx.AsyncClient) -> int:
+        response = await client.get(f"{self.url}/_bench/calls")
+        return sum(response.json().values())
+
+    def stop(self):
+        if self._process.is_alive():
+            self._process.terminate()
+        self._process.join()
@@ -0,0 +1,184 @@
+# benchmarks/run.py
+#
+# Ejecuta los escenarios de carga contra la aplicación real, con Azure DevOps
+# reemplazado por un servidor falso local. No requiere conexión a internet.
+#
+#   python -m benchmarks.run                      # compara contra benchmarks/baseline.json (solicitudes a Azure y errores)
+#   python -m benchmarks.run --check-latency      # compara también latencia y throughput, en la misma máquina de la referencia
+#   python -m benchmarks.run --update-baseline    # guarda los resultados como referencia
+#   python -m benchmarks.run --scenario transition_storm --latency-ms 20 --error-rate 0.05
+
+import os
+import sys
+import json
+import math
+import time
+import asyncio
+import argparse
+import tempfile
+from typing import Any, Optional
+
+import httpx
+
+from benchmarks.fake_azure import FakeAzureServer, PROJECT
+from benchmarks.scenarios import SCENARIOS, Scenario
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    # Percentil por rango más cercano sobre valores ya ordenados
+    return sorted_values[max(0, math.ceil(p * len(sorted_values)) - 1)] if sorted_values else 0.0
+
+async def run_scenario(client: httpx.AsyncClient, server: FakeAzureServer, scenario: Scenario, requests: int) -> dict[str, Any]:
+    latencies: list[float] = []
+    errors = 0
+    pending = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in pending:
+            started = time.perf_counter()
+            response = await scenario.send(client, i)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    async with httpx.AsyncClient() as fake_client:
+        calls_before = await server.calls(fake_client)
+        started = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(scenario.concurrency)])
+        elapsed = time.perf_counter() - started
+        upstream_calls = await server.calls(fake_client) - calls_before
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "upstream_calls_per_request": round(upstream_calls / requests, 2),
+    }
+
+def compare(results: dict[str, dict], baseline: dict[str, dict], tolerances: Optional[dict[str, float]] = None) -> list[str]:
+    """
+    Retorna las regresiones respecto a la referencia. Las solicitudes a Azure
+    por solicitud y los errores son determinísticos y no pueden aumentar. Las
+    latencias y el throughput dependen de la máquina: solo se comparan si se
+    indican `tolerances`, con la variación admitida de cada escenario.
+    """
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        if result["upstream_calls_per_request"] > reference["upstream_calls_per_request"] + 0.01:
+            regressions.append(f"{name}: solicitudes a Azure por solicitud {reference['upstream_calls_per_request']} -> {result['upstream_calls_per_request']}")
+        if result["errors"] > reference["errors"]:
+            regressions.append(f"{name}: errores {reference['errors']} -> {result['errors']}")
+        if tolerances is None:
+            continue
+        tolerance = tolerances[name]
+        if result["p95_ms"] > reference["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {reference['p95_ms']} ms -> {result['p95_ms']} ms")
+        if result["throughput_rps"] < reference["throughput_rps"] / (1 + tolerance):
+            regressions.append(f"{name}: throughput {reference['throughput_rps']} -> {result['throughput_rps']} solicitudes/s")
+    return regressions
+
+def print_results(results: dict[str, dict], baseline: dict[str, dict]):
+    columns = ["throughput_rps", "p50_ms", "p95_ms", "p99_ms", "upstream_calls_per_request", "errors"]
+    print(f"{'escenario':<20}" + "".join(f"{column:>28}" for column in columns))
+    for name, result in results.items():
+        reference = baseline.get(name, {})
+        cells = [f"{result[column]} ({reference[column]})" if column in reference else str(result[column]) for column in columns]
+        print(f"{name:<20}" + "".join(f"{cell:>28}" for cell in cells))
+    if baseline:
+        print("(entre paréntesis: valores de referencia)")
+
+async def run(server: FakeAzureServer, scenarios: dict[Scenario, int]) -> dict[str, dict]:
+    # La aplicación se importa después de configurar las variables de entorno
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://app", timeout=120) as client:
+            results = {}
+            for scenario, requests in scenarios.items():
+                results[scenario.name] = await run_scenario(client, server, scenario, requests)
+            return results
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks de la API contra un Azure DevOps falso")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="Escenario a ejecutar (por defecto todos)")
+    parser.add_argument("--latency-ms", type=float, default=5, help="Latencia de cada solicitud al servidor falso")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Variación aleatoria adicional de la latencia")
+    parser.add_argument("--error-rate", type=float, default=0, help="Proporción de solicitudes que responden 503")
+    parser.add_argument("--scale", type=float, default=1, help="Multiplicador del número de solicitudes de cada escenario")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true", help="Guardar los resultados como nueva referencia")
+    parser.add_argument("--check-latency", action="store_true", help="Comparar también la latencia y el throughput (dependen de la máquina)")
+    parser.add_argument("--tolerance", type=float, help="Variación admitida de latencia y throughput con --check-latency (por defecto la de cada escenario)")
+    parser.add_argument("--output", help="Archivo JSON donde guardar los resultados")
+    args = parser.parse_args()
+
+    scenarios = {SCENARIOS[name]: max(1, int(SCENARIOS[name].requests * args.scale)) for name in (args.scenario or SCENARIOS)}
+    for scenario, requests in scenarios.items():
+        scenario.prepare(requests)
+
+    server = FakeAzureServer(
+        args.seed,
+        {scenario.name: requests for scenario, requests in scenarios.items()},
+        args.latency_ms / 1000,
+        args.jitter_ms / 1000,
+        args.error_rate,
+    )
+    server.start()
+
+    workdir = tempfile.mkdtemp(prefix="benchmarks-")
+    os.environ.update({
+        "ENVIRONMENT": "benchmark",
+        "AZURE_ORG_URL": server.url,
+        "PROJECT_NAME": PROJECT,
+        "PAT_TOKEN": "benchmark",
+        "SYNC_ENABLED": "false",
+        "TICKET_CACHE_PATH": os.path.join(workdir, "ticket_cache.sqlite3"),
+        "ATTACHMENT_INDEX_PATH": os.path.join(workdir, "attachment_index.sqlite3"),
+        "ATTACHMENT_CACHE_DIR": os.path.join(workdir, "attachment_cache"),
+    })
+    # Los reintentos por errores inyectados no deben medir la espera entre intentos
+    os.environ.setdefault("HTTP_BACKOFF_FACTOR", "0.01")
+
+    try:
+        results = asyncio.run(run(server, scenarios))
+    finally:
+        server.stop()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+
+    print_results(results, baseline)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump({**baseline, **results}, file, indent=2)
+            file.write("\n")
+        print(f"Referencia actualizada en {args.baseline}")
+        return 0
+
+    tolerances = None
+    if args.check_latency:
+        tolerances = {scenario.name: args.tolerance if args.tolerance is not None else scenario.tolerance for scenario in scenarios}
+    regressions = compare(results, baseline, tolerances)
+    for regression in regressions:
+        print(f"REGRESIÓN {regression}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+# benchmarks/scenarios.py
+
+import random
+from abc import ABC, abstractmethod
+
+import httpx
+
+from benchmarks.fake_azure import FakeAzureState, TEAM, ASSIGNED_TEAM
+
+class Scenario(ABC):
+    """
+    Escenario de carga: genera sus datos en el servidor falso y envía la
+    solicitud número `i` contra la aplicación.
+    """
+    name = ""
+    description = ""
+    requests = 200
+    concurrency = 20
+    # Variación admitida de latencia y throughput respecto a la referencia
+    tolerance = 0.15
+
+    def seed(self, state: FakeAzureState, requests: int):
+        """
+        Crea los datos del escenario en el servidor falso (se ejecuta en su proceso).
+        """
+
+    def prepare(self, requests: int):
+        """
+        Genera los datos que envía la aplicación medida (se ejecuta en el proceso del benchmark).
+        """
+
+    @abstractmethod
+    async def send(self, client: httpx.AsyncClient, i: int) -> httpx.Response:
+        raise NotImplementedError
+
+class DashboardPolling(Scenario):
+    name = "dashboard_polling"
+    description = "Lecturas de un tablero: detalle, búsqueda y consulta en lote de reversiones"
+    requests = 400
+    concurrency = 20
+    first_id = 1
+    tickets = 200
+
+    def seed(self, state: FakeAzureState, requests: int):
+        states = ["Borrador", "Solicitado", "Asignado", "En evaluacion"]
+        for offset in range(self.tickets):
+            state.add_work_item(self.first_id + offset, states[offset % len(states)], comments=3)
+
+    async def send(self, client: httpx.AsyncClient, i: int) -> httpx.Response:
+        ticket_id = self.first_id + i % 50
+        if i % 4 == 0:
+            return await client.get(f"/reversals/{ticket_id}")
+        if i % 4 == 1:
+            return await client.get("/reversals", params={"state": "Solicitado", "$top": 20})
+        if i % 4 == 2:
+            return await client.post("/reversals/batch", json={"ids": list(range(ticket_id, ticket_id + 10))})
+        return await client.get(f"/reversals/{ticket_id}", params={"include_comments": "false"})
+
+class TransitionStorm(Scenario):
+    name = "transition_storm"
+    description = "Cambios de estado concurrentes sobre tickets distintos"
+    requests = 200
+    concurrency = 20
+    # La p95 varía ~20% entre ejecuciones en la misma máquina
+    tolerance = 0.3
+    first_id = 10000
+
+    def seed(self, state: FakeAzureState, requests: int):
+        evaluator = state.add_team(ASSIGNED_TEAM, 5)[0]
+        for i in range(requests):
+            if i % 2 == 0:
+                state.add_work_item(self.first_id + i, "Borrador")
+            else:
+                state.add_work_item(self.first_id + i, "En evaluacion", ASSIGNED_TEAM, evaluator)
+
+    async def send(self, client: httpx.AsyncClient, i: int) -> httpx.Response:
+        new_state = "Solicitado" if i % 2 == 0 else "Aprobado"
+        return await client.put(f"/reversals/{self.first_id + i}", json={"new_state": new_state})
+
+class AttachmentBurst(Scenario):
+    name = "attachment_burst"
+    description = "Cargas de varios archivos por solicitud"
+    requests = 60
+    concurrency = 10
+    # La p95 varía hasta ~40% entre ejecuciones en la misma máquina
+    tolerance = 0.5
+    first_id = 20000
+    files_per_request = 3
+    file_size = 64 * 1024
+
+    def seed(self, state: FakeAzureState, requests: int):
+        for i in range(requests):
+            state.add_work_item(self.first_id + i, "Borrador")
+
+    def prepare(self, requests: int):
+        generator = random.Random(requests)
+        # Contenido distinto por archivo para no medir la deduplicación de adjuntos
+        self.files = [
+            [generator.randbytes(self.file_size) for _ in range(self.files_per_request)]
+            for _ in range(requests)
+        ]
+
+    async def send(self, client: httpx.AsyncClient, i: int) -> httpx.Response:
+        files = [("files", (f"soporte-{i}-{n}.pdf", content, "application/pdf")) for n, content in enumerate(self.files[i])]
+        return await client.post(f"/reversals/{self.first_id + i}/attachments", files=files)
+
+class TeamFanOut(Scenario):
+    name = "team_fan_out"
+    description = "Tickets en evaluación de todos los miembros de un equipo"
+    requests = 100
+    concurrency = 10
+    first_id = 30000
+    members = 20
+    tickets = 400
+
+    def seed(self, state: FakeAzureState, requests: int):
+        members = state.add_team(TEAM, self.members)
+        for i in range(self.tickets):
+            state.add_work_item(self.first_id + i, "En evaluacion", TEAM, members[i % len(members)])
+
+    async def send(self, client: httpx.AsyncClient, i: int) -> httpx.Response:
+        return await client.get(f"/teams/{TEAM}/members/assigned")
+
+SCENARIOS = {scenario.name: scenario for scenario in [DashboardPolling(), TransitionStorm(), AttachmentBurst(), TeamFanOut()]}
@@ -0,0 +1,60 @@
+# tests/conftest.py
+#
+# Las pruebas usan el servidor falso de Azure DevOps de los benchmarks, montado
+# sobre el cliente HTTP compartido con un transporte ASGI (sin red).
+
+import os
+import tempfile
+
+# La configuración se lee al importar app.services.common
+os.environ.update({
+    "ENVIRONMENT": "test",
+    "AZURE_ORG_URL": "http://azure.test",
+    "PROJECT_NAME": "bench",
+    "PAT_TOKEN": "test",
+    "HTTP_BACKOFF_FACTOR": "0",
+    "TICKET_CACHE_BACKEND": "memory",
+    "SYNC_ENABLED": "false",
+    "AZURE_HOOKS_SECRET": "secreto",
+})
+_workdir = tempfile.mkdtemp(prefix="tests-")
+os.environ.setdefault("TICKET_CACHE_PATH", os.path.join(_workdir, "ticket_cache.sqlite3"))
+os.environ.setdefault("ATTACHMENT_INDEX_PATH", os.path.join(_workdir, "attachment_index.sqlite3"))
+os.environ.setdefault("ATTACHMENT_CACHE_DIR", os.path.join(_workdir, "attachment_cache"))
+os.environ.setdefault("SYNC_STORE_PATH", os.path.join(_workdir, "sync_store.sqlite3"))
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from benchmarks.fake_azure import FakeAzureState, create_fake_azure
+from app.main import app
+from app.services import http_client
+from app.services.cache_service import MemoryCacheBackend, ticket_cache
+from app.services.team_directory import team_directory
+
+@pytest.fixture
+def azure() -> FakeAzureState:
+    """
+    Servidor falso de Azure DevOps sin latencia, usado por el cliente HTTP compartido.
+    """
+    state = FakeAzureState()
+    previous = http_client._client
+    http_client._client = httpx.AsyncClient(transport=httpx.ASGITransport(app=create_fake_azure(state, latency=0)))
+    yield state
+    http_client._client = previous
+
+@pytest.fixture(autouse=True)
+def clean_caches():
+    # Cada prueba parte de caches vacíos
+    previous = ticket_cache.backend
+    ticket_cache.backend = MemoryCacheBackend()
+    ticket_cache.hits = ticket_cache.misses = 0
+    team_directory.invalidate()
+    yield
+    ticket_cache.backend = previous
+
+@pytest.fixture
+def client(azure) -> TestClient:
+    # Sin el bloque `with` no se ejecuta el lifespan, que cerraría el cliente del servidor falso
+    return TestClient(app)
@@ -0,0 +1,39 @@
+# tests/test_assignment.py
+
+import pytest
+
+from app.services import assignment_service
+
+TEAM = "AX - Grupo 1"
+
+@pytest.fixture(autouse=True)
+def clean_indexes(monkeypatch):
+    monkeypatch.setattr(assignment_service, "load_indexes", {})
+
+def test_auto_assign_moves_ticket_and_balances_load(client, azure):
+    members = azure.add_team(TEAM, 2)
+    azure.add_work_item(8001, "Solicitado")
+    azure.add_work_item(8002, "Solicitado")
+
+    first = client.post(f"/teams/{TEAM}/auto-assign/8001").json()["data"]
+    second = client.post(f"/teams/{TEAM}/auto-assign/8002").json()["data"]
+
+    # Igual que la asignación en lote: una lectura en lote y un $batch, con la transición a 'Asignado'
+    assert first["state"] == second["state"] == "Asignado"
+    assert azure.work_items[8001]["fields"]["System.State"] == "Asignado"
+    assert {first["assigned_to"], second["assigned_to"]} == set(members)
+    assert azure.calls["workitems_batch_patch"] == 2
+    assert azure.calls["workitem_patch"] == 0
+
+    loads = client.get(f"/teams/{TEAM}/members/load").json()["data"]
+    assert [member["load"] for member in loads] == [1, 1]
+
+def test_failed_auto_assign_releases_reserved_load(client, azure):
+    azure.add_team(TEAM, 2)
+    azure.add_work_item(8003, "Aprobado")
+
+    response = client.post(f"/teams/{TEAM}/auto-assign/8003")
+    assert response.status_code == 400
+
+    loads = client.get(f"/teams/{TEAM}/members/load").json()["data"]
+    assert [member["load"] for member in loads] == [0, 0]
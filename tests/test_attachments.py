@@ -0,0 +1,136 @@
+# tests/test_attachments.py
+
+import os
+import time
+
+import pytest
+
+from app.services import attachments_service
+from app.services.attachment_index import AttachmentIndex
+from app.services.attachment_cache import AttachmentCache, RangeNotSatisfiable, etag_matches, parse_byte_range
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(attachments_service, "ATTACHMENT_CHUNK_SIZE", 1024)
+
+def test_large_upload_without_part_size_uses_chunked_protocol(azure, client, small_chunks):
+    azure.add_work_item(1, "Borrador")
+    content = os.urandom(3500)
+
+    # El codificador multipart de httpx no envía Content-Length por parte
+    response = client.post("/tickets/1/attach", files=[("files", ("soporte.pdf", content, "application/pdf"))])
+
+    assert response.status_code == 200
+    assert list(azure.attachments.values()) == [bytearray(content)]
+    # Inicio de la carga más un PUT por cada bloque de 1 KB
+    assert azure.calls["attachment_upload"] == 1 + 4
+    assert len(azure.work_items[1]["relations"]) == 1
+
+def test_small_upload_is_sent_in_one_request(azure, client, small_chunks):
+    azure.add_work_item(1, "Borrador")
+
+    response = client.post("/tickets/1/attach", files=[("files", ("a.txt", b"hola", "text/plain"))])
+
+    assert response.status_code == 200
+    assert azure.calls["attachment_upload"] == 1
+    assert list(azure.attachments.values()) == [bytearray(b"hola")]
+
+def test_attach_response_keeps_comments(azure, client):
+    azure.add_work_item(1, "Borrador", comments=2)
+
+    response = client.post("/tickets/1/attach", files=[("files", ("a.txt", b"hola", "text/plain"))])
+
+    ticket = response.json()["data"]
+    assert len(ticket["attachments"]) == 1
+    assert [comment["text"] for comment in ticket["comments"]] == ["Comentario 1", "Comentario 2"]
+    # Los comentarios se leen en paralelo con la carga, sin volver a consultar el ticket
+    assert azure.calls["comments_get"] == 1
+    assert azure.calls["workitem_get"] == 0
+
+def test_repeated_small_files_reuse_the_attachment(azure, client, small_chunks, monkeypatch, tmp_path):
+    index = AttachmentIndex(str(tmp_path / "index.sqlite3"))
+    monkeypatch.setattr(attachments_service, "attachment_index", index)
+    azure.add_work_item(1, "Borrador")
+    small, large = b"comprobante", os.urandom(2048)
+
+    for _ in range(2):
+        response = client.post("/tickets/1/attach", files=[("files", ("a.pdf", small)), ("files", ("b.pdf", large))])
+        assert response.status_code == 200
+
+    # El archivo pequeño se subió una vez; el grande, que no se indexa, dos veces
+    assert sorted(len(content) for content in azure.attachments.values()) == [len(small), len(large), len(large)]
+    assert index.stats()["entries"] == 1
+
+def test_cache_removes_only_stale_partial_downloads(tmp_path):
+    stale, in_progress = tmp_path / "a.1.part", tmp_path / "b.2.part"
+    stale.write_bytes(b"abandonada")
+    in_progress.write_bytes(b"en curso")
+    (tmp_path / "0f9e8d7c-0000-0000-0000-000000000000").write_bytes(b"completo")
+    two_hours_ago = time.time() - 7200
+    os.utime(stale, (two_hours_ago, two_hours_ago))
+
+    # Un worker que inicia no elimina las descargas en curso de los demás
+    cache = AttachmentCache(str(tmp_path), stale_part_age=3600)
+    assert not stale.exists()
+    assert in_progress.exists()
+    assert cache.total_bytes == len(b"completo")
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("items=0-9", None),
+    ("bytes=a-9", None),
+    ("bytes=-", None),
+    ("bytes=0-99", (0, 99)),
+    ("bytes=900-5000", (900, 999)),
+    # Sufijo: los últimos N bytes, o el archivo completo si N supera el tamaño
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    # Sin fin: hasta el último byte
+    ("bytes=500-", (500, 999)),
+    ("bytes=999-", (999, 999)),
+    ("bytes=1000-", RangeNotSatisfiable),
+    ("bytes=1000-1100", RangeNotSatisfiable),
+    ("bytes=-0", RangeNotSatisfiable),
+    ("bytes=10-5", RangeNotSatisfiable),
+    # Varios rangos no se soportan y se responde el archivo completo
+    ("bytes=0-9,20-29", None),
+    ("bytes=0-9, 2000-", None),
+])
+def test_parse_byte_range(header, expected):
+    if expected is RangeNotSatisfiable:
+        with pytest.raises(RangeNotSatisfiable):
+            parse_byte_range(header, 1000)
+    else:
+        assert parse_byte_range(header, 1000) == expected
+
+@pytest.mark.parametrize("header, expected", [
+    (None, False),
+    ("", False),
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"otro", "abc"', True),
+    ('"otro",W/"abc"', True),
+    ('"otro"', False),
+    ('"abcd"', False),
+    ("*", True),
+])
+def test_etag_matches(header, expected):
+    assert etag_matches(header, '"abc"') is expected
+
+def test_attachment_content_honors_if_none_match_list(azure, client):
+    attachment_id = "0f9e8d7c-1111-2222-3333-444455556666"
+    azure.attachments[attachment_id] = bytearray(b"contenido")
+    work_item = azure.add_work_item(1, "Borrador")
+    work_item["relations"].append({
+        "rel": "AttachedFile",
+        "url": f"http://azure.test/bench/_apis/wit/attachments/{attachment_id}",
+        "attributes": {"name": "a.txt"},
+    })
+    url = f"/tickets/1/attachments/{attachment_id}/content"
+
+    response = client.get(url, headers={"If-None-Match": f'"otro", W/"{attachment_id}"'})
+    assert response.status_code == 304
+
+    response = client.get(url, headers={"If-None-Match": '"otro"'})
+    assert response.status_code == 200
+    assert response.content == b"contenido"
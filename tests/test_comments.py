@@ -0,0 +1,51 @@
+# tests/test_comments.py
+
+def add_comment(client, ticket_id: int, text: str, **params):
+    return client.post(f"/tickets/{ticket_id}/comments", json={"text": text, "user_email": "ana.torres@bench.test"}, params=params)
+
+def test_add_comment_returns_ticket_with_comments(client, azure):
+    azure.add_work_item(3001, "Solicitado", comments=2)
+
+    response = add_comment(client, 3001, "Nuevo comentario", refresh="true")
+    assert response.status_code == 200
+    ticket = response.json()["data"]
+    assert [comment["text"] for comment in ticket["comments"]] == ["Comentario 1", "Comentario 2", "Nuevo comentario"]
+    assert azure.comments[3001][-1]["createdBy"]["uniqueName"] == "benchmark@bench.test"
+
+def test_add_comment_to_cached_ticket_only_posts(client, azure):
+    azure.add_work_item(3002, "Solicitado", comments=2)
+    client.get("/tickets/3002")
+    azure.calls.clear()
+
+    ticket = add_comment(client, 3002, "Nuevo comentario").json()["data"]
+    assert [comment["text"] for comment in ticket["comments"]] == ["Comentario 1", "Comentario 2", "Nuevo comentario"]
+    assert ticket["state"] == "Solicitado"
+    assert dict(azure.calls) == {"comments_post": 1}
+
+def test_add_comment_to_cached_ticket_without_comments_reads_them_in_parallel(client, azure):
+    azure.add_work_item(3003, "Solicitado", comments=1)
+    client.get("/tickets/3003", params={"include_comments": "false"})
+    azure.calls.clear()
+
+    ticket = add_comment(client, 3003, "Nuevo comentario").json()["data"]
+    assert [comment["text"] for comment in ticket["comments"]] == ["Comentario 1", "Nuevo comentario"]
+    assert dict(azure.calls) == {"comments_post": 1, "comments_get": 1}
+
+def test_add_comment_without_cache_reads_only_the_work_item(client, azure):
+    azure.add_work_item(3004, "Solicitado", comments=2)
+
+    ticket = add_comment(client, 3004, "Nuevo comentario").json()["data"]
+    assert ticket["state"] == "Solicitado"
+    assert [comment["text"] for comment in ticket["comments"]] == ["Nuevo comentario"]
+    assert dict(azure.calls) == {"comments_post": 1, "workitem_get": 1}
+
+def test_remove_attachment_keeps_comments(client, azure):
+    work_item = azure.add_work_item(3005, "Solicitado", comments=2)
+    url = "http://azure.test/bench/_apis/wit/attachments/0f9e8d7c"
+    work_item["relations"].append({"rel": "AttachedFile", "url": url, "attributes": {"name": "comprobante.pdf"}})
+
+    response = client.delete("/tickets/3005/attachments", params={"attachmentUrl": url})
+    assert response.status_code == 200
+    ticket = response.json()["data"]
+    assert ticket["attachments"] == []
+    assert [comment["text"] for comment in ticket["comments"]] == ["Comentario 1", "Comentario 2"]
@@ -0,0 +1,129 @@
+# tests/test_hooks.py
+#
+# Reproduce eventos de service hooks grabados de Azure DevOps (tests/hook_payloads)
+# contra el endpoint /hooks/azure.
+
+import copy
+import json
+from pathlib import Path
+
+import pytest
+
+from app.controllers import hooks_controller
+from app.services import hooks_service
+from app.services.cache_service import ticket_cache
+from app.services.event_bus import TicketEventBus
+
+PAYLOADS = Path(__file__).parent / "hook_payloads"
+AUTH = ("azure", "secreto")
+
+def payload(event_type: str, rev: int | None = None) -> dict:
+    event = json.loads((PAYLOADS / f"{event_type}.json").read_text(encoding="utf-8"))
+    if rev is not None:
+        # Misma grabación con otra revisión, para simular eventos repetidos o perdidos
+        event = copy.deepcopy(event)
+        event["resource"]["rev"] = rev
+        fields = event["resource"].get("revision", event["resource"])["fields"]
+        fields["System.Rev"] = rev
+    return event
+
+@pytest.fixture(autouse=True)
+def events(monkeypatch) -> TicketEventBus:
+    # Bus propio para que los eventos de otras pruebas no se cuenten como repetidos
+    bus = TicketEventBus()
+    monkeypatch.setattr(hooks_service, "ticket_events", bus)
+    return bus
+
+def send(client, event: dict) -> dict:
+    response = client.post("/hooks/azure", json=event, auth=AUTH)
+    assert response.status_code == 200
+    return response.json()["data"]
+
+def published(events: TicketEventBus) -> list[tuple[str, int, int]]:
+    return [(event["type"], event["ticketId"], event["rev"]) for event in events._buffer]
+
+def test_created_event_fills_cache_once(client, events):
+    assert send(client, payload("workitem.created"))["applied"]
+    # Azure reintenta los eventos sin confirmar
+    assert not send(client, payload("workitem.created"))["applied"]
+
+    ticket = ticket_cache.get(7001)
+    assert ticket["state"] == "Solicitado"
+    assert [attachment["name"] for attachment in ticket["attachments"]] == ["comprobante.pdf"]
+    assert ticket["azure"]["System.CreatedBy"]["uniqueName"] == "ana.torres@bench.test"
+    assert published(events) == [("created", 7001, 1)]
+
+def test_updated_event_applies_next_revision(client, events):
+    send(client, payload("workitem.created"))
+    assert send(client, payload("workitem.updated"))["applied"]
+
+    ticket = ticket_cache.get(7001)
+    assert (ticket["state"], ticket["assignedTo"]) == ("Asignado", "luis.rojas@bench.test")
+    assert [attachment["name"] for attachment in ticket["attachments"]] == ["comprobante.pdf", "estado_de_cuenta.xlsx"]
+    assert ("state_changed", 7001, 2) in published(events)
+    assert ("attachments_changed", 7001, 2) in published(events)
+
+def test_updated_event_with_revision_gap_keeps_only_revision(client, events):
+    send(client, payload("workitem.created"))
+    result = send(client, payload("workitem.updated", rev=4))
+
+    assert result["applied"]
+    assert ticket_cache.get(7001) is None
+    assert ticket_cache.peek(7001)["rev"] == 4
+    assert ("state_changed", 7001, 4) in published(events)
+
+    # La revisión perdida llega después y no se aplica ni se publica
+    count = len(published(events))
+    result = send(client, payload("workitem.updated", rev=3))
+    assert not result["applied"]
+    assert ticket_cache.peek(7001)["rev"] == 4
+    assert len(published(events)) == count
+
+def test_updated_event_for_uncached_ticket_records_revision(client, events):
+    assert send(client, payload("workitem.updated"))["applied"]
+    assert ticket_cache.peek(7001)["data"] is None
+    assert not send(client, payload("workitem.updated"))["applied"]
+    assert published(events).count(("state_changed", 7001, 2)) == 1
+
+def test_commented_event_drops_cached_comments(client, events):
+    send(client, payload("workitem.created"))
+    send(client, payload("workitem.updated"))
+    assert ticket_cache.peek(7001)["include_comments"]
+
+    assert send(client, payload("workitem.commented"))["applied"]
+    assert ticket_cache.get(7001, include_comments=True) is None
+    assert ticket_cache.get(7001, include_comments=False)["state"] == "Asignado"
+    assert ("comment_added", 7001, 3) in published(events)
+
+def test_commented_event_older_than_cache_is_ignored(client, events):
+    send(client, payload("workitem.created", rev=5))
+
+    assert not send(client, payload("workitem.commented"))["applied"]
+    assert ticket_cache.peek(7001)["include_comments"]
+    assert all(event_type != "comment_added" for event_type, _, _ in published(events))
+
+def test_deleted_event_rejects_late_updates(client, events):
+    send(client, payload("workitem.created"))
+    assert send(client, payload("workitem.deleted"))["applied"]
+    assert ticket_cache.get(7001) is None
+
+    assert not send(client, payload("workitem.updated"))["applied"]
+    assert ticket_cache.get(7001) is None
+
+def test_events_are_not_applied_without_cache(client, events, monkeypatch):
+    monkeypatch.setattr(ticket_cache, "backend", None)
+
+    assert not send(client, payload("workitem.created"))["applied"]
+    assert published(events) == []
+
+def test_invalid_credentials_are_rejected(client):
+    response = client.post("/hooks/azure", json=payload("workitem.created"), auth=("azure", "otra"))
+    assert response.status_code == 401
+    assert ticket_cache.peek(7001) is None
+
+def test_events_are_refused_without_secret(client, monkeypatch):
+    monkeypatch.setattr(hooks_controller, "AZURE_HOOKS_SECRET", None)
+
+    response = client.post("/hooks/azure", json=payload("workitem.created"), auth=AUTH)
+    assert response.status_code == 503
+    assert ticket_cache.peek(7001) is None
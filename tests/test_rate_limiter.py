@@ -0,0 +1,39 @@
+# tests/test_rate_limiter.py
+
+import pytest
+
+from app.services.rate_limiter import Priority, classify, prioritize, rate_limiter
+
+@pytest.fixture
+def priorities(monkeypatch) -> list[Priority]:
+    # Clases de prioridad con las que se pidió cada token del limitador
+    requested = []
+    acquire = rate_limiter.acquire
+
+    async def record(priority: Priority = Priority.read):
+        requested.append(priority)
+        await acquire(priority)
+
+    monkeypatch.setattr(rate_limiter, "acquire", record)
+    return requested
+
+def test_classify_by_method_and_operation():
+    assert classify("GET", "workitem_get") == Priority.read
+    assert classify("PATCH", "workitem_patch") == Priority.mutation
+    assert classify("POST", "workitems_batch_get") == Priority.bulk
+    with prioritize(Priority.mutation):
+        assert classify("POST", "workitems_batch_get") == Priority.mutation
+    assert classify("POST", "workitems_batch_get") == Priority.bulk
+
+def test_move_ticket_reads_with_mutation_priority(client, azure, priorities):
+    azure.add_work_item(9001, "Borrador")
+
+    response = client.put("/tickets/9001", json={"new_state": "Solicitado"})
+    assert response.status_code == 200
+    assert priorities == [Priority.mutation, Priority.mutation]
+
+def test_ticket_reads_keep_read_priority(client, azure, priorities):
+    azure.add_work_item(9002, "Borrador")
+
+    client.get("/tickets/9002")
+    assert priorities and set(priorities) == {Priority.read}
@@ -0,0 +1,69 @@
+# tests/test_reversal_fields.py
+
+import pytest
+
+from app.services.reversals_service import parse_fields, project_work_item
+
+WORK_ITEM = {
+    "id": 7,
+    "fields": {
+        "System.State": "Asignado",
+        "System.AssignedTo": {"displayName": "Luis Rojas", "uniqueName": "luis.rojas@bench.test"},
+        "Custom.Devoluciones": 2,
+    },
+    "relations": [
+        {"rel": "AttachedFile", "url": "http://azure.test/bench/_apis/wit/attachments/0f9e8d7c", "attributes": {"name": "a.pdf"}},
+        {"rel": "System.LinkTypes.Related", "url": "http://azure.test/bench/_apis/wit/workItems/8"},
+    ],
+}
+
+@pytest.mark.parametrize("fields, expected", [
+    (None, None),
+    ("state", ["state"]),
+    (" state , assignedTo ", ["state", "assignedTo"]),
+    # El id siempre se incluye y las claves repetidas se ignoran
+    ("id", []),
+    ("id,state,state", ["state"]),
+])
+def test_parse_fields(fields, expected):
+    assert parse_fields(fields) == expected
+
+@pytest.mark.parametrize("fields", ["", " ", "state,,id", "state,", ",state"])
+def test_parse_fields_rejects_empty_keys(fields):
+    with pytest.raises(ValueError, match="vacía"):
+        parse_fields(fields)
+
+def test_parse_fields_rejects_unknown_keys():
+    with pytest.raises(ValueError, match="Campos no soportados: estado, NIT"):
+        parse_fields("state,estado,NIT")
+
+def test_project_work_item_builds_only_requested_keys():
+    data = project_work_item(WORK_ITEM, ["state", "assignedTo", "iterations", "lastTimeReturned"])
+    assert data == {
+        "id": 7,
+        "state": "Asignado",
+        "assignedTo": "luis.rojas@bench.test",
+        "iterations": 2,
+        "lastTimeReturned": "",
+    }
+
+def test_project_work_item_relations_and_comments():
+    comments = [{"id": 1, "text": "Comentario 1"}]
+    data = project_work_item(WORK_ITEM, ["attachments", "comments"], comments)
+    assert [attachment["name"] for attachment in data["attachments"]] == ["a.pdf"]
+    assert data["comments"] == comments
+
+    unassigned = {"id": 8, "fields": {}}
+    assert project_work_item(unassigned, ["assignedTo", "attachments", "comments"]) == {
+        "id": 8,
+        "assignedTo": "",
+        "attachments": [],
+        "comments": [],
+    }
+
+def test_get_reversal_with_empty_fields_is_rejected(client, azure):
+    azure.add_work_item(7, "Asignado")
+
+    assert client.get("/reversals/7", params={"fields": ""}).status_code == 400
+    assert client.get("/reversals/7", params={"fields": "state,,id"}).status_code == 400
+    assert client.get("/reversals/7", params={"fields": "state"}).json()["data"] == {"id": 7, "state": "Asignado"}
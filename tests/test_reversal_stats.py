@@ -0,0 +1,47 @@
+# tests/test_reversal_stats.py
+
+import pytest
+
+from app.services.work_item_store import WorkItemStore
+from app.services.reversal_stats_service import ReversalStatsSnapshot
+
+def work_item(ticket_id: int, rev: int, state: str, returns: int = 0) -> dict:
+    return {
+        "id": ticket_id,
+        "rev": rev,
+        "fields": {
+            "System.State": state,
+            "System.AreaPath": "bench\\AC - Sede 1",
+            "System.AssignedTo": {"uniqueName": "luis.rojas@bench.test"},
+            "Custom.Devoluciones": returns,
+            "Custom.Ultimavezsolicitado": "2026-10-12T14:00:00Z",
+            "Custom.Ultimavezasignado": "2026-10-12T16:00:00Z",
+        },
+    }
+
+@pytest.fixture
+def store(tmp_path) -> WorkItemStore:
+    return WorkItemStore(str(tmp_path / "sync_store.sqlite3"))
+
+def test_snapshot_loads_columns(store):
+    store.apply_page([work_item(1, 1, "Solicitado"), work_item(2, 1, "Asignado", returns=2)], None, True)
+
+    columns = ReversalStatsSnapshot(store).get()
+    assert columns["id"] == (1, 2)
+    assert columns["iterations"] == (0, 2)
+    assert columns["assigned"][0] - columns["requested"][0] == pytest.approx(7200, abs=0.01)
+
+def test_snapshot_is_not_modified_by_later_syncs(store):
+    snapshot = ReversalStatsSnapshot(store)
+    store.apply_page([work_item(1, 1, "Solicitado")], None, True)
+    first = snapshot.get()
+
+    store.apply_page([work_item(1, 2, "Asignado"), work_item(2, 1, "Solicitado")], None, True)
+    second = snapshot.get()
+
+    assert first["state"] == ("Solicitado",)
+    assert second["state"] == ("Asignado", "Solicitado")
+    # Sin cambios se reutiliza la misma vista
+    assert snapshot.get() is second
+    with pytest.raises(TypeError):
+        second["state"] = ()
@@ -0,0 +1,115 @@
+# tests/test_single_flight.py
+
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.services.single_flight import SingleFlight
+
+def reader(release: asyncio.Event, calls: list, result=None, error: BaseException | None = None):
+    """
+    Retorna una fábrica de lecturas que espera a `release` y registra cada ejecución.
+    """
+    async def read():
+        calls.append(1)
+        await release.wait()
+        if error is not None:
+            raise error
+        return result
+
+    return read
+
+def test_error_is_raised_to_every_waiter():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def run():
+        release = asyncio.Event()
+        read = reader(release, calls, error=ValueError("Azure no respondió"))
+        waiters = [asyncio.create_task(flight.do("clave", read)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        return await asyncio.gather(*waiters, return_exceptions=True)
+
+    errors = asyncio.run(run())
+    assert len(calls) == 1
+    assert [str(error) for error in errors] == ["Azure no respondió"] * 3
+    assert all(isinstance(error, ValueError) for error in errors)
+    # El error no queda guardado: la siguiente lectura vuelve a consultar
+    assert not flight.in_flight("clave")
+
+def test_cancelled_leader_does_not_cancel_waiters():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def run():
+        release = asyncio.Event()
+        read = reader(release, calls, result={"id": 1})
+        leader = asyncio.create_task(flight.do("clave", read))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do("clave", read))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(run()) == {"id": 1}
+    assert len(calls) == 1
+    assert flight.coalesced == 1
+
+def test_each_caller_gets_its_own_copy():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def run():
+        release = asyncio.Event()
+        read = reader(release, calls, result={"comments": []})
+        waiters = [asyncio.create_task(flight.do("clave", read)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        return await asyncio.gather(*waiters)
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert len({id(result) for result in results}) == 3
+    results[0]["comments"].append("modificado")
+    assert results[1] == results[2] == {"comments": []}
+
+@pytest.mark.parametrize("error", [False, True])
+def test_sync_result_reaches_every_thread(error):
+    flight = SingleFlight("test")
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def read():
+        calls.append(1)
+        started.set()
+        release.wait()
+        if error:
+            raise ValueError("Azure no respondió")
+        return {"comments": []}
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futures = [pool.submit(flight.do_sync, "clave", read)]
+        started.wait()
+        futures += [pool.submit(flight.do_sync, "clave", read) for _ in range(2)]
+        # Esperar a que los demás hilos se unan a la lectura en curso
+        while flight._calls["clave"].followers < 2:
+            time.sleep(0.001)
+        release.set()
+
+    assert len(calls) == 1
+    if error:
+        assert all(isinstance(future.exception(), ValueError) for future in futures)
+    else:
+        results = [future.result() for future in futures]
+        assert len({id(result) for result in results}) == 3
+        results[0]["comments"].append("modificado")
+        assert results[1] == results[2] == {"comments": []}
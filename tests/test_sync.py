@@ -0,0 +1,102 @@
+# tests/test_sync.py
+
+import asyncio
+
+import pytest
+
+from app.services.sync_service import SyncWorker
+from app.services.work_item_store import WorkItemStore
+from app.services.reversal_stats_service import ReversalStatsSnapshot
+
+AREA = "bench\\AX - Grupo 1"
+
+@pytest.fixture
+def store(tmp_path) -> WorkItemStore:
+    return WorkItemStore(str(tmp_path / "sync_store.sqlite3"))
+
+def sync(store: WorkItemStore) -> tuple[SyncWorker, list[bool]]:
+    """
+    Sincroniza hasta alcanzar el final de las revisiones y retorna el resultado de cada página.
+    """
+    worker = SyncWorker(store)
+    pages = []
+
+    async def run():
+        while not pages or not pages[-1]:
+            pages.append(await worker.sync_page())
+
+    asyncio.run(run())
+    return worker, pages
+
+def test_sync_follows_continuation_token(azure, store):
+    azure.revisions_page_size = 2
+    for ticket_id in range(1, 6):
+        azure.add_work_item(ticket_id, "Solicitado")
+
+    worker, pages = sync(store)
+    assert pages == [False, False, True]
+    assert store.count() == 5
+    assert worker.items_synced == 5
+    assert azure.calls["reporting_revisions"] == 3
+
+@pytest.mark.parametrize("max_requests_per_second, interval", [(4, 0.25), (0, 0), (-1, 0)])
+def test_max_requests_per_second_zero_is_unlimited(store, max_requests_per_second, interval):
+    assert SyncWorker(store, max_requests_per_second=max_requests_per_second).min_request_interval == interval
+
+def test_sync_resumes_from_stored_token(azure, store):
+    for ticket_id in range(1, 4):
+        azure.add_work_item(ticket_id, "Solicitado")
+    sync(store)
+
+    # Tras un reinicio solo se leen los cambios posteriores a la marca guardada
+    azure.apply_patch(azure.work_items[2], [{"op": "add", "path": "/fields/System.State", "value": "Asignado"}])
+    worker, pages = sync(store)
+    assert pages == [True]
+    assert worker.items_synced == 1
+    assert store.get_many([2])[2]["fields"]["System.State"] == "Asignado"
+
+def test_sync_skips_other_work_item_types(azure, store):
+    azure.add_work_item(1, "Solicitado")
+    azure.add_work_item(2, "Solicitado")["fields"]["System.WorkItemType"] = "Bug"
+
+    sync(store)
+    assert list(store.get_many([1, 2])) == [1]
+
+def test_store_is_fresh_only_after_catching_up(azure, tmp_path):
+    store = WorkItemStore(str(tmp_path / "sync_store.sqlite3"), max_staleness=60)
+    azure.revisions_page_size = 1
+    azure.add_work_item(1, "Solicitado")
+    azure.add_work_item(2, "Solicitado")
+    assert not store.is_fresh()
+
+    asyncio.run(SyncWorker(store).sync_page())
+    assert not store.is_fresh()
+
+    sync(store)
+    assert store.is_fresh()
+    assert not WorkItemStore(str(tmp_path / "sync_store.sqlite3"), max_staleness=-1).is_fresh()
+
+def test_query_assigned_matches_state_area_and_members(azure, store):
+    azure.add_work_item(1, "Asignado", "AX - Grupo 1", "Evaluador0@ax.com")
+    azure.add_work_item(2, "Asignado", "AX - Grupo 1", "evaluador1@ax.com")
+    azure.add_work_item(3, "En evaluacion", "AX - Grupo 1", "evaluador0@ax.com")
+    azure.add_work_item(4, "Asignado", "AC - Sede 1", "evaluador0@ax.com")
+    azure.add_work_item(5, "Asignado", "AX - Grupo 1", "otro@ax.com")
+    sync(store)
+
+    assert store.query_assigned("Asignado", AREA, ["EVALUADOR0@ax.com", "evaluador1@ax.com"]) == [
+        (1, "evaluador0@ax.com"),
+        (2, "evaluador1@ax.com"),
+    ]
+
+def test_sync_removes_deleted_work_items(azure, store):
+    for ticket_id in range(1, 4):
+        azure.add_work_item(ticket_id, "Solicitado")
+    sync(store)
+    snapshot = ReversalStatsSnapshot(store)
+    assert snapshot.get()["id"] == (1, 2, 3)
+
+    azure.delete_work_item(2)
+    sync(store)
+    assert list(store.get_many([1, 2, 3])) == [1, 3]
+    assert snapshot.get()["id"] == (1, 3)
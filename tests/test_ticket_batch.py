@@ -0,0 +1,16 @@
+# tests/test_ticket_batch.py
+
+def test_batch_items_have_the_same_shape_with_and_without_cache(azure, client):
+    for ticket_id in [1, 2]:
+        azure.add_work_item(ticket_id, "Borrador")
+    azure.work_items[1]["relations"].append({"rel": "AttachedFile", "url": "http://azure.test/bench/_apis/wit/attachments/abc", "attributes": {"name": "a.pdf"}})
+
+    # El ticket 1 queda en cache completo, con sus adjuntos y todos los campos
+    assert client.get("/tickets/1").json()["data"]["attachments"]
+
+    tickets = client.post("/tickets/batch", json={"ids": [1, 2]}).json()["data"]["tickets"]
+    assert [ticket["attachments"] for ticket in tickets] == [[], []]
+    assert tickets[0]["azure"].keys() == tickets[1]["azure"].keys()
+
+    tickets = client.post("/tickets/batch", json={"ids": [1, 2], "include_attachments": True}).json()["data"]["tickets"]
+    assert len(tickets[0]["attachments"]) == 1
@@ -0,0 +1,86 @@
+# tests/test_ticket_cache.py
+
+import pytest
+
+from app.services.cache_service import MemoryCacheBackend, SQLiteCacheBackend, TicketCache
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryCacheBackend(max_entries=2)
+    return SQLiteCacheBackend(str(tmp_path / "cache.sqlite3"), max_entries=2)
+
+def ticket(ticket_id: int, rev: int, state: str = "Borrador") -> dict:
+    return {"id": ticket_id, "state": state, "comments": [{"id": 1, "text": "hola"}], "azure": {"System.Rev": rev}}
+
+def test_get_returns_independent_copies(backend):
+    cache = TicketCache(backend)
+    cache.put(ticket(1, 1))
+
+    first = cache.get(1)
+    first["state"] = "Modificado"
+    assert cache.get(1)["state"] == "Borrador"
+    assert (cache.hits, cache.misses) == (2, 0)
+
+def test_older_revision_does_not_replace_newer(backend):
+    cache = TicketCache(backend)
+    cache.put(ticket(1, 3, "Asignado"))
+    cache.put(ticket(1, 2, "Solicitado"))
+
+    assert cache.get(1)["state"] == "Asignado"
+
+def test_invalidate_keeps_revision_to_reject_stale_reads(backend):
+    cache = TicketCache(backend)
+    cache.put(ticket(1, 1))
+    cache.invalidate(1, rev=2)
+
+    assert cache.get(1) is None
+    # Una lectura iniciada antes de la mutación no debe volver a llenar el cache
+    cache.put(ticket(1, 1))
+    assert cache.get(1) is None
+    cache.put(ticket(1, 2, "Solicitado"))
+    assert cache.get(1)["state"] == "Solicitado"
+
+def test_entries_without_comments_do_not_serve_reads_with_comments(backend):
+    cache = TicketCache(backend)
+    cache.put(ticket(1, 1), include_comments=False)
+
+    assert cache.get(1, include_comments=True) is None
+    assert cache.get(1, include_comments=False)["comments"] == []
+
+def test_expired_entries_are_misses(backend):
+    cache = TicketCache(backend, ttl=-1)
+    cache.put(ticket(1, 1))
+
+    assert cache.get(1) is None
+    assert cache.misses == 1
+
+def test_least_recently_used_entry_is_evicted(backend):
+    cache = TicketCache(backend)
+    cache.put(ticket(1, 1))
+    cache.put(ticket(2, 1))
+    cache.get(1)
+    cache.put(ticket(3, 1))
+
+    assert cache.get(2) is None
+    assert cache.get(1) is not None and cache.get(3) is not None
+    assert cache.stats()["evictions"] == 1
+
+def test_disabled_cache_never_hits():
+    cache = TicketCache(None)
+    cache.put(ticket(1, 1))
+
+    assert cache.get(1) is None
+    assert cache.stats()["backend"] is None
+
+def test_reads_are_served_from_cache_until_a_mutation(azure, client):
+    azure.add_work_item(1, "Borrador", comments=2)
+
+    assert client.get("/tickets/1").json()["data"]["state"] == "Borrador"
+    calls = sum(azure.calls.values())
+    assert client.get("/tickets/1").json()["data"]["state"] == "Borrador"
+    assert sum(azure.calls.values()) == calls
+
+    assert client.put("/tickets/1", json={"new_state": "Solicitado"}).status_code == 200
+    assert client.get("/tickets/1").json()["data"]["state"] == "Solicitado"
+    assert client.get("/cache/stats").json()["data"]["hits"] >= 1